@@ -0,0 +1,150 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from contextlib import nullcontext
+from functools import partial
+
+from metrics import measure_task
+
+
+def resolve_jobs(jobs):
+    """
+    Turns the --jobs value into a worker count. 0 or a negative number means one worker per CPU.
+    """
+    if jobs is None or jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _run_task(worker, input_file, output_file, options=None):
+    """
+    Runs a single conversion and returns the exception instead of raising it, so one broken file never takes down
+    the rest of the batch (or the worker process).
+    """
+    try:
+        worker(input_file, output_file, **(options or {}))
+    except Exception as e:
+        return e
+    return None
+
+
+def _report(input_file, output_file, error):
+    filename = os.path.basename(input_file)
+    if isinstance(output_file, tuple):
+        output_file = ", ".join(output_file)
+    if error is None:
+        print(f"Processed {filename} -> {output_file}")
+    else:
+        print(f"Error processing {filename}: {error}")
+
+
+def _untimed(name):
+    return nullcontext()
+
+
+def run_batch(tasks, worker, jobs=1, manifest=None, config=None, largest_first=True, metrics=None):
+    """
+    Runs `worker(input_file, output_file)` for every task. Tasks are scheduled largest input first so that one giant
+    log does not hold up the end of the run, and results are reported in completion order.
+    :param tasks: Iterable of (input_file, output_file) tuples. output_file may be a tuple of paths for workers that
+                  write several files from one input. A task may carry a third item, a dict of keyword arguments
+                  for this task's worker call (e.g. a geometry the coordinating process already parsed), which is
+                  sent to the worker process with it.
+    :param worker: Module-level function (or functools.partial of one) so it can be sent to worker processes.
+    :param jobs: Number of worker processes. 1 runs everything in the current process, 0 uses all CPUs.
+    :param manifest: Optional BuildManifest. Up-to-date targets are skipped and successful ones are recorded.
+    :param config: Configuration the targets are built with, stored in the manifest (a tuple with one entry per
+                   output path when output_file is a tuple).
+    :param largest_first: Collect and sort all tasks before starting. When False, tasks are consumed lazily and
+                          work starts as soon as the first one is produced, with a bounded number in flight.
+    :param metrics: Optional RunMetrics. Stage times, sizes and the slowest files are recorded, and the per-file
+                    "Processed ..." lines are replaced by its progress line.
+    :return: Number of files that failed.
+    """
+    skipped = 0
+    timed = metrics.time_stage if metrics is not None else _untimed
+    say = metrics.message if metrics is not None else print
+
+    def pending_tasks(tasks):
+        nonlocal skipped
+        tasks = iter(tasks)
+        while True:
+            with timed("discover"):
+                task = next(tasks, None)
+            if task is None:
+                return
+            with timed("manifest"):
+                up_to_date = manifest is not None and manifest.is_up_to_date(task[0], task[1], config)
+            if up_to_date:
+                skipped += 1
+            else:
+                yield task
+
+    if metrics is not None:
+        metrics.begin_batch(getattr(worker, "__name__", None) or worker.func.__name__)
+        execute = partial(measure_task, profile=metrics.profile)
+    else:
+        execute = _run_task
+
+    tasks = pending_tasks(tasks)
+    jobs = resolve_jobs(jobs)
+    if largest_first:
+        with timed("schedule"):
+            tasks = sorted(tasks, key=lambda task: _file_size(task[0]), reverse=True)
+        jobs = min(jobs, len(tasks)) or 1
+    failed = 0
+
+    def finish(input_file, output_file, outcome):
+        nonlocal failed
+        if metrics is not None:
+            error = outcome[0]
+            metrics.task_done(input_file, output_file, *outcome)
+        else:
+            error = outcome
+            _report(input_file, output_file, error)
+        if error is not None:
+            failed += 1
+        elif manifest is not None:
+            with timed("manifest"):
+                manifest.record(input_file, output_file, config)
+
+    def collect(future, task):
+        try:
+            outcome = future.result()
+        except Exception as e:  # The worker process itself died
+            outcome = (e, 0.0, {}, None) if metrics is not None else e
+        finish(task[0], task[1], outcome)
+
+    try:
+        if jobs == 1:
+            for task in tasks:
+                finish(task[0], task[1], execute(worker, *task))
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                # Keep the pool busy without materializing every future when tasks arrive lazily
+                max_in_flight = 4 * jobs
+                in_flight = {}
+                for task in tasks:
+                    in_flight[executor.submit(execute, worker, *task)] = task
+                    if len(in_flight) >= max_in_flight:
+                        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            collect(future, in_flight.pop(future))
+                for future in as_completed(in_flight):
+                    collect(future, in_flight[future])
+    finally:
+        if manifest is not None:
+            with timed("manifest"):
+                manifest.save()
+        if metrics is not None:
+            metrics.end_batch(skipped)
+
+    if skipped:
+        say(f"Skipped {skipped} up-to-date file(s)")
+    return failed
@@ -0,0 +1,531 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from functools import partial
+from multiprocessing import get_context
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak RSS is then not reported
+    resource = None
+
+from conversion_options import ConversionOptions
+from default_config import DefaultConfig
+from fchk_reader import BOHR_TO_ANGSTROM, parse_fchk_geometry
+from file_converter import all_files_directory_out_to_xyz, all_files_directory_com_to_xyz, \
+    all_files_directory_fchk_to_xyz, render_out_to_xyz
+from gaussian_parser import parse_gaussian_output, parse_gaussian_input, parse_gaussian_output_stream
+from gaussian_scanner import parse_gaussian_properties
+from log_index import GaussianLog
+from molecule import Molecule
+from output_sinks import open_output_sink
+from periodic_data import PeriodicData
+from pipeline import DelayedFileSystem, run_pipeline
+from to_com import out_to_com_configs, xyz_to_com_configs, process_elements, render_xyz_to_coms
+from writer import ComTemplate, write_xyz_file
+
+
+class SyntheticGaussianData:
+    """
+    Deterministic generator of realistic Gaussian optimization + frequency logs, the matching input files and .xyz
+    files. Besides the blocks the parsers look for, every step contains the population analysis, forces and
+    convergence table of a real log, so file sizes and the ratio of signal to noise are representative.
+    """
+
+    ELEMENTS = ("C", "C", "C", "H", "H", "H", "H", "N", "O")
+    HEAVY_METAL = "Ni"
+    ROUTE = "#p opt freq um06/genecp scrf=(smd,solvent=toluene) em=gd3"
+    DASHES = " " + "-" * 69 + "\n"
+
+    def __init__(self, n_atoms=50, n_steps=20, seed=0):
+        """
+        :param n_atoms: Atoms per molecule (the first atom is a Ni centre).
+        :param n_steps: Optimization steps per output file.
+        :param seed: Seed of the random geometries and energies.
+        """
+        if n_atoms < 2 or n_steps < 1:
+            raise ValueError("At least 2 atoms and 1 optimization step are required")
+        self.n_atoms = n_atoms
+        self.n_steps = n_steps
+        self.seed = seed
+
+    def molecule(self, index):
+        """
+        :return: Molecule number `index` of the data set.
+        """
+        rng = random.Random(self.seed * 1000003 + index)
+        symbols = [self.HEAVY_METAL] + [rng.choice(self.ELEMENTS) for _ in range(self.n_atoms - 1)]
+        box = 1.5 * self.n_atoms ** (1 / 3)
+        coordinates = [rng.uniform(-box, box) for _ in range(3 * self.n_atoms)]
+        return Molecule.from_symbols(symbols, coordinates, title=f"conf_{index}")
+
+    def xyz_text(self, index):
+        molecule = self.molecule(index)
+        return f"{len(molecule)}\n{molecule.title}\n{molecule.format_xyz_block()}"
+
+    def input_text(self, index):
+        molecule = self.molecule(index)
+        return ("%mem=16GB\n%nprocshared=10\n"
+                f"%chk={molecule.title}.chk\n"
+                f"{self.ROUTE}\n\n"
+                f"{molecule.title}\n\n"
+                "0 1\n"
+                f"{molecule.format_xyz_block()}\n"
+                f"{self.HEAVY_METAL} 0\nSDD\n****\nC H N O 0\n6-311++G(d,p)\n****\n\n{self.HEAVY_METAL} 0\nSDD\n\n\n")
+
+    def output_text(self, index):
+        """
+        :return: Contents of output file number `index`.
+        """
+        rng = random.Random(self.seed * 1000003 + index)
+        molecule = self.molecule(index)
+        symbols = molecule.symbols
+        coordinates = list(molecule.coordinates)
+        n_orbitals = 5 * self.n_atoms
+        energy = -1500.0 - 10.0 * self.n_atoms
+
+        parts = [" Entering Gaussian System, Link 0=g16\n",
+                 " %mem=16GB\n %nprocshared=10\n",
+                 " ----------------------------------------------------------------------\n",
+                 f" {self.ROUTE}\n",
+                 " ----------------------------------------------------------------------\n",
+                 " 1/14=-1,18=20,19=15,26=3,38=1,57=2/1,3;\n 2/9=110,12=2,17=6,18=5,40=1/2;\n",
+                 f" -------\n {molecule.title}\n -------\n",
+                 " Symbolic Z-matrix:\n Charge =  0 Multiplicity = 1\n"]
+        parts.extend(" %-2s %20.8f %14.8f %14.8f\n" % atom for atom in molecule)
+        parts.append(" \n")
+
+        for step in range(1, self.n_steps + 1):
+            coordinates = [value + rng.gauss(0.0, 0.01) for value in coordinates]
+            energy -= abs(rng.gauss(0.0, 0.001)) / step
+            block = "".join("      %d  %9d  %10d  %18.6f  %11.6f  %11.6f\n"
+                            % (i + 1, PeriodicData.SYMBOL_TO_NUMBER[symbol], 0, *coordinates[3 * i:3 * i + 3])
+                            for i, symbol in enumerate(symbols))
+            for orientation in ("Input", "Standard"):
+                parts.append(f"                          {orientation} orientation:                          \n"
+                             f"{self.DASHES}"
+                             " Center     Atomic      Atomic             Coordinates (Angstroms)\n"
+                             " Number     Number       Type             X           Y           Z\n"
+                             f"{self.DASHES}{block}{self.DASHES}")
+            parts.append(" Rotational constants (GHZ):      0.1234567      0.0987654      0.0876543\n")
+            parts.append(f" SCF Done:  E(UM06) =  {energy:.9f}     A.U. after   {rng.randint(8, 20)} cycles\n")
+            parts.append(" " + "*" * 70 + "\n\n Population analysis using the SCF Density.\n\n")
+            occupied = sorted(rng.uniform(-20.0, -0.2) for _ in range(n_orbitals // 2))
+            virtual = sorted(rng.uniform(0.01, 5.0) for _ in range(n_orbitals - n_orbitals // 2))
+            for label, values in ((" Alpha  occ.", occupied), (" Alpha virt.", virtual)):
+                for i in range(0, len(values), 5):
+                    parts.append(f"{label} eigenvalues --" + "".join("%10.5f" % v for v in values[i:i + 5])
+                                 + "\n")
+            parts.append(" Mulliken charges:\n               1\n")
+            parts.extend("%6d  %-2s %10.6f\n" % (i + 1, symbol, rng.uniform(-0.5, 0.5))
+                         for i, symbol in enumerate(symbols))
+            parts.append(" Sum of Mulliken charges =   0.00000\n")
+            parts.append(f"{self.DASHES} Center     Atomic                   Forces (Hartrees/Bohr)\n"
+                         f" Number     Number              X              Y              Z\n{self.DASHES}")
+            parts.extend("%7d %8d     %14.9f %14.9f %14.9f\n" % (i + 1, PeriodicData.SYMBOL_TO_NUMBER[symbol],
+                                                                rng.gauss(0, 1e-3), rng.gauss(0, 1e-3),
+                                                                rng.gauss(0, 1e-3))
+                         for i, symbol in enumerate(symbols))
+            parts.append(self.DASHES)
+            converged = "YES" if step == self.n_steps else "NO "
+            parts.append("         Item               Value     Threshold  Converged?\n"
+                         f" Maximum Force            0.000{rng.randint(100, 999)}     0.000450     {converged}\n"
+                         f" RMS     Force            0.000{rng.randint(100, 999)}     0.000300     {converged}\n"
+                         f" Maximum Displacement     0.00{rng.randint(1000, 9999)}     0.001800     {converged}\n"
+                         f" RMS     Displacement     0.00{rng.randint(1000, 9999)}     0.001200     {converged}\n")
+
+        parts.append(" Optimization completed.\n    -- Stationary point found.\n")
+        n_modes = 3 * self.n_atoms - 6
+        frequencies = sorted(rng.uniform(20.0, 3500.0) for _ in range(max(n_modes, 1)))
+        parts.append(" Harmonic frequencies (cm**-1), IR intensities (KM/Mole), Raman scattering\n")
+        for i in range(0, len(frequencies), 3):
+            group = frequencies[i:i + 3]
+            parts.append("                " + "".join("%23d" % (i + j + 1) for j in range(len(group))) + "\n")
+            parts.append(" Frequencies --" + "".join("%23.4f" % value for value in group) + "\n")
+            parts.append("  Atom  AN" + "      X      Y      Z  " * len(group) + "\n")
+            parts.extend("%6d %3d  " % (atom + 1, PeriodicData.SYMBOL_TO_NUMBER[symbols[atom]])
+                         + "".join("  %5.2f  %5.2f  %5.2f  " % (rng.uniform(-1, 1), rng.uniform(-1, 1),
+                                                                rng.uniform(-1, 1)) for _ in group) + "\n"
+                         for atom in range(self.n_atoms))
+        zero_point = 0.001 * self.n_atoms
+        parts.append(f" Zero-point correction=                           {zero_point:.6f} (Hartree/Particle)\n"
+                     f" Sum of electronic and thermal Enthalpies=         {energy + zero_point + 0.01:.6f}\n"
+                     f" Sum of electronic and thermal Free Energies=      {energy + zero_point - 0.05:.6f}\n")
+
+        atoms = "\\".join("%s,%.8f,%.8f,%.8f" % (symbol, *coordinates[3 * i:3 * i + 3])
+                          for i, symbol in enumerate(symbols))
+        archive = (f"1\\1\\GINC-NODE\\Freq\\UM06\\GenECP\\X\\USER\\01-Jan-2024\\0\\\\{self.ROUTE}\\\\"
+                   f"{molecule.title}\\\\0,1\\{atoms}\\\\Version=ES64L-G16RevC.01\\HF={energy:.7f}\\\\@")
+        parts.extend(f" {archive[i:i + 70]}\n" for i in range(0, len(archive), 70))
+        parts.append("\n Normal termination of Gaussian 16 at Mon Jan  1 00:00:00 2024.\n")
+        return "".join(parts)
+
+    def fchk_text(self, index):
+        """
+        :return: Contents of formatted checkpoint file number `index`. As in a real file, the geometry is a small
+                 section among large ones (MO coefficients, Hessian).
+        """
+        rng = random.Random(self.seed * 1000003 + index)
+        molecule = self.molecule(index)
+        n_coordinates = 3 * self.n_atoms
+        n_basis = 5 * self.n_atoms
+        energy = -1500.0 - 10.0 * self.n_atoms
+        parts = [f"{molecule.title}\n", "%-10s%-30s%-30s\n" % ("Freq", "UM06", "Gen"),
+                 _fchk_scalar("Number of atoms", "I", self.n_atoms), _fchk_scalar("Charge", "I", 0),
+                 _fchk_scalar("Multiplicity", "I", 1), _fchk_scalar("Number of basis functions", "I", n_basis),
+                 _fchk_array("Route", "C", [self.ROUTE[i:i + 12] for i in range(0, len(self.ROUTE), 12)]),
+                 _fchk_array("Atomic numbers", "I", molecule.atomic_numbers),
+                 _fchk_array("Nuclear charges", "R", molecule.atomic_numbers),
+                 _fchk_array("Current cartesian coordinates", "R",
+                             [value / BOHR_TO_ANGSTROM for value in molecule.coordinates]),
+                 _fchk_scalar("Total Energy", "R", energy),
+                 _fchk_array("Alpha Orbital Energies", "R", sorted(rng.uniform(-20.0, 5.0) for _ in range(n_basis))),
+                 _fchk_array("Alpha MO coefficients", "R", [rng.uniform(-1, 1) for _ in range(n_basis * n_basis)]),
+                 _fchk_array("Cartesian Gradient", "R", [rng.gauss(0, 1e-3) for _ in range(n_coordinates)]),
+                 _fchk_array("Cartesian Force Constants", "R",
+                             [rng.uniform(-0.5, 0.5) for _ in range(n_coordinates * (n_coordinates + 1) // 2)])]
+        return "".join(parts)
+
+    def write_dataset(self, directory, n_files):
+        """
+        Writes `n_files` output, input, .xyz and .fchk files into the out/, com/, xyz/ and fchk/ subdirectories of
+        `directory`.
+        """
+        for subdirectory, extension, generate in (("out", ".out", self.output_text), ("com", ".com", self.input_text),
+                                                  ("xyz", ".xyz", self.xyz_text), ("fchk", ".fchk", self.fchk_text)):
+            os.makedirs(os.path.join(directory, subdirectory), exist_ok=True)
+            for index in range(n_files):
+                with open(os.path.join(directory, subdirectory, f"conf_{index}{extension}"), "w") as file:
+                    file.write(generate(index))
+
+    @staticmethod
+    def dataset_files(directory, subdirectory, extension):
+        path = os.path.join(directory, subdirectory)
+        return sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(extension))
+
+
+def _fchk_scalar(name, kind, value):
+    return "%-40s   %s     %s\n" % (name, kind, "%12d" % value if kind == "I" else "%22.15E" % value)
+
+
+def _fchk_array(name, kind, values):
+    per_line, field = {"I": (6, "%12d"), "R": (5, "%16.8E"), "C": (5, "%-12s")}[kind]
+    lines = ["".join(field % value for value in values[i:i + per_line]) + "\n"
+             for i in range(0, len(values), per_line)]
+    return "%-40s   %s   N=%12d\n%s" % (name, kind, len(values), "".join(lines))
+
+
+def _spe_template():
+    return ComTemplate.from_config(DefaultConfig.SPE_DEFAULTS["1"], "spe", 16, 10)
+
+
+def _write_com(molecule, output_path, template):
+    heavy_metals_in_molecule, non_heavy_metals_in_molecule = process_elements(molecule)
+    with open(output_path, "w") as file:
+        template.write(file, os.path.basename(output_path), molecule, heavy_metals_in_molecule,
+                       non_heavy_metals_in_molecule)
+
+
+def _indexed_last_frame(path):
+    # The first repetition builds the <log>.gpidx sidecar, later ones reuse it
+    with GaussianLog(path) as log:
+        return log.frame(-1)
+
+
+def _xyz_to_com_into_sink(directory, options, archive_path=None, atomic=False):
+    with open_output_sink(directory, archive_path, atomic) as sink:
+        options.sink = sink
+        xyz_to_com_configs(directory, [DefaultConfig.SPE_DEFAULTS["1"]], "spe", options)
+
+
+# Per-file cases: name -> (subdirectory, extension, function called on each file)
+PARSER_CASES = {
+    "parse_gaussian_output": ("out", ".out", parse_gaussian_output),
+    "parse_gaussian_output_forward": ("out", ".out", lambda path: parse_gaussian_output(path, reverse_scan=False)),
+    "parse_gaussian_output_stream": ("out", ".out", parse_gaussian_output_stream),
+    "parse_gaussian_properties": ("out", ".out", parse_gaussian_properties),
+    "parse_gaussian_input": ("com", ".com", parse_gaussian_input),
+    "read_xyz_file": ("xyz", ".xyz", Molecule.from_xyz_file),
+    "parse_fchk_geometry": ("fchk", ".fchk", parse_fchk_geometry),
+    "indexed_last_frame": ("out", ".out", _indexed_last_frame),
+}
+
+# Per-file cases: name -> (output extension, writer(molecule, output path))
+WRITER_CASES = {
+    "write_xyz_file": (".xyz", lambda molecule, path: write_xyz_file(molecule, path)),
+    "write_com_file": (".com", lambda molecule, path, template=_spe_template(): _write_com(molecule, path, template)),
+}
+
+# Batch entry points: name -> (subdirectory, extension, function(directory, ConversionOptions))
+BATCH_CASES = {
+    "batch_out_to_xyz": ("out", ".out", all_files_directory_out_to_xyz),
+    "batch_com_to_xyz": ("com", ".com", all_files_directory_com_to_xyz),
+    "batch_fchk_to_xyz": ("fchk", ".fchk", all_files_directory_fchk_to_xyz),
+    "batch_xyz_to_com": ("xyz", ".xyz", lambda directory, options: xyz_to_com_configs(
+        directory, [DefaultConfig.SPE_DEFAULTS["1"]], "spe", options)),
+    "batch_out_to_com_via_xyz": ("out", ".out", lambda directory, options: (
+        all_files_directory_out_to_xyz(directory, options),
+        xyz_to_com_configs(directory, [DefaultConfig.SPE_DEFAULTS["1"]], "spe", options))),
+    "batch_out_to_com": ("out", ".out", lambda directory, options: out_to_com_configs(
+        directory, [DefaultConfig.SPE_DEFAULTS["1"]], "spe", options)),
+    "batch_xyz_to_com_atomic": ("xyz", ".xyz", lambda directory, options: _xyz_to_com_into_sink(
+        directory, options, atomic=True)),
+    "batch_xyz_to_com_tar": ("xyz", ".xyz", lambda directory, options: _xyz_to_com_into_sink(
+        directory, options, os.path.join(directory, "written_inputs.tar"))),
+    "batch_xyz_to_com_tar_gz": ("xyz", ".xyz", lambda directory, options: _xyz_to_com_into_sink(
+        directory, options, os.path.join(directory, "written_inputs.tar.gz"))),
+}
+
+_SPE_TEMPLATES = (_spe_template(),)
+
+
+def _xyz_output(directory, input_file):
+    return os.path.join(directory, f"{os.path.splitext(os.path.basename(input_file))[0]}.xyz")
+
+
+def _com_outputs(directory, input_file):
+    return tuple(os.path.join(directory, template.com_file_name(os.path.basename(input_file)))
+                 for template in _SPE_TEMPLATES)
+
+
+# Conversions on a simulated network filesystem (see --latency), one file at a time or pipelined:
+# name -> (subdirectory, extension, renderer, output paths(output directory, input file), pipelined)
+DELAYED_CASES = {
+    "delayed_out_to_xyz_serial": ("out", ".out", render_out_to_xyz, _xyz_output, False),
+    "delayed_out_to_xyz_pipeline": ("out", ".out", render_out_to_xyz, _xyz_output, True),
+    "delayed_xyz_to_com_serial": ("xyz", ".xyz", partial(render_xyz_to_coms, templates=_SPE_TEMPLATES),
+                                  _com_outputs, False),
+    "delayed_xyz_to_com_pipeline": ("xyz", ".xyz", partial(render_xyz_to_coms, templates=_SPE_TEMPLATES),
+                                    _com_outputs, True),
+}
+
+ALL_CASES = list(PARSER_CASES) + list(WRITER_CASES) + list(BATCH_CASES) + list(DELAYED_CASES)
+
+
+def _peak_rss_mb(who):
+    if resource is None:
+        return None
+    peak = resource.getrusage(who).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)  # bytes on macOS, KiB on Linux
+
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def run_case(name, data_dir, repeat=3, jobs=1, latency=0.005, io_concurrency=8):
+    """
+    Runs one benchmark case. Meant to be called in a fresh child process so that the peak RSS belongs to the case.
+    :param latency: Seconds added to every read and write by the delayed_* cases.
+    :param io_concurrency: Reads and writes in flight in the delayed_*_pipeline cases.
+    :return: Dictionary of measurements.
+    """
+    if resource is not None:
+        baseline_rss = _peak_rss_mb(resource.RUSAGE_SELF)
+    else:
+        baseline_rss = None
+
+    latencies = []
+    best = None
+    n_bytes = 0
+
+    if name in BATCH_CASES:
+        subdirectory, extension, function = BATCH_CASES[name]
+        directory = os.path.join(data_dir, subdirectory)
+        files = SyntheticGaussianData.dataset_files(data_dir, subdirectory, extension)
+        n_bytes = sum(os.path.getsize(path) for path in files)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+                function(directory, ConversionOptions(jobs=jobs))
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+    elif name in DELAYED_CASES:
+        subdirectory, extension, renderer, output_paths, pipelined = DELAYED_CASES[name]
+        files = SyntheticGaussianData.dataset_files(data_dir, subdirectory, extension)
+        n_bytes = sum(os.path.getsize(path) for path in files)
+        output_dir = os.path.join(data_dir, f"written_{name}")
+        os.makedirs(output_dir, exist_ok=True)
+        tasks = [(path, output_paths(output_dir, path)) for path in files]
+        file_system = DelayedFileSystem(latency)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            if pipelined:
+                with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+                    run_pipeline(tasks, renderer, jobs, io_concurrency, file_system=file_system)
+            else:
+                for input_file, output_file in tasks:
+                    file_start = time.perf_counter()
+                    for path, content in renderer(input_file, output_file, file_system.read_bytes(input_file)):
+                        file_system.write_text(path, content)
+                    latencies.append(time.perf_counter() - file_start)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+    else:
+        if name in PARSER_CASES:
+            subdirectory, extension, function = PARSER_CASES[name]
+            files = SyntheticGaussianData.dataset_files(data_dir, subdirectory, extension)
+            arguments = [(path,) for path in files]
+            n_bytes = sum(os.path.getsize(path) for path in files)
+        else:
+            output_extension, function = WRITER_CASES[name]
+            files = SyntheticGaussianData.dataset_files(data_dir, "xyz", ".xyz")
+            output_dir = os.path.join(data_dir, f"written_{name}")
+            os.makedirs(output_dir, exist_ok=True)
+            arguments = [(Molecule.from_xyz_file(path),
+                          os.path.join(output_dir, os.path.basename(path).replace(".xyz", output_extension)))
+                         for path in files]
+
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for args in arguments:
+                file_start = time.perf_counter()
+                function(*args)
+                latencies.append(time.perf_counter() - file_start)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        if name in WRITER_CASES:
+            n_bytes = sum(os.path.getsize(path) for _, path in arguments)
+
+    result = {
+        "files": len(files),
+        "bytes": n_bytes,
+        "seconds": round(best, 6),
+        "files_per_second": round(len(files) / best, 2) if best else None,
+        "mb_per_second": round(n_bytes / best / 1e6, 2) if best else None,
+        "baseline_rss_mb": baseline_rss,
+        "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF) if resource is not None else None,
+        "peak_worker_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN) if resource is not None else None,
+    }
+    if latencies:
+        latencies.sort()
+        result.update({
+            "latency_mean_ms": round(1000 * sum(latencies) / len(latencies), 4),
+            "latency_p50_ms": round(1000 * _percentile(latencies, 0.50), 4),
+            "latency_p95_ms": round(1000 * _percentile(latencies, 0.95), 4),
+            "latency_max_ms": round(1000 * latencies[-1], 4),
+        })
+    return result
+
+
+def run_case_in_child(name, data_dir, repeat=3, jobs=1, latency=0.005, io_concurrency=8):
+    """
+    Runs a case in a freshly spawned interpreter, so imports, caches and memory of earlier cases do not leak into
+    its measurements.
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+        return executor.submit(run_case, name, data_dir, repeat, jobs, latency, io_concurrency).result()
+
+
+def compare_results(results, baseline, threshold=0.10):
+    """
+    Prints the throughput of every case against a saved baseline.
+    :param threshold: Relative slowdown (0.10 = 10 %) above which a case counts as a regression.
+    :return: List of names of regressed cases.
+    """
+    if baseline.get("parameters") != results.get("parameters"):
+        print(f"Warning: baseline parameters {baseline.get('parameters')} differ from {results.get('parameters')}")
+
+    regressions = []
+    print(f"{'case':32} {'baseline files/s':>17} {'files/s':>12} {'change':>8}")
+    for name, current in results["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None or not previous.get("files_per_second") or not current.get("files_per_second"):
+            print(f"{name:32} {'-':>17} {current.get('files_per_second'):>12}")
+            continue
+        change = current["files_per_second"] / previous["files_per_second"] - 1
+        flag = ""
+        if change < -threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:32} {previous['files_per_second']:>17} {current['files_per_second']:>12} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def print_results(results):
+    print(f"{'case':32} {'files/s':>10} {'MB/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'peak RSS MB':>12}")
+    for name, result in results["results"].items():
+        print(f"{name:32} {result['files_per_second']:>10} {result['mb_per_second']:>8} "
+              f"{result.get('latency_p50_ms', '-'):>9} {result.get('latency_p95_ms', '-'):>9} "
+              f"{result['peak_rss_mb'] if result['peak_rss_mb'] is not None else '-':>12}")
+
+
+def setup_parser():
+    parser = argparse.ArgumentParser(prog="Gaussian processor benchmark",
+                                     description="Benchmark the parsers, writers and batch entry points on "
+                                                 "synthetic Gaussian files")
+    parser.add_argument("--atoms", type=int, default=50, help="Atoms per molecule")
+    parser.add_argument("--steps", type=int, default=20, help="Optimization steps per output file")
+    parser.add_argument("--files", type=int, default=50, help="Number of files of each type")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions per case; throughput of the fastest")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes for the batch cases (0 = all CPUs)")
+    parser.add_argument("--latency", type=float, default=5.0, metavar="MS",
+                        help="Simulated filesystem latency per read and write in the delayed_* cases")
+    parser.add_argument("--io-concurrency", type=int, default=8,
+                        help="Reads and writes in flight in the delayed_*_pipeline cases")
+    parser.add_argument("--cases", type=str, help=f"Comma-separated subset of: {', '.join(ALL_CASES)}")
+    parser.add_argument("--data-dir", type=str,
+                        help="Generate (or reuse) the synthetic files here instead of a temporary directory")
+    parser.add_argument("--save", type=str, metavar="FILE", help="Save the results as a JSON baseline")
+    parser.add_argument("--compare", type=str, metavar="FILE", help="Compare against a saved JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="With --compare, slowdown counted as a regression (default 0.10 = 10 %%)")
+    return parser
+
+
+def run():
+    args = setup_parser().parse_args()
+    cases = args.cases.split(",") if args.cases else ALL_CASES
+    unknown = [name for name in cases if name not in ALL_CASES]
+    if unknown:
+        raise ValueError(f"Unknown benchmark case(s): {', '.join(unknown)}")
+
+    generator = SyntheticGaussianData(args.atoms, args.steps, args.seed)
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="gaussian_benchmark_")
+    try:
+        if not os.path.isdir(os.path.join(data_dir, "out")):
+            print(f"Generating {args.files} synthetic file(s) of each type in {data_dir}")
+            generator.write_dataset(data_dir, args.files)
+
+        results = {
+            "version": 1,
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parameters": {"atoms": args.atoms, "steps": args.steps, "files": args.files, "seed": args.seed,
+                           "repeat": args.repeat, "jobs": args.jobs, "latency_ms": args.latency,
+                           "io_concurrency": args.io_concurrency},
+            "results": {},
+        }
+        for name in cases:
+            results["results"][name] = run_case_in_child(name, data_dir, args.repeat, args.jobs, args.latency / 1000,
+                                                         args.io_concurrency)
+    finally:
+        if args.data_dir is None:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    print_results(results)
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Saved results to {args.save}")
+    if args.compare:
+        with open(args.compare, "r") as file:
+            baseline = json.load(file)
+        if compare_results(results, baseline, args.threshold):
+            exit(1)
+
+
+if __name__ == "__main__":
+    run()
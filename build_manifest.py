@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+
+
+class BuildManifest:
+    """
+    Persistent record of the files generated in a data directory, used to skip conversions whose inputs have not
+    changed since the last run (in the spirit of make).
+
+    Every generated file is stored with the path, size, mtime and SHA-256 of the source it was built from and the
+    configuration used. A target is up to date when it still exists, was built with the same configuration and its
+    source has the same size and mtime. If only the mtime changed, the content hash decides. A source is only hashed
+    when it is new or its size or mtime changed, never again just because its targets are rebuilt.
+    """
+
+    FILE_NAME = ".gaussian_processor_manifest.json"
+    HASH_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, self.FILE_NAME)
+        self.entries = {}
+        self._hashes = {}  # Source key -> (size, mtime, sha256) of its last known content
+        self._dirty = False
+
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as file:
+                    self.entries = json.load(file).get("targets", {})
+            except (OSError, ValueError):
+                self.entries = {}  # A corrupt manifest only costs one full rebuild
+        for entry in self.entries.values():
+            self._hashes[entry["source"]] = (entry["size"], entry["mtime"], entry["sha256"])
+
+    def _key(self, target):
+        return os.path.relpath(target, self.directory)
+
+    @classmethod
+    def file_hash(cls, path):
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(cls.HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def is_up_to_date(self, source, target, config=None):
+        """
+        Checks whether `target` can be reused. Costs two stat calls unless the source was touched without its size
+        changing, in which case the source is hashed once. A tuple of targets (with a matching tuple of configs) is
+        up to date only if every target is.
+        """
+        if isinstance(target, tuple):
+            return all(self.is_up_to_date(source, *pair) for pair in zip(target, config))
+
+        if isinstance(config, tuple):
+            config = list(config)  # Stored as a JSON list, e.g. all the configurations of a folder of outputs
+        entry = self.entries.get(self._key(target))
+        if entry is None or entry["config"] != config or entry["source"] != self._key(source):
+            return False
+        if not os.path.exists(target):
+            return False
+
+        try:
+            stat = os.stat(source)
+        except OSError:
+            return False
+        if stat.st_size != entry["size"]:
+            return False
+        if stat.st_mtime_ns == entry["mtime"]:
+            return True
+
+        if self._source_hash(source, stat) != entry["sha256"]:
+            return False
+        entry["mtime"] = stat.st_mtime_ns  # Touched but unchanged; remember the new mtime to skip hashing next time
+        self._dirty = True
+        return True
+
+    def record(self, source, target, config=None):
+        """
+        Stores a successfully built target, or a tuple of targets with a matching tuple of configs.
+        """
+        stat = os.stat(source)
+        sha256 = self._source_hash(source, stat)
+        pairs = zip(target, config) if isinstance(target, tuple) else [(target, config)]
+        for target, config in pairs:
+            self.entries[self._key(target)] = {
+                "source": self._key(source),
+                "size": stat.st_size,
+                "mtime": stat.st_mtime_ns,
+                "sha256": sha256,
+                "config": config,
+            }
+        self._dirty = True
+
+    def _source_hash(self, source, stat):
+        """
+        SHA-256 of `source`, reused if it was hashed with the same size and mtime in this run or a previous one.
+        """
+        key = self._key(source)
+        fingerprint = (stat.st_size, stat.st_mtime_ns)
+        known = self._hashes.get(key)
+        if known is not None and known[:2] == fingerprint:
+            return known[2]
+        sha256 = self.file_hash(source)
+        self._hashes[key] = fingerprint + (sha256,)
+        return sha256
+
+    def save(self):
+        if not self._dirty:
+            return
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump({"version": 1, "targets": self.entries}, file, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
+        self._dirty = False
@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import socket
+
+# Thin client for server.py. It deliberately imports nothing but the standard library, so a call costs little more
+# than interpreter startup; all parsing happens in the already running server.
+
+
+def setup_parser():
+    parser = argparse.ArgumentParser(prog="Gaussian processor client",
+                                     description="Send conversion requests to a running 'script.py --serve' server")
+    parser.add_argument("--connect", type=str, required=True, metavar="SOCKET", help="Path to the server's socket")
+
+    input_group = parser.add_mutually_exclusive_group()
+    input_group.add_argument("--from-gaussian-out", type=str, help="Gaussian output file or directory")
+    input_group.add_argument("--from-xyz", type=str, help="XYZ file or directory")
+    input_group.add_argument("--from-gaussian-in", type=str, help="Gaussian input file or directory")
+
+    output_group = parser.add_mutually_exclusive_group()
+    output_group.add_argument("--to-spe", action="store_true")
+    output_group.add_argument("--to-opt", action="store_true")
+    output_group.add_argument("--to-xyz", action="store_true")
+    output_group.add_argument("--to-json", action="store_true")
+
+    parser.add_argument("--output", type=str, help="Output file (single input file only) or directory")
+    parser.add_argument("--config", type=str, help="Configuration(s): a single key, a list like 1,3,5 or 'all'")
+    parser.add_argument("--trajectory", action="store_true", help="With --to-xyz, write a multi-frame .xyz")
+    parser.add_argument("--keep-xyz", action="store_true",
+                        help="With --from-gaussian-out and --to-spe/--to-opt, also write the geometry to .xyz")
+    parser.add_argument("--mem", type=int, default=16, help="Memory in GB for generated inputs")
+    parser.add_argument("--nproc", type=int, default=10, help="Processors for generated inputs")
+    parser.add_argument("--stats", action="store_true", help="Print the server's request and cache counters")
+    parser.add_argument("--shutdown", action="store_true", help="Stop the server")
+    return parser
+
+
+def build_request(args):
+    """
+    Translates script.py-style flags into a server request.
+    """
+    if args.stats:
+        return {"op": "stats"}
+    if args.shutdown:
+        return {"op": "shutdown"}
+
+    calculation_type = "reopt" if args.to_opt else "spe"
+    if args.from_gaussian_out and args.to_xyz:
+        op, path = ("out_to_xyz_trajectory" if args.trajectory else "out_to_xyz"), args.from_gaussian_out
+    elif args.from_gaussian_out and args.to_json:
+        op, path = "out_to_json", args.from_gaussian_out
+    elif args.from_gaussian_out and (args.to_spe or args.to_opt) and args.config:
+        op, path = "out_to_com", args.from_gaussian_out
+    elif args.from_xyz and (args.to_spe or args.to_opt) and args.config:
+        op, path = "xyz_to_com", args.from_xyz
+    elif args.from_gaussian_in and args.to_xyz:
+        op, path = "com_to_xyz", args.from_gaussian_in
+    else:
+        return None
+
+    # The server does not share our working directory
+    return {"op": op, "input": os.path.abspath(path), "output": os.path.abspath(args.output) if args.output else None,
+            "config": args.config, "calculation_type": calculation_type, "mem": args.mem, "nproc": args.nproc,
+            "keep_xyz": args.keep_xyz}
+
+
+def send_request(socket_path, request):
+    """
+    Sends one request and waits for the response.
+    :return: Response dictionary.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        connection.sendall(json.dumps(request).encode() + b"\n")
+        with connection.makefile("rb") as response:
+            line = response.readline()
+    if not line:
+        raise ValueError("The server closed the connection without a response")
+    return json.loads(line)
+
+
+def run():
+    parser = setup_parser()
+    args = parser.parse_args()
+    request = build_request(args)
+    if request is None:
+        parser.print_help()
+        exit(1)
+
+    try:
+        response = send_request(args.connect, request)
+    except (OSError, ValueError) as e:
+        print(f"Error connecting to {args.connect}: {e}")
+        exit(2)
+
+    if "error" in response:
+        print(f"Error: {response['error']}")
+    for input_file, output_file in response.get("processed", []):
+        if isinstance(output_file, list):
+            output_file = ", ".join(output_file)
+        print(f"Processed {os.path.basename(input_file)} -> {output_file}")
+    for input_file, message in response.get("errors", []):
+        print(f"Error processing {os.path.basename(input_file)}: {message}")
+    if request["op"] == "stats":
+        print(json.dumps({key: value for key, value in response.items() if key != "ok"}))
+    exit(0 if response.get("ok") else 1)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,173 @@
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+def distance_spectrum(molecule):
+    """
+    Sorted list of all interatomic distances. It does not change when the molecule is rotated, translated or its atoms
+    are renumbered, so it serves as a fingerprint of the geometry.
+    """
+    coordinates = molecule.coordinates
+    points = list(zip(coordinates[0::3], coordinates[1::3], coordinates[2::3]))
+    distances = []
+    for i in range(1, len(points)):
+        point = points[i]
+        distances.extend(map(math.dist, points[:i], [point] * i))
+    distances.sort()
+    return array("d", distances)
+
+
+def spectrum_profile(spectrum, blocks=64):
+    """
+    Fixed-size summary of a sorted distance spectrum: the mean of each of `blocks` consecutive runs of (nearly) equal
+    length. Within a run, the squared differences between two spectra of the same length sum to at least the run
+    length times the squared difference of their means, so profiles are never further apart than the spectra.
+    :return: Tuple of (array("d") of run means, array("l") of run lengths); spectra up to `blocks` long are kept whole.
+    """
+    n = len(spectrum)
+    bounds = [k * n // blocks for k in range(blocks + 1)] if n > blocks else range(n + 1)
+    means = array("d")
+    lengths = array("l")
+    for start, stop in zip(bounds, bounds[1:]):
+        means.append(math.fsum(spectrum[start:stop]) / (stop - start))
+        lengths.append(stop - start)
+    return means, lengths
+
+
+def _centered(molecule):
+    """
+    :return: Tuple of (x, y, z) arrays of the coordinates relative to the centroid, and the sum of their squares.
+    """
+    coordinates = molecule.coordinates
+    n = len(molecule)
+    columns = []
+    for axis in range(3):
+        values = coordinates[axis::3]
+        mean = math.fsum(values) / n
+        columns.append(array("d", [value - mean for value in values]))
+    return columns, math.fsum(math.fsum(map(float.__mul__, column, column)) for column in columns)
+
+
+def _largest_eigenvalue(matrix, sweeps=50):
+    """
+    Largest eigenvalue of a symmetric 4x4 matrix by cyclic Jacobi rotations.
+    """
+    a = [row[:] for row in matrix]
+    for _ in range(sweeps):
+        off_diagonal = sum(a[p][q] * a[p][q] for p in range(4) for q in range(p + 1, 4))
+        if off_diagonal < 1e-22:
+            break
+        for p in range(3):
+            for q in range(p + 1, 4):
+                if abs(a[p][q]) < 1e-30:
+                    continue
+                theta = (a[q][q] - a[p][p]) / (2 * a[p][q])
+                t = math.copysign(1.0, theta) / (abs(theta) + math.sqrt(theta * theta + 1))
+                c = 1 / math.sqrt(t * t + 1)
+                s = t * c
+                for k in range(4):  # Rotate columns p and q
+                    akp, akq = a[k][p], a[k][q]
+                    a[k][p], a[k][q] = c * akp - s * akq, s * akp + c * akq
+                for k in range(4):  # ... and rows p and q
+                    apk, aqk = a[p][k], a[q][k]
+                    a[p][k], a[q][k] = c * apk - s * aqk, s * apk + c * aqk
+    return max(a[k][k] for k in range(4))
+
+
+def kabsch_rmsd(first, second):
+    """
+    RMSD in Angstrom between two geometries with the same atom order after optimal superposition (translation and
+    proper rotation), as given by the Kabsch algorithm. The optimal rotation is found with Horn's quaternion method,
+    which needs the largest eigenvalue of a 4x4 matrix instead of a 3x3 SVD.
+    """
+    if len(first) != len(second):
+        raise ValueError("The geometries have different numbers of atoms")
+    return _rmsd(_centered(first), _centered(second), len(first))
+
+
+def _rmsd(first, second, n):
+    (a, norm_a), (b, norm_b) = first, second
+    # Correlation matrix between the centered coordinate columns
+    (sxx, sxy, sxz), (syx, syy, syz), (szx, szy, szz) = [
+        [math.fsum(map(float.__mul__, a[i], b[j])) for j in range(3)] for i in range(3)]
+    matrix = [
+        [sxx + syy + szz, syz - szy, szx - sxz, sxy - syx],
+        [syz - szy, sxx - syy - szz, sxy + syx, szx + sxz],
+        [szx - sxz, sxy + syx, -sxx + syy - szz, syz + szy],
+        [sxy - syx, szx + sxz, syz + szy, -sxx - syy + szz],
+    ]
+    return math.sqrt(max(norm_a + norm_b - 2 * _largest_eigenvalue(matrix), 0.0) / n)
+
+
+class _Conformer:
+    __slots__ = ("name", "atomic_numbers", "distances", "profile", "mean_distance", "centered")
+
+    def __init__(self, name, molecule):
+        self.name = name
+        self.atomic_numbers = molecule.atomic_numbers
+        spectrum = distance_spectrum(molecule)  # Only its fixed-size profile is kept
+        self.distances = len(spectrum)
+        self.profile = spectrum_profile(spectrum)
+        self.mean_distance = math.fsum(spectrum) / len(spectrum) if spectrum else 0.0
+        self.centered = _centered(molecule) if len(molecule) else None
+
+
+class ConformerDeduplicator:
+    """
+    Finds geometries that duplicate one seen before. Geometries are bucketed by composition and indexed by their mean
+    interatomic distance; only those whose mean distance and distance spectrum are close enough to possibly be within
+    the threshold are superimposed. If two geometries are within `threshold` RMSD, their sorted distance spectra differ
+    by at most 2 * threshold (RMS), and so do their profiles (see spectrum_profile), which are kept instead of the
+    spectra so memory does not grow with the square of the number of atoms; the filters never discard a real duplicate.
+
+    RMSD is computed with the atoms in file order, as produced by conformer generators; geometries with the same
+    composition but a different atom order are not reported as duplicates.
+    """
+
+    def __init__(self, threshold=0.125):
+        """
+        :param threshold: RMSD in Angstrom at or below which two geometries are duplicates.
+        """
+        if threshold < 0:
+            raise ValueError("The duplicate threshold must not be negative")
+        self.threshold = threshold
+        self.duplicates = 0
+        self._buckets = {}  # Composition -> (sorted mean distances, conformers in the same order)
+
+    def check(self, name, molecule):
+        """
+        Compares a geometry with all geometries kept so far. Unique geometries are kept for later comparisons.
+        :param name: Name reported when a later geometry duplicates this one.
+        :return: Tuple of (name of the earlier geometry, RMSD) if it is a duplicate, otherwise None.
+        """
+        conformer = _Conformer(name, molecule)
+        key = (len(molecule), bytes(sorted(molecule.atomic_numbers.tobytes())))
+        means, conformers = self._buckets.setdefault(key, ([], []))
+
+        tolerance = 2 * self.threshold
+        start = bisect_left(means, conformer.mean_distance - tolerance)
+        stop = bisect_right(means, conformer.mean_distance + tolerance)
+        for candidate in conformers[start:stop]:
+            rmsd = self._compare(conformer, candidate, tolerance)
+            if rmsd is not None and rmsd <= self.threshold:
+                self.duplicates += 1
+                return candidate.name, rmsd
+
+        index = bisect_right(means, conformer.mean_distance)
+        means.insert(index, conformer.mean_distance)
+        conformers.insert(index, conformer)
+        return None
+
+    def _compare(self, conformer, candidate, tolerance):
+        if conformer.atomic_numbers != candidate.atomic_numbers:
+            return None
+        if conformer.centered is None:
+            return 0.0
+        n = conformer.distances
+        if n:
+            (means, lengths), (candidate_means, _) = conformer.profile, candidate.profile
+            difference = math.fsum(length * (x - y) ** 2 for x, y, length in zip(means, candidate_means, lengths))
+            if difference > tolerance * tolerance * n:
+                return None
+        return _rmsd(conformer.centered, candidate.centered, len(conformer.atomic_numbers))
@@ -0,0 +1,41 @@
+from dataclasses import dataclass, field
+
+from discovery import FileDiscovery
+
+
+@dataclass
+class ConversionOptions:
+    """
+    How a directory conversion runs, shared by the entry points of file_converter and to_com. script.py builds it
+    once from the command line; the defaults convert the top level of the directory one file at a time in the
+    current process.
+    """
+
+    jobs: int = 1  # Number of worker processes (0 uses all CPUs)
+    incremental: bool = False  # Skip inputs whose outputs are up to date according to the directory's build manifest
+    discovery: FileDiscovery = field(default_factory=FileDiscovery)  # Selects the input files
+    metrics: object = None  # Optional RunMetrics recording stage times and progress instead of per-file output
+    # If positive, overlap reading, parsing and writing with this many reads and writes in flight (see
+    # pipeline.run_pipeline) instead of converting one file at a time per worker
+    io_concurrency: int = 0
+    # Optional output_sinks.OutputSink that receives every output (an archive or atomic writes); the conversion then
+    # runs in the pipeline
+    sink: object = None
+
+    # Generated Gaussian inputs (to_com) only
+    mem_alloc: int = 16  # %mem in GB of the inputs of a configuration
+    nproc: int = 10  # %nprocshared of the inputs of a configuration
+    dedup: object = None  # Optional ConformerDeduplicator; geometries duplicating an earlier one get no .com files
+    # Optional GeometryCheck; geometries with clashing atoms or too many fragments are reported as errors and get no
+    # .com files
+    geometry_check: object = None
+    planner: object = None  # Optional ResourcePlanner choosing %mem and %nprocshared per molecule instead
+    frames: object = None  # Optional FrameSelection choosing the frames of multi-frame .xyz files (default: all)
+    keep_xyz: bool = False  # From Gaussian output and .fchk files, also write the geometry to <name>.xyz
+
+    @property
+    def pipelined(self):
+        """
+        True if the conversion runs in the pipeline rather than one file at a time per worker.
+        """
+        return self.io_concurrency > 0 or self.sink is not None
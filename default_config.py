@@ -113,6 +113,25 @@ class DefaultConfig:
         }
     }
 
+    @staticmethod
+    def select(defaults, keys):
+        """
+        Selects one or more configurations.
+        :param defaults: SPE_DEFAULTS or OPT_DEFAULTS
+        :param keys: A single key ("1"), a comma-separated list ("1,3,5") or "all"
+        :return: List of configurations in the requested order
+        """
+        if keys.strip().lower() == "all":
+            return list(defaults.values())
+
+        configs = []
+        for key in keys.split(","):
+            key = key.strip()
+            if key not in defaults:
+                raise ValueError(f"Unknown configuration: {key}")
+            configs.append(defaults[key])
+        return configs
+
     def __str__(self):
         output = ["SPE", "-" * 40]
         for key, config in self.SPE_DEFAULTS.items():
@@ -0,0 +1,108 @@
+import fnmatch
+import os
+import sys
+
+
+class FileDiscovery:
+    """
+    Finds the input files of a batch. By default only the top level of the data directory is listed, as before.
+    Nested trees can be walked recursively with include/exclude globs and a depth limit, or an explicit list of
+    files can be read from a manifest file or stdin (one path per line, or NUL-separated as produced by
+    `find -print0`).
+
+    Files are yielded as soon as they are found, built on os.scandir so that the file type comes from the directory
+    entry instead of an extra stat call per file.
+    """
+
+    READ_CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, recursive=False, include=None, exclude=None, max_depth=None, files_from=None,
+                 null_separated=False):
+        """
+        :param recursive: Descend into subdirectories.
+        :param include: Glob patterns; if given, a file must match one of them (by name or relative path).
+        :param exclude: Glob patterns for files and directories to skip (by name or relative path).
+        :param max_depth: Maximum directory depth below the data directory (0 = top level only).
+        :param files_from: Path of a file listing the inputs, or "-" for stdin. Replaces directory listing.
+        :param null_separated: The file list is NUL-separated instead of newline-separated.
+        """
+        self.recursive = recursive
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self.max_depth = max_depth
+        self.files_from = files_from
+        self.null_separated = null_separated
+
+    @property
+    def streaming(self):
+        """
+        True if the full set of files is not known up front, so work should start as files are found rather than
+        after sorting the whole list.
+        """
+        return self.recursive or self.files_from is not None
+
+    def iter_files(self, directory, match):
+        """
+        :param directory: Data directory to walk.
+        :param match: Predicate on the file name, e.g. lambda name: name.endswith(".xyz").
+        :return: Generator of file paths.
+        """
+        if self.files_from is not None:
+            for path in self._iter_listed_paths():
+                name = os.path.basename(path)
+                if match(name) and self._selected(name, path):
+                    yield path
+            return
+
+        stack = [(directory, 0)]
+        while stack:
+            path, depth = stack.pop()
+            try:
+                entries = os.scandir(path)
+            except OSError as e:
+                print(f"Error listing {path}: {e}")
+                continue
+            with entries:
+                for entry in entries:
+                    relative_path = os.path.relpath(entry.path, directory)
+                    if entry.is_dir(follow_symlinks=False):
+                        if self.recursive and (self.max_depth is None or depth < self.max_depth) \
+                                and not self._excluded(entry.name, relative_path):
+                            stack.append((entry.path, depth + 1))
+                    elif entry.is_file() and match(entry.name) and self._selected(entry.name, relative_path):
+                        yield entry.path
+
+    def _excluded(self, name, relative_path):
+        return any(fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(relative_path, pattern)
+                   for pattern in self.exclude)
+
+    def _selected(self, name, relative_path):
+        if self._excluded(name, relative_path):
+            return False
+        return not self.include or any(fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(relative_path, pattern)
+                                       for pattern in self.include)
+
+    def _iter_listed_paths(self):
+        separator = b"\0" if self.null_separated else b"\n"
+        if self.files_from == "-":
+            yield from self._split_stream(sys.stdin.buffer, separator)
+        else:
+            with open(self.files_from, "rb") as file:
+                yield from self._split_stream(file, separator)
+
+    def _split_stream(self, stream, separator):
+        """
+        Splits the list incrementally so the first paths are available before the whole list has been written.
+        """
+        pending = b""
+        while True:
+            chunk = stream.read1(self.READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            *paths, pending = (pending + chunk).split(separator)
+            for path in paths:
+                path = path.strip(b"\r") if not self.null_separated else path
+                if path:
+                    yield os.fsdecode(path)
+        if pending.strip():
+            yield os.fsdecode(pending.strip(b"\r\n") if not self.null_separated else pending)
@@ -0,0 +1,207 @@
+import mmap
+import os
+from array import array
+
+from log_io import compression_suffix, decompress, strip_compression
+from molecule import Molecule
+
+BOHR_TO_ANGSTROM = 0.52917721092  # The value Gaussian 16 uses
+
+FCHK_EXTENSIONS = (".fchk", ".fch")
+
+# Values per line and field width of the array types with a fixed layout (Fortran formats 6I12, 5E16.8 and 5A12)
+_ARRAY_LAYOUTS = {"I": (6, 12), "R": (5, 16), "C": (5, 12)}
+_TYPES = b"IRCHL"
+
+
+def is_fchk_file(filename):
+    """
+    Formatted checkpoint files, optionally .gz/.bz2/.xz compressed.
+    """
+    return strip_compression(filename).lower().endswith(FCHK_EXTENSIONS)
+
+
+def _is_header(line):
+    # "Name (A40)   T   N=  count" or "Name (A40)   T     value"
+    return len(line) > 44 and line[:1] != b" " and line[40:43] == b"   " and line[43] in _TYPES
+
+
+class FchkFile:
+    """
+    Random access to the named sections of a formatted checkpoint file. Opening the file only reads the two header
+    lines; the table of contents is built on first use by hopping from one section header to the next, skipping each
+    array by its length (count x field width) instead of reading it. Arrays are converted on request with one split of
+    their bytes and kept, so reading the geometry of a file with a large Hessian never touches the Hessian.
+
+    Usage:
+        with FchkFile("job.fchk") as fchk:
+            molecule = fchk.molecule()
+            hessian = fchk.value("Cartesian Force Constants")
+    """
+
+    def __init__(self, source, data=None):
+        """
+        :param source: Path to the .fchk file (compressed files are decompressed into memory).
+        :param data: Raw contents of `source`, if already read (e.g. by a pipeline); the file is then not opened.
+        """
+        self.path = source
+        self._file = None
+        if data is not None:
+            self._mapped = decompress(source, data)
+        elif compression_suffix(source):
+            with open(source, "rb") as file:
+                self._mapped = decompress(source, file.read())
+        else:
+            self._file = open(source, "rb")
+            size = os.fstat(self._file.fileno()).st_size
+            self._mapped = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self._contents = None
+        self._values = {}
+
+        title_end = self._line_end(0)
+        route_end = self._line_end(title_end + 1)
+        self.title = self._mapped[:title_end].decode("ascii", errors="replace").strip()
+        route = self._mapped[title_end + 1:route_end].decode("ascii", errors="replace")
+        # Job type (A10), method (A30) and basis set (A30)
+        self.job_type, self.method, self.basis_set = route[:10].strip(), route[10:40].strip(), route[40:70].strip()
+        self._sections_start = route_end + 1
+
+    def close(self):
+        if isinstance(self._mapped, mmap.mmap):
+            self._mapped.close()
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _line_end(self, position):
+        end = self._mapped.find(b"\n", position)
+        return end if end != -1 else len(self._mapped)
+
+    def _table_of_contents(self):
+        """
+        :return: Dict of section name -> (type, number of values or None for scalars, start, end), where start:end
+                 are the bytes of the value (scalars) or of the array block.
+        """
+        if self._contents is not None:
+            return self._contents
+        mapped = self._mapped
+        size = len(mapped)
+        contents = {}
+        position = self._sections_start
+        while position < size:
+            end = self._line_end(position)
+            line = mapped[position:end]
+            if not _is_header(line):
+                position = end + 1
+                continue
+            name, kind = line[:40].rstrip().decode("ascii", errors="replace"), chr(line[43])
+            if line[47:49] != b"N=":
+                contents[name] = (kind, None, position + 49, end)
+                position = end + 1
+                continue
+
+            count, start = int(line[49:]), end + 1
+            layout = _ARRAY_LAYOUTS.get(kind)
+            if layout is not None:
+                per_line, width = layout
+                newline = 2 if line.endswith(b"\r") else 1
+                block_end = start + count * width + -(-count // per_line) * newline  # Values plus line ends
+                if block_end >= size or _is_header(mapped[block_end:self._line_end(block_end)]):
+                    contents[name] = (kind, count, start, min(block_end, size))
+                    position = block_end
+                    continue
+            # Logical and Hollerith arrays, or lines that do not match the layout: read on to the next header
+            position = start
+            while position < size and not _is_header(mapped[position:self._line_end(position)]):
+                position = self._line_end(position) + 1
+            contents[name] = (kind, count, start, min(position, size))
+        self._contents = contents
+        return contents
+
+    def names(self):
+        return list(self._table_of_contents())
+
+    def __contains__(self, name):
+        return name in self._table_of_contents()
+
+    def value(self, name):
+        """
+        :return: The value of a section: int, float or str for scalars; array("q") for integer arrays, array("d")
+                 for real arrays, str for character arrays and a list of bools for logical arrays.
+        """
+        if name in self._values:
+            return self._values[name]
+        try:
+            kind, count, start, end = self._table_of_contents()[name]
+        except KeyError:
+            raise ValueError(f"Section not found in the formatted checkpoint file: {name}") from None
+        raw = self._mapped[start:end]
+        if kind in "CH":
+            value = b"".join(line.rstrip(b"\r") for line in raw.split(b"\n")).decode("ascii", errors="replace").strip()
+        elif kind == "L":
+            value = [flag == ord("T") for flag in raw.translate(None, b" \r\n")]  # Packed (72L1) or spaced
+        elif kind == "I":
+            value = array("q", map(int, raw.split())) if count is not None else int(raw)
+        else:
+            value = array("d", map(float, raw.split())) if count is not None else float(raw)
+        if count is not None and kind not in "CH" and len(value) != count:
+            raise ValueError(f"{name}: expected {count} values, found {len(value)}")
+        self._values[name] = value
+        return value
+
+    def get(self, name, default=None):
+        return self.value(name) if name in self else default
+
+    @property
+    def charge(self):
+        return self.value("Charge")
+
+    @property
+    def multiplicity(self):
+        return self.value("Multiplicity")
+
+    @property
+    def energy(self):
+        """
+        Total energy in Hartree, or None if the file has none.
+        """
+        return self.get("Total Energy")
+
+    @property
+    def gradient(self):
+        """
+        Cartesian gradient in Hartree/Bohr (x, y, z per atom), or None.
+        """
+        return self.get("Cartesian Gradient")
+
+    @property
+    def hessian(self):
+        """
+        Lower triangle of the Cartesian force constant matrix in Hartree/Bohr^2, row by row, or None.
+        """
+        return self.get("Cartesian Force Constants")
+
+    def molecule(self):
+        """
+        :return: Molecule with the current geometry, converted from Bohr to Angstrom.
+        """
+        atomic_numbers = self.value("Atomic numbers")
+        coordinates = array("d", [value * BOHR_TO_ANGSTROM for value in self.value("Current cartesian coordinates")])
+        return Molecule(array("b", atomic_numbers), coordinates, self.charge, self.multiplicity, self.title or None)
+
+
+def parse_fchk_geometry(file_path, data=None):
+    """
+    Extracts the current geometry of a formatted checkpoint file. Only the header lines and the charge,
+    multiplicity, atomic number and coordinate sections are read.
+    :param file_path: Path to the (optionally compressed) .fchk file
+    :param data: Raw contents of the file, if already read
+    :return: Molecule
+    """
+    with FchkFile(file_path, data) as fchk:
+        return fchk.molecule()
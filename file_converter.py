@@ -1,58 +1,332 @@
+import io
+import json
 import os
+from functools import partial
 
-from gaussian_parser import parse_gaussian_output, parse_gaussian_input
-from writer import write_xyz_file
+from batch_runner import run_batch
+from build_manifest import BuildManifest
+from conversion_options import ConversionOptions
+from fchk_reader import is_fchk_file, parse_fchk_geometry
+from gaussian_input import iter_gaussian_input_jobs
+from gaussian_parser import parse_gaussian_output, parse_gaussian_output_bytes
+from gaussian_scanner import parse_gaussian_properties, iter_gaussian_frames
+from log_io import (archive_member_directory, archive_output_directory, decompress, is_gaussian_output,
+                    is_tar_archive, iter_tar_outputs, output_base_name, strip_compression)
+from metrics import is_measuring, stage
+from pipeline import run_pipeline
+from writer import format_xyz_file, format_xyz_frame, write_xyz_file, write_xyz_trajectory
 
 
 def out_to_xyz(input_file, output_file):
     """
     Converts Gaussian output file to .xyz file.
-    :param input_file: "Path to the Gaussian output file."
+    :param input_file: "Path to the (optionally compressed) Gaussian output file, or an open text stream."
     :param output_file: "Path to the output .xyz file."
     """
-    coordinates = parse_gaussian_output(input_file)
-    write_xyz_file(coordinates, output_file)
+    with stage("parse"):
+        molecule = parse_gaussian_output(input_file)
+    write_xyz_file(molecule, output_file)
 
 
-def all_files_directory_out_to_xyz(directory):
+def all_files_directory_out_to_xyz(directory, options=None):
     """
-    Processes all Gaussian output files in the specified directory.
+    Processes all Gaussian output files in the specified directory, including .gz/.bz2/.xz compressed logs and
+    tar archives of logs, which are read without being extracted.
     :param directory: Path to the directory containing Gaussian output files.
+    :param options: ConversionOptions (default: the top level of the directory, one file at a time).
     """
-    for filename in os.listdir(directory):
-        if filename.endswith('.out'):
-            input_file = os.path.join(directory, filename)
-            base_name = os.path.splitext(filename)[0]  # Get the file name without extension
-            output_file = os.path.join(directory, f"{base_name}.xyz")
-            try:
-                out_to_xyz(input_file, output_file)
-                print(f"Processed {filename} -> {output_file}")
-            except ValueError as e:
-                print(f"Error processing {filename}: {e}")
+    _run_output_batch(directory, out_to_xyz, render_out_to_xyz, '.xyz', options)
+
+
+def out_to_xyz_trajectory(input_file, output_file):
+    """
+    Streams every geometry of a Gaussian optimization, scan or IRC into a multi-frame .xyz file.
+    :param input_file: "Path to the (optionally compressed) Gaussian output file, or an open text stream."
+    :param output_file: "Path to the output .xyz file."
+    """
+    with stage("parse"):  # Frames are parsed while they are written; format and write time is counted separately
+        write_xyz_trajectory(iter_gaussian_frames(input_file), output_file)
+
+
+def all_files_directory_out_to_xyz_trajectory(directory, options=None):
+    """
+    Writes a multi-frame <name>_trajectory.xyz for every Gaussian output file in the specified directory.
+    See all_files_directory_out_to_xyz for the parameters.
+    """
+    _run_output_batch(directory, out_to_xyz_trajectory, render_out_to_xyz_trajectory, '_trajectory.xyz', options)
+
+
+def out_to_json(input_file, output_file):
+    """
+    Extracts all supported properties from a Gaussian output file in one pass and writes them as JSON.
+    :param input_file: "Path to the (optionally compressed) Gaussian output file, or an open text stream."
+    :param output_file: "Path to the output .json file."
+    """
+    with stage("parse"):
+        record = parse_gaussian_properties(input_file)
+    with stage("format"):
+        content = json.dumps(record.to_dict(), indent=2)
+    with stage("write"), open(output_file, 'w') as file:
+        file.write(content)
+
+
+def all_files_directory_out_to_json(directory, options=None):
+    """
+    Writes a .json property record for every Gaussian output file in the specified directory.
+    See all_files_directory_out_to_xyz for the parameters.
+    """
+    _run_output_batch(directory, out_to_json, render_out_to_json, '.json', options)
 
 
 def com_to_xyz(input_file, output_file):
     """
-    Converts Gaussian input file to .xyz file.
+    Converts Gaussian input file to .xyz file. In a multi-job deck (--Link1--), the first job with a geometry is
+    written to `output_file` and every later one to <name>_job<N>.xyz next to it; jobs that read their geometry from
+    the checkpoint file are skipped.
     :param input_file: "Path to the Gaussian input file."
     :param output_file: "Path to the output .xyz file."
     """
-    coordinates = parse_gaussian_input(input_file)
-    write_xyz_file(coordinates, output_file)
+    with stage("parse"):  # Format and write time of each job is counted separately
+        for path, molecule in _input_job_molecules(iter_gaussian_input_jobs(input_file), output_file):
+            write_xyz_file(molecule, path)
+
+
+def _input_job_molecules(jobs, output_file):
+    """
+    Pairs the molecule of every job that has a geometry with its .xyz path.
+    """
+    base_name = os.path.splitext(output_file)[0]
+    found = False
+    for job in jobs:
+        if job.molecule is None:
+            continue
+        yield (f"{base_name}_job{job.index + 1}.xyz" if found else output_file), job.molecule
+        found = True
+    if not found:
+        raise ValueError("Coordinates not found in the file")
 
 
-def all_files_directory_com_to_xyz(directory):
+def all_files_directory_com_to_xyz(directory, options=None):
     """
     Processes all Gaussian input files in the specified directory.
     :param directory: Path to the directory containing Gaussian input files.
+    :param options: ConversionOptions (default: the top level of the directory, one file at a time).
+    """
+    options = options or ConversionOptions()
+    manifest = BuildManifest(directory) if options.incremental else None
+    tasks = _directory_tasks(directory, '.com', '.xyz', options.discovery)
+    _run(tasks, com_to_xyz, render_com_to_xyz, manifest, options)
+
+
+def fchk_to_xyz(input_file, output_file):
+    """
+    Converts the current geometry of a formatted checkpoint file to .xyz file.
+    :param input_file: "Path to the (optionally compressed) .fchk file."
+    :param output_file: "Path to the output .xyz file."
+    """
+    with stage("parse"):
+        molecule = parse_fchk_geometry(input_file)
+    write_xyz_file(molecule, output_file)
+
+
+def all_files_directory_fchk_to_xyz(directory, options=None):
+    """
+    Processes all formatted checkpoint (.fchk) files in the specified directory. See all_files_directory_com_to_xyz
+    for the parameters.
+    """
+    options = options or ConversionOptions()
+    manifest = BuildManifest(directory) if options.incremental else None
+    tasks = ((input_file, os.path.join(os.path.dirname(input_file), f"{output_base_name(input_file)}.xyz"))
+             for input_file in options.discovery.iter_files(directory, is_fchk_file))
+    _run(tasks, fchk_to_xyz, render_fchk_to_xyz, manifest, options)
+
+
+def _run(tasks, worker, renderer, manifest, options):
+    """
+    Runs the tasks through `renderer` in the pipeline if the options ask for it, otherwise through `worker` with
+    run_batch.
+    """
+    if options.pipelined:
+        run_pipeline(tasks, renderer, options.jobs, max(options.io_concurrency, 1), manifest, metrics=options.metrics,
+                     file_system=options.sink)
+    else:
+        run_batch(tasks, worker, options.jobs, manifest, largest_first=not options.discovery.streaming,
+                  metrics=options.metrics)
+
+
+def _run_output_batch(directory, converter, renderer, output_suffix, options):
+    """
+    Runs `converter` over every Gaussian output in the directory. Plain and compressed logs become one task each,
+    tar archives become one task that converts all of their members into a folder named after the archive
+    (without its archive suffix).
+    Outputs are written next to their inputs. With io_concurrency > 0, logs are converted by `renderer` in a
+    pipeline; archives are still streamed member by member by `converter`, unless a sink takes the outputs, in
+    which case their members are rendered too.
+    """
+    options = options or ConversionOptions()
+    sink, metrics = options.sink, options.metrics
+
+    def is_input(name):
+        return is_tar_archive(name) or is_gaussian_output(name)
+
+    # Archives are streamed into the sink in this process, so their members can be reported by their name in the sink
+    archive_options = ({"output_name": sink.output_name},) if sink is not None else ()
+
+    def tasks():
+        archive_directories = {}
+        for input_file in options.discovery.iter_files(directory, is_input):
+            input_directory, filename = os.path.split(input_file)
+            if is_tar_archive(filename):
+                try:
+                    output_directory = archive_output_directory(input_file, archive_directories)
+                except ValueError as e:
+                    (metrics.message if metrics is not None else print)(f"Error processing {filename}: {e}")
+                    continue
+                yield (input_file, output_directory) + archive_options
+            else:
+                yield input_file, os.path.join(input_directory, f"{output_base_name(filename)}{output_suffix}")
+
+    manifest = BuildManifest(directory) if options.incremental else None
+    if options.pipelined:
+        worker = partial(_render_output, renderer=renderer, converter=converter, output_suffix=output_suffix,
+                         to_sink=sink is not None)
+        worker.__name__ = converter.__name__
+        run_pipeline(tasks(), worker, options.jobs, max(options.io_concurrency, 1), manifest, metrics=metrics,
+                     should_read=lambda path: not is_tar_archive(path), file_system=sink,
+                     stream=is_tar_archive if sink is not None else None)
+        return
+
+    worker = partial(_convert_output, converter=converter, output_suffix=output_suffix)
+    worker.__name__ = converter.__name__
+    run_batch(tasks(), worker, options.jobs, manifest, largest_first=not options.discovery.streaming, metrics=metrics)
+
+
+def _member_output(output_file, member_name, output_suffix):
+    # Members are converted into <archive name>/<member path>, mirroring the layout inside the archive
+    return os.path.join(archive_member_directory(output_file, member_name),
+                        f"{output_base_name(member_name)}{output_suffix}")
+
+
+def _convert_output(input_file, output_file, converter, output_suffix):
+    if not is_tar_archive(input_file):
+        converter(input_file, output_file)
+        return
+
+    failed = 0
+    for member_name, stream in iter_tar_outputs(input_file):
+        try:
+            member_output = _member_output(output_file, member_name, output_suffix)
+            os.makedirs(os.path.dirname(member_output), exist_ok=True)
+            converter(stream, member_output)
+            if not is_measuring():  # Progress is reported per archive when metrics are collected
+                print(f"Processed {member_name} -> {member_output}")
+        except ValueError as e:
+            print(f"Error processing {member_name}: {e}")
+            failed += 1
+    if failed:
+        raise ValueError(f"{failed} archive member(s) could not be converted")
+
+
+def _render_output(input_file, output_file, data, renderer, converter, output_suffix, to_sink=False,
+                   output_name=None):
+    if data is None and to_sink:  # Tar archive, its members are yielded to the pipeline's sink
+        return _render_archive(input_file, output_file, renderer, output_suffix, output_name)
+    if data is None:  # Tar archive, not read by the pipeline
+        _convert_output(input_file, output_file, converter, output_suffix)
+        return []
+    return renderer(input_file, output_file, data)
+
+
+def _render_archive(input_file, output_file, renderer, output_suffix, output_name=None):
+    """
+    Yields the outputs of every member of a tar archive of logs, one member at a time. Members that fail are
+    reported, and the archive fails once the others are done.
+    :param output_name: The sink's output_name, giving the name each output is reported under.
+    """
+    failed = 0
+    for member_name, stream in iter_tar_outputs(input_file):
+        try:
+            member_output = _member_output(output_file, member_name, output_suffix)
+            # The stream is already decompressed, so the renderer gets the member name without compression suffix
+            outputs = renderer(strip_compression(member_name), member_output, stream.buffer.read())
+        except ValueError as e:
+            print(f"Error processing {member_name}: {e}")
+            failed += 1
+            continue
+        yield from outputs
+        if not is_measuring():
+            print(f"Processed {member_name} -> {output_name(member_output) if output_name else member_output}")
+    if failed:
+        raise ValueError(f"{failed} archive member(s) could not be converted")
+
+
+def _decode(input_file, data):
+    return decompress(input_file, data).decode("utf-8", errors="replace")
+
+
+def render_out_to_xyz(input_file, output_file, data):
+    """
+    out_to_xyz on the raw contents of the input file, for pipelined runs.
+    :return: List of (output path, contents) tuples.
+    """
+    with stage("parse"):
+        molecule = parse_gaussian_output_bytes(decompress(input_file, data))
+    with stage("format"):
+        return [(output_file, format_xyz_file(molecule, output_file))]
+
+
+def render_out_to_xyz_trajectory(input_file, output_file, data):
+    """
+    out_to_xyz_trajectory on the raw contents of the input file, for pipelined runs.
+    :return: List of (output path, contents) tuples.
+    """
+    base_name = os.path.splitext(os.path.basename(output_file))[0]
+    frames = []
+    with stage("parse"):
+        for frame in iter_gaussian_frames(io.StringIO(_decode(input_file, data))):
+            with stage("format"):
+                frames.append(format_xyz_frame(frame, base_name))
+    if not frames:
+        raise ValueError("No geometries found in the file")
+    return [(output_file, "".join(frames))]
+
+
+def render_out_to_json(input_file, output_file, data):
+    """
+    out_to_json on the raw contents of the input file, for pipelined runs.
+    :return: List of (output path, contents) tuples.
+    """
+    with stage("parse"):
+        record = parse_gaussian_properties(io.StringIO(_decode(input_file, data)))
+    with stage("format"):
+        return [(output_file, json.dumps(record.to_dict(), indent=2))]
+
+
+def render_com_to_xyz(input_file, output_file, data):
+    """
+    com_to_xyz on the raw contents of the input file, for pipelined runs.
+    :return: List of (output path, contents) tuples.
+    """
+    with stage("parse"):
+        jobs = iter_gaussian_input_jobs(io.StringIO(data.decode("utf-8", errors="replace")))
+        return [(path, format_xyz_file(molecule, path)) for path, molecule in _input_job_molecules(jobs, output_file)]
+
+
+def render_fchk_to_xyz(input_file, output_file, data):
+    """
+    fchk_to_xyz on the raw contents of the input file, for pipelined runs.
+    :return: List of (output path, contents) tuples.
+    """
+    with stage("parse"):
+        molecule = parse_fchk_geometry(input_file, data)
+    with stage("format"):
+        return [(output_file, format_xyz_file(molecule, output_file))]
+
+
+def _directory_tasks(directory, input_extension, output_extension, discovery):
+    """
+    Lazily pairs every file with `input_extension` found by `discovery` with its output path next to it.
     """
-    for filename in os.listdir(directory):
-        if filename.endswith('.com'):
-            input_file = os.path.join(directory, filename)
-            base_name = os.path.splitext(filename)[0]  # Get the file name without extension
-            output_file = os.path.join(directory, f"{base_name}.xyz")
-            try:
-                com_to_xyz(input_file, output_file)
-                print(f"Processed {filename} -> {output_file}")
-            except ValueError as e:
-                print(f"Error processing {filename}: {e}")
+    for input_file in discovery.iter_files(directory, lambda name: name.endswith(input_extension)):
+        base_name = os.path.splitext(input_file)[0]  # Get the file path without extension
+        yield input_file, f"{base_name}{output_extension}"
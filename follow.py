@@ -0,0 +1,109 @@
+import os
+import time
+
+from gaussian_scanner import GaussianOutputScanner
+
+
+class FollowedLog:
+    """
+    Incrementally parses a Gaussian output file that is still being written. The byte offset and the scanner state
+    are kept between polls, so each poll only reads and parses the bytes appended since the previous one. The new
+    bytes are read in chunks of READ_CHUNK_SIZE, so the first poll of a large log does not load it whole.
+    """
+
+    READ_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, path):
+        self.path = path
+        self._reset()
+
+    def _reset(self):
+        self.offset = 0
+        self.finished = False
+        self.scanner = GaussianOutputScanner(collect_frames=True)
+        self._partial_line = b""
+        self._energies_reported = 0
+
+    def poll(self):
+        """
+        Reads the newly appended output. The log is finished at an error termination, which ends a Link1 chain, or
+        when nothing was appended since a normal termination by the next poll. A normal termination followed by a
+        Link1 line only ends one step of the chain (e.g. the opt of an opt+freq job), so the log is followed on.
+        :return: Tuple of (new GaussianFrame objects, new SCF energies).
+        """
+        if self.finished:
+            return [], []
+
+        size = os.path.getsize(self.path)
+        if size < self.offset:  # The file was truncated or the job restarted; start over
+            self._reset()
+        if size == self.offset:
+            if self.scanner.record.termination is not None:  # No Link1 job followed the normal termination
+                return self._finish(), []
+            return [], []
+
+        scanner = self.scanner
+        with open(self.path, 'rb') as file:
+            file.seek(self.offset)
+            remaining = size - self.offset
+            while remaining > 0:
+                data = file.read(min(remaining, self.READ_CHUNK_SIZE))
+                if not data:
+                    break
+                remaining -= len(data)
+                self.offset += len(data)
+                # Only feed complete lines; keep a partially written last line for the next chunk or poll
+                complete, newline, self._partial_line = (self._partial_line + data).rpartition(b"\n")
+                for line in (complete + newline).decode("utf-8", errors="replace").splitlines(True):
+                    scanner.feed(line)
+
+        record = scanner.record
+        energies = record.scf_energies[self._energies_reported:]
+        self._energies_reported = len(record.scf_energies)
+        if record.termination == "error":
+            return self._finish(), energies
+        return scanner.pop_frames(), energies
+
+    def _finish(self):
+        self.scanner.finish()
+        self.finished = True
+        return self.scanner.pop_frames()
+
+
+def follow_directory(directory, poll_interval=10.0, max_polls=None):
+    """
+    Watches the Gaussian output files in a directory and prints new frames and energies as they appear. A file is
+    no longer polled once it reaches an error termination, or a normal termination that no Link1 job follows by the
+    next poll. Output files created while following are picked up on the next poll.
+    :param directory: Path to the directory containing Gaussian output files.
+    :param poll_interval: Seconds between polls.
+    :param max_polls: Stop after this many polls (default: until there is at least one file and every file
+        has terminated).
+    """
+    logs = {}
+    polls = 0
+    while True:
+        for filename in os.listdir(directory):
+            if filename.endswith('.out') and filename not in logs:
+                logs[filename] = FollowedLog(os.path.join(directory, filename))
+
+        for filename, log in sorted(logs.items()):
+            if log.finished:
+                continue
+            try:
+                frames, energies = log.poll()
+            except OSError as e:
+                print(f"Error processing {filename}: {e}")
+                continue
+            for energy in energies:
+                print(f"{filename}: SCF Done E={energy:.9f}")
+            for frame in frames:
+                print(f"{filename}: {frame.label()}")
+            if log.finished:
+                print(f"{filename}: {log.scanner.record.termination} termination")
+
+        polls += 1
+        # An empty directory keeps being watched until the first log appears
+        if (logs and all(log.finished for log in logs.values())) or (max_polls is not None and polls >= max_polls):
+            break
+        time.sleep(poll_interval)
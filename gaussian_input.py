@@ -0,0 +1,252 @@
+import re
+from array import array
+from functools import lru_cache
+
+from log_io import open_text
+from molecule import Molecule
+from periodic_data import PeriodicData
+
+_ELEMENT = re.compile(r"([A-Za-z]{1,2}|\d{1,3})")
+_INTEGER = re.compile(r"^[+-]?\d+$")
+_SEPARATORS = re.compile(r"[\s,]+")
+
+
+@lru_cache(maxsize=1024)  # Inputs repeat a handful of labels; bounded so long-running servers do not grow with them
+def _atomic_number(label):
+    """
+    :return: Atomic number of an atom label such as "C", "6", "C12", "C-CA--0.1" (element-type-charge) or "Hx";
+             two letters are read as the element only if they name one. Ghost atoms ("Bq", "Bq1", "C-Bq") and dummy
+             atoms ("X", "X2") are 0, so that the molecule keeps their label instead of reading "Bq" as boron or
+             "C-Bq" as a real carbon atom.
+    """
+    match = _ELEMENT.match(label)
+    if match is None:
+        raise ValueError(f"Invalid atom label: {label}")
+    element = match.group(1)
+    if element.isdigit():
+        return PeriodicData.convert_element_symbol_to_number(element)
+    if element.lower() in ("bq", "x") or label.lower().split("-")[1:2] == ["bq"]:
+        return 0
+    atomic_number = (PeriodicData.SYMBOL_TO_NUMBER.get(element.capitalize())
+                     or PeriodicData.SYMBOL_TO_NUMBER.get(element[0].upper()))
+    if atomic_number is None:
+        raise ValueError(f"Unknown element: {label}")
+    return atomic_number
+
+
+class GaussianInputJob:
+    """
+    One job of a Gaussian input file. Sections that the job does not have stay None (or empty).
+    """
+
+    def __init__(self, index):
+        self.index = index  # 0 for the first job, 1 for the job after the first --Link1--, ...
+        self.link0 = {}  # Link0 command (lower case, without %) -> value, or None for commands like %NoSave
+        self.route = ""
+        self.title = ""
+        self.charge_multiplicity = []  # (charge, multiplicity) pairs; several for ONIOM, the first is the real system
+        self.molecule = None  # None if the geometry is read from the checkpoint file
+        self.freeze_flags = None  # Per-atom optimization flags (0, -1, ...) if the coordinate lines have them
+        self.oniom_layers = None  # Per-atom ONIOM layer (H, M, L) if given
+        self.connectivity = None  # Raw sections after the geometry, as selected by the route
+        self.modredundant = None
+        self.basis = None
+        self.ecp = None
+        self.extra_sections = []
+
+    @property
+    def charge(self):
+        return self.charge_multiplicity[0][0] if self.charge_multiplicity else None
+
+    @property
+    def multiplicity(self):
+        return self.charge_multiplicity[0][1] if self.charge_multiplicity else None
+
+    def route_has(self, pattern):
+        return re.search(pattern, self.route, re.IGNORECASE) is not None
+
+
+class GaussianInputScanner:
+    """
+    Line-driven parser of Gaussian input files: Link0 commands, route section, title, charge/multiplicity, the
+    Cartesian coordinate block (with optional freeze flags and ONIOM layers), the sections that follow it
+    (connectivity, ModRedundant, Gen/GenECP basis and ECP) and --Link1-- job separators. Atoms are converted to arrays
+    as their lines arrive, so a 50k-atom geometry is never held as text.
+
+    Usage:
+        scanner = GaussianInputScanner()
+        for line in file:
+            scanner.feed(line)
+            yield from scanner.pop_jobs()
+        scanner.finish()
+        yield from scanner.pop_jobs()
+    """
+
+    def __init__(self):
+        self.completed_jobs = []
+        self._job_count = 0
+        self._start_job()
+
+    def _start_job(self):
+        self._job = GaussianInputJob(self._job_count)
+        self._job_count += 1
+        self._state = self._read_link0
+        self._route_parts = []
+        self._title_parts = []
+        self._section = []
+        self._sections = []
+        self._atomic_numbers = array("b")
+        self._coordinates = array("d")
+        self._labels = {}  # Atom index -> label of ghost and dummy atoms
+        self._freeze_flags = []
+        self._layers = []
+        self._has_content = False
+
+    def feed(self, line):
+        stripped = line.strip()
+        if stripped.lower() == "--link1--":
+            self._finish_job()
+            return
+        if stripped.startswith("!"):  # Comment line
+            return
+        if stripped:
+            self._has_content = True
+        self._state(stripped)
+
+    def pop_jobs(self):
+        """
+        Returns the jobs completed since the last call.
+        """
+        jobs = self.completed_jobs
+        self.completed_jobs = []
+        return jobs
+
+    def finish(self):
+        """
+        Call at EOF to complete the last job.
+        """
+        if self._has_content:
+            self._finish_job()
+
+    def _read_link0(self, line):
+        if not line:
+            return
+        if line.startswith("%"):
+            command, _, value = line[1:].partition("=")
+            self._job.link0[command.strip().lower()] = value.strip() or None
+        elif line.startswith("#"):
+            self._route_parts.append(line)
+            self._state = self._read_route
+        else:
+            raise ValueError(f"Expected a Link0 command or the route section, found: {line}")
+
+    def _read_route(self, line):
+        if line:
+            self._route_parts.append(line)
+            return
+        job = self._job
+        job.route = " ".join(self._route_parts)
+        if job.route_has(r"allcheck"):  # Title, charge/multiplicity and geometry all come from the checkpoint
+            self._state = self._read_sections
+        else:
+            self._state = self._read_title
+
+    def _read_title(self, line):
+        if line:
+            self._title_parts.append(line)
+        elif self._title_parts:
+            self._job.title = "\n".join(self._title_parts)
+            self._state = self._read_charge_multiplicity
+
+    def _read_charge_multiplicity(self, line):
+        if not line:
+            return
+        values = _SEPARATORS.split(line)
+        if len(values) < 2 or len(values) % 2 or not all(_INTEGER.match(value) for value in values):
+            raise ValueError(f"Invalid charge and multiplicity line: {line}")
+        values = [int(value) for value in values]
+        self._job.charge_multiplicity = list(zip(values[0::2], values[1::2]))
+        self._state = self._read_atoms
+
+    def _read_atoms(self, line):
+        if not line:
+            self._state = self._read_sections
+            return
+        fields = _SEPARATORS.split(line) if "," in line else line.split()
+        atomic_number = _atomic_number(fields[0])
+        if len(fields) == 4:  # Fast path: "El x y z"
+            start = 1
+        else:  # "El flag x y z", either followed by an ONIOM layer (and link atom)
+            start = 2 if len(fields) >= 5 and _INTEGER.match(fields[1]) else 1
+        try:
+            self._coordinates.extend((float(fields[start]), float(fields[start + 1]), float(fields[start + 2])))
+        except (IndexError, ValueError):
+            raise ValueError(f"Only Cartesian coordinates are supported, found: {line}") from None
+        if atomic_number == 0:
+            self._labels[len(self._atomic_numbers)] = fields[0]
+        self._atomic_numbers.append(atomic_number)
+        if start == 2:
+            self._freeze_flags.append(int(fields[1]))
+        if len(fields) > start + 3 and fields[start + 3].upper() in ("H", "M", "L"):
+            self._layers.append(fields[start + 3].upper())
+
+    def _read_sections(self, line):
+        if line:
+            self._section.append(line)
+        elif self._section:
+            self._sections.append("\n".join(self._section) + "\n")
+            self._section = []
+
+    def _finish_job(self):
+        job = self._job
+        if self._state == self._read_route:
+            self._read_route("")
+        if self._state == self._read_title and self._title_parts:
+            self._read_title("")
+        if self._state in (self._read_link0, self._read_route, self._read_title):
+            raise ValueError(f"Job {job.index + 1} ends before its molecule specification")
+        self._read_sections("")
+
+        n_atoms = len(self._atomic_numbers)
+        if n_atoms:
+            charge, multiplicity = job.charge_multiplicity[0]
+            job.molecule = Molecule(self._atomic_numbers, self._coordinates, charge, multiplicity, job.title or None,
+                                    self._labels)
+            if len(self._freeze_flags) == n_atoms:
+                job.freeze_flags = self._freeze_flags
+            if len(self._layers) == n_atoms:
+                job.oniom_layers = self._layers
+        elif not job.route_has(r"geom\s*[=(]\s*\(?\s*(all)?check|allcheck"):
+            raise ValueError(f"No coordinates found in job {job.index + 1}")
+
+        sections = self._sections
+        if job.route_has(r"geom\s*[=(][^ ]*connectivity") and sections:
+            job.connectivity = sections.pop(0)
+        if job.route_has(r"modredundant") and sections:
+            job.modredundant = sections.pop(0)
+        if job.route_has(r"/\s*gen|\bgen(ecp)?\b") and sections:
+            job.basis = sections.pop(0)
+            if job.route_has(r"genecp|pseudo\s*=\s*read") and sections:
+                job.ecp = sections.pop(0)
+        job.extra_sections = sections
+
+        self.completed_jobs.append(job)
+        self._start_job()
+
+
+def iter_gaussian_input_jobs(file_path):
+    """
+    Lazily yields the jobs of a Gaussian input file, one --Link1-- section at a time, so concatenated decks with
+    thousands of jobs are parsed in constant memory.
+    :param file_path: Path to the input file (optionally .gz/.bz2/.xz compressed), an open text stream or a list of
+                      lines
+    :return: Generator of GaussianInputJob
+    """
+    scanner = GaussianInputScanner()
+    with open_text(file_path) as file:
+        for line in file:
+            scanner.feed(line)
+            if scanner.completed_jobs:
+                yield from scanner.pop_jobs()
+    scanner.finish()
+    yield from scanner.pop_jobs()
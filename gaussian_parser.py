@@ -1,41 +1,58 @@
+import mmap
+import os
 import re
 
-from periodic_data import PeriodicData
+from gaussian_input import iter_gaussian_input_jobs
+from gaussian_scanner import GaussianOutputScanner
+from log_io import compression_suffix, open_text
+from metrics import stage
+from molecule import Molecule
+
+_CHARGE_MULTIPLICITY = re.compile(rb'Charge\s*=\s*(-?\d+)\s+Multiplicity\s*=\s*(\d+)')
 
 
 def parse_gaussian_input(file_path):
-    coordinates = []
-    with open(file_path, "r") as file:
-        lines = file.readlines()
+    """
+    Parses G16 input file and extracts the molecule.
+    :param file_path: Path to the input file
+    :return: Molecule of the first job with a geometry (see gaussian_input.iter_gaussian_input_jobs for all jobs)
+    """
+    return _first_input_molecule(iter_gaussian_input_jobs(file_path))
 
-    start = None
-    for i, line in enumerate(lines):
-        if "0 1" in line:
-            start = i + 1
-            break
 
-    if start is None:
-        raise ValueError("Coordinates not found in the file")
+def parse_gaussian_input_lines(lines):
+    """
+    Extracts the molecule from the lines of a G16 input file.
+    :param lines: Iterable of lines
+    :return: Molecule of the first job with a geometry
+    """
+    return _first_input_molecule(iter_gaussian_input_jobs(lines))
 
-    for line in lines[start:]:
-        parts = line.split()
-        if len(parts) < 4:
-            break  # Stop when encountering a line that doesn't contain coordinate data
-        coordinates.append((parts[0], parts[1], parts[2], parts[3]))
 
-    return coordinates
+def _first_input_molecule(jobs):
+    for job in jobs:
+        if job.molecule is not None:
+            return job.molecule
+    raise ValueError("Coordinates not found in the file")
 
 
-def parse_gaussian_output(file_path):
+def parse_gaussian_output(file_path, reverse_scan=True):
     """
     Parses G16 output file and extracts atom coordinates.
-    :param file_path: Path to the output file
-    :return: List of tuples containing element symbol and its xyz coordinates.
+    :param file_path: Path to the output file, a .gz/.bz2/.xz compressed output file or an open text stream
+    :param reverse_scan: Memory-map the file and search backwards from the end for the final geometry instead of
+                         reading the whole file. Set to False to force a full forward read. Compressed files and
+                         streams cannot be searched backwards and are always decompressed and scanned forwards.
+    :return: Molecule
     """
+    if not isinstance(file_path, str) or compression_suffix(file_path):
+        return parse_gaussian_output_stream(file_path)
+    if reverse_scan:
+        return parse_gaussian_output_from_end(file_path)
 
-    coordinates = []
     with open(file_path, 'r') as file:
-        lines = file.readlines()
+        with stage("read"):
+            lines = file.readlines()
 
         # Find the start of the final geometry section. # Each time it finds a line
         # with "Standard orientation:", it updates the variable start to the current line index.
@@ -51,14 +68,133 @@ def parse_gaussian_output(file_path):
         start += 5
 
         # Extract coordinates
+        block = []
         for line in lines[start:]:
             if re.match(r'^\s*-+\s*$', line):  # End of the coordinates section
                 break
             parts = line.split()
             if len(parts) > 5 and parts[1].isdigit():
-                element_number = int(parts[1])
-                element_symbol = PeriodicData.convert_element_number_to_symbol(element_number)
-                x, y, z = parts[3:6]
-                coordinates.append((element_symbol, x, y, z))
+                block.append(line)
+
+    return Molecule.from_orientation_block("".join(block))
+
+
+def parse_gaussian_output_stream(file_path):
+    """
+    Extracts the final geometry in a single streaming forward pass, holding only one orientation block at a time.
+    :param file_path: Path to the (optionally compressed) output file or an open text stream
+    :return: Molecule
+    """
+    scanner = GaussianOutputScanner()
+    with open_text(file_path) as file:
+        for line in file:
+            scanner.feed(line)
+
+    if scanner.record.molecule is None:
+        raise ValueError("Standard orientation section not found in the file")
+    return scanner.record.molecule
+
+
+def parse_gaussian_output_from_end(file_path, archive_fallback=True):
+    """
+    Extracts the final geometry from a G16 output file by memory-mapping it and searching backwards from EOF for the
+    last "Standard orientation:" block. Only the bytes of that block are decoded, so time and memory depend on the
+    size of the last block rather than the size of the log.
+    :param file_path: Path to the output file
+    :param archive_fallback: If no orientation block exists, read the geometry from the archive entry at the end of
+                             the log instead.
+    :return: Molecule
+    """
+    with open(file_path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            raise ValueError("Standard orientation section not found in the file")
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return parse_gaussian_output_bytes(mapped, archive_fallback)
+
+
+def parse_gaussian_output_bytes(data, archive_fallback=True):
+    """
+    Extracts the final geometry from the contents of a G16 output file, searching backwards from the end for the
+    last standard orientation, or the last input orientation if the log has no standard orientation.
+    :param data: bytes or a memory map of the whole (uncompressed) log
+    :param archive_fallback: See parse_gaussian_output_from_end.
+    :return: Molecule
+    """
+    start = data.rfind(b"Standard orientation:")
+    if start == -1:  # nosymm jobs only print the input orientation
+        start = data.rfind(b"Input orientation:")
+    if start != -1:
+        molecule = _read_orientation_block(data, start)
+        # Charge and multiplicity of the job the geometry belongs to (after Link1, the last job's): the last charge
+        # line before it
+        end = start
+        position = data.rfind(b" Charge =", 0, end)
+        while position != -1:
+            match = _CHARGE_MULTIPLICITY.match(data, position + 1, end)
+            if match:
+                molecule.charge, molecule.multiplicity = int(match.group(1)), int(match.group(2))
+                break
+            end = position
+            position = data.rfind(b" Charge =", 0, end)
+        return molecule
+
+    if archive_fallback:
+        molecule = _read_archive_geometry(data)
+        if molecule is not None and len(molecule):
+            return molecule
+
+    raise ValueError("Standard orientation section not found in the file")
+
+
+def _read_orientation_block(mapped, start):
+    """
+    Reads the atom lines of the orientation block whose title line starts at byte offset `start`.
+    """
+    # Skip the title line and the four header lines
+    position = start
+    for _ in range(5):
+        position = mapped.find(b"\n", position) + 1
+        if position == 0:
+            raise ValueError("Orientation section is truncated")
+
+    # Atom lines never contain "--", so the closing dashed line marks the end of the block
+    end = mapped.find(b"--", position)
+    block = mapped[position:end if end != -1 else len(mapped)].decode("ascii", errors="replace")
+    if end == -1:  # Log still being written; drop a partial last line
+        block = block[:block.rfind("\n") + 1]
+
+    return Molecule.from_orientation_block(block)
+
+
+def _read_archive_geometry(mapped):
+    """
+    Reads the geometry from the last archive entry (the backslash-delimited summary at the end of a job).
+    :return: Molecule, or None if there is no archive entry.
+    """
+    start = mapped.rfind(b"1\\1\\GINC")
+    if start == -1:
+        return None
+    end = mapped.find(b"@", start)
+    if end == -1:
+        return None
+
+    # The archive is wrapped at 70 columns with a single leading space on every line
+    raw = mapped[start:end].decode("ascii", errors="replace")
+    archive = "".join(line[1:] if line.startswith(" ") else line for line in raw.splitlines())
+
+    sections = archive.split("\\\\")
+    if len(sections) < 4:
+        return None
+
+    entries = sections[3].split("\\")
+    charge, multiplicity = (int(value) for value in entries[0].split(",")[:2])
+    symbols, coordinates = [], []
+    for atom in entries[1:]:
+        fields = atom.split(",")
+        if len(fields) < 4:
+            continue
+        symbols.append(re.sub(r"[^A-Za-z]", "", fields[0]))
+        coordinates.extend(fields[-3:])
 
-    return coordinates
+    return Molecule.from_symbols(symbols, coordinates, charge=charge, multiplicity=multiplicity)
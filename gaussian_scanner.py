@@ -0,0 +1,282 @@
+import re
+
+from log_io import open_text
+from molecule import Molecule
+
+_DASHES = re.compile(r'^\s*-+\s*$')
+_FLOAT = re.compile(r'-?\d+\.\d+')
+_CHARGE_MULTIPLICITY = re.compile(r'Charge\s*=\s*(-?\d+)\s+Multiplicity\s*=\s*(\d+)')
+_SCAN_POINT = re.compile(r'on scan point\s+(\d+)')
+_IRC_POINT = re.compile(r'Point Number:\s*(\d+)\s+Path Number:\s*(\d+)')
+
+
+class GaussianOutputRecord:
+    """
+    Properties collected from a single Gaussian output file. Energies are in Hartree, frequencies in cm^-1.
+    Anything that is not present in the log stays None (or empty).
+    """
+
+    def __init__(self):
+        self.route = None
+        self.charge = None
+        self.multiplicity = None
+        self.scf_energies = []
+        self.zero_point_correction = None
+        self.enthalpy = None
+        self.free_energy = None
+        self.frequencies = []
+        self.mulliken_charges = []  # List of (element symbol, charge) tuples
+        self.homo = None  # Alpha orbitals
+        self.lumo = None
+        self.termination = None  # "normal", "error" or None if the job is still running or was killed
+        self.molecule = None  # Final geometry
+
+    @property
+    def scf_energy(self):
+        return self.scf_energies[-1] if self.scf_energies else None
+
+    def to_dict(self):
+        return {
+            "route": self.route,
+            "charge": self.charge,
+            "multiplicity": self.multiplicity,
+            "scf_energy": self.scf_energy,
+            "scf_energies": self.scf_energies,
+            "zero_point_correction": self.zero_point_correction,
+            "enthalpy": self.enthalpy,
+            "free_energy": self.free_energy,
+            "frequencies": self.frequencies,
+            "mulliken_charges": self.mulliken_charges,
+            "homo": self.homo,
+            "lumo": self.lumo,
+            "termination": self.termination,
+            "coordinates": [list(atom) for atom in self.molecule] if self.molecule is not None else [],
+        }
+
+
+class GaussianFrame:
+    """
+    One geometry of an optimization, relaxed scan or IRC, with the SCF energy computed at that geometry and, where
+    the log provides them, the scan point or IRC point/path it belongs to.
+    """
+
+    def __init__(self, index, molecule, from_standard_orientation):
+        self.index = index
+        self.molecule = molecule
+        self.from_standard_orientation = from_standard_orientation
+        self.energy = None
+        self.scan_point = None
+        self.irc_point = None
+        self.irc_path = None
+        self.converged = False
+
+    def label(self):
+        parts = [f"frame {self.index}"]
+        if self.scan_point is not None:
+            parts.append(f"scan point {self.scan_point}")
+        if self.irc_point is not None:
+            parts.append(f"IRC point {self.irc_point} path {self.irc_path}")
+        if self.converged:
+            parts.append("converged")
+        if self.energy is not None:
+            parts.append(f"E={self.energy:.9f}")
+        return " ".join(parts)
+
+
+class GaussianOutputScanner:
+    """
+    Line-driven state machine that extracts every supported property from a Gaussian output in one forward pass.
+    Only the block currently being read is buffered, so memory does not grow with the size of the log.
+
+    Usage:
+        scanner = GaussianOutputScanner()
+        for line in file:
+            scanner.feed(line)
+        record = scanner.record
+
+    With `collect_frames=True` every geometry is also turned into a GaussianFrame. A frame is complete once the next
+    geometry starts (or `finish()` is called at EOF); completed frames are handed out by `pop_frames()` so they can be
+    streamed without keeping the whole trajectory.
+    """
+
+    def __init__(self, collect_frames=False):
+        self.record = GaussianOutputRecord()
+        self.collect_frames = collect_frames
+        self.completed_frames = []
+        self._frame = None
+        self._frame_count = 0
+        self._state = None
+        self._skip = 0
+        self._block = []
+        self._block_is_standard = False
+        self._has_standard_orientation = False
+        self._route_parts = []
+        self._last_occupied = None
+        self._charge_multiplicity = None  # Of the current job, for its frames
+
+    def feed(self, line):
+        state = self._state
+        if state is not None:
+            state(line)
+            return
+
+        if "orientation:" in line:
+            if "Standard orientation:" in line:
+                self._start_orientation(True)
+            elif "Input orientation:" in line:
+                self._start_orientation(False)
+        elif line.startswith(" SCF Done:"):
+            energy = float(line.split("=")[1].split()[0])
+            self.record.scf_energies.append(energy)
+            if self._frame is not None and self._frame.energy is None:
+                self._frame.energy = energy
+        elif line.startswith(" Alpha  occ. eigenvalues --"):
+            self._last_occupied = float(_FLOAT.findall(line)[-1])
+        elif line.startswith(" Alpha virt. eigenvalues --"):
+            if self._last_occupied is not None:  # First virtual line after the occupied ones
+                self.record.homo = self._last_occupied
+                self.record.lumo = float(_FLOAT.findall(line)[0])
+                self._last_occupied = None
+        elif line.startswith(" Frequencies -- "):  # Not the " Frequencies ---" lines of freq=HPModes
+            self.record.frequencies.extend(float(value) for value in line.split("--")[1].split())
+        elif line.startswith(" Harmonic frequencies"):
+            self.record.frequencies = []  # A new frequency calculation replaces the previous one
+        elif line.startswith(" Mulliken charges:") or line.startswith(" Mulliken charges and spin densities:"):
+            self._block = []
+            self._state = self._read_mulliken
+        elif line.startswith(" Zero-point correction="):
+            self.record.zero_point_correction = float(line.split("=")[1].split()[0])
+        elif line.startswith(" Sum of electronic and thermal Enthalpies="):
+            self.record.enthalpy = float(line.split("=")[1])
+        elif line.startswith(" Sum of electronic and thermal Free Energies="):
+            self.record.free_energy = float(line.split("=")[1])
+        elif line.startswith(" #") and self.record.route is None:
+            self._route_parts = [line[1:].rstrip("\n")]
+            self._state = self._read_route
+        elif line.startswith(" Charge ="):
+            match = _CHARGE_MULTIPLICITY.search(line)
+            if match:
+                self._charge_multiplicity = int(match.group(1)), int(match.group(2))
+                if self.record.charge is None:
+                    self.record.charge, self.record.multiplicity = self._charge_multiplicity
+        elif self._frame is not None and "scan point" in line:
+            match = _SCAN_POINT.search(line)
+            if match:
+                self._frame.scan_point = int(match.group(1))
+        elif self._frame is not None and line.startswith(" Point Number:"):
+            match = _IRC_POINT.search(line)
+            if match:
+                self._frame.irc_point = int(match.group(1))
+                self._frame.irc_path = int(match.group(2))
+        elif self._frame is not None and line.startswith(" Optimization completed"):
+            self._frame.converged = True
+        elif line.startswith(" Normal termination"):
+            self.record.termination = "normal"
+        elif line.startswith(" Error termination"):
+            self.record.termination = "error"
+        elif line.startswith(" Link1:"):
+            self.record.termination = None  # The next job of the chain is running
+
+    def _start_orientation(self, is_standard):
+        self._block = []
+        self._block_is_standard = is_standard
+        self._skip = 4  # Header lines between the title and the first atom
+        self._state = self._read_orientation
+
+    def _read_orientation(self, line):
+        if self._skip:
+            self._skip -= 1
+            return
+        if _DASHES.match(line):
+            self._state = None
+            self._finish_orientation()
+            return
+        self._block.append(line)
+
+    def _finish_orientation(self):
+        record = self.record
+        molecule = Molecule.from_orientation_block("".join(self._block))
+        if self._charge_multiplicity is not None:  # A Link1 job may change charge or multiplicity
+            molecule.charge, molecule.multiplicity = self._charge_multiplicity
+
+        if self._block_is_standard:
+            self._has_standard_orientation = True
+        # The final geometry is the last standard orientation, or the last input orientation when symmetry is off
+        if self._block_is_standard or not self._has_standard_orientation:
+            record.molecule = molecule
+
+        if self.collect_frames:
+            frame = self._frame
+            # Each step prints the input orientation followed by the standard orientation of the same geometry. The
+            # input orientation is kept for frames because it does not jump around between steps.
+            if (self._block_is_standard and frame is not None and frame.energy is None
+                    and not frame.from_standard_orientation):
+                return
+            self._close_frame()
+            self._frame = GaussianFrame(self._frame_count, molecule, self._block_is_standard)
+            self._frame_count += 1
+
+    def _close_frame(self):
+        if self._frame is not None:
+            self.completed_frames.append(self._frame)
+            self._frame = None
+
+    def pop_frames(self):
+        """
+        Returns the frames completed since the last call.
+        """
+        frames = self.completed_frames
+        self.completed_frames = []
+        return frames
+
+    def finish(self):
+        """
+        Call at EOF to complete the last frame.
+        """
+        self._close_frame()
+
+    def _read_route(self, line):
+        if _DASHES.match(line):
+            self.record.route = "".join(self._route_parts).strip()
+            self._state = None
+        else:
+            self._route_parts.append(line[1:].rstrip("\n"))
+
+    def _read_mulliken(self, line):
+        if line.startswith(" Sum of Mulliken"):
+            self.record.mulliken_charges = self._block
+            self._state = None
+            return
+        parts = line.split()
+        if len(parts) >= 3 and parts[0].isdigit():
+            self._block.append((parts[1], float(parts[2])))
+
+
+def parse_gaussian_properties(file_path):
+    """
+    Reads a G16 output file once and collects energies, thermochemistry, frequencies, Mulliken charges, HOMO/LUMO,
+    termination status, route section, charge/multiplicity and the final geometry.
+    :param file_path: Path to the output file (optionally .gz/.bz2/.xz compressed) or an open text stream
+    :return: GaussianOutputRecord
+    """
+    scanner = GaussianOutputScanner()
+    with open_text(file_path) as file:
+        for line in file:
+            scanner.feed(line)
+    return scanner.record
+
+
+def iter_gaussian_frames(file_path):
+    """
+    Lazily yields every geometry of a G16 optimization, relaxed scan or IRC as a GaussianFrame, in file order.
+    Frames are yielded as soon as they are complete, so memory stays bounded by a single frame.
+    :param file_path: Path to the output file (optionally .gz/.bz2/.xz compressed) or an open text stream
+    """
+    scanner = GaussianOutputScanner(collect_frames=True)
+    with open_text(file_path) as file:
+        for line in file:
+            scanner.feed(line)
+            if scanner.completed_frames:
+                yield from scanner.pop_frames()
+    scanner.finish()
+    yield from scanner.pop_frames()
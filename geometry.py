@@ -0,0 +1,156 @@
+import math
+
+from periodic_data import PeriodicData
+
+# Offsets of the 13 neighbouring cells "after" a cell; visiting only these visits every pair of cells once
+_HALF_SHELL = [(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1) if (dx, dy, dz) > (0, 0, 0)]
+
+
+def neighbor_pairs(molecule, cutoff):
+    """
+    Finds all pairs of atoms closer than `cutoff` with a cell list: atoms are binned into cubic cells of edge `cutoff`,
+    and only atoms in the same or adjacent cells are compared. Time grows linearly with the number of atoms (for the
+    bounded density of real molecules) instead of quadratically.
+    :return: List of (i, j, squared distance) tuples with i < j.
+    """
+    coordinates = molecule.coordinates
+    xs, ys, zs = coordinates[0::3], coordinates[1::3], coordinates[2::3]
+    cells = {}
+    for i, (x, y, z) in enumerate(zip(xs, ys, zs)):
+        cells.setdefault((math.floor(x / cutoff), math.floor(y / cutoff), math.floor(z / cutoff)), []).append(i)
+
+    cutoff_squared = cutoff * cutoff
+    pairs = []
+    for (cx, cy, cz), members in cells.items():
+        for a, i in enumerate(members):
+            xi, yi, zi = xs[i], ys[i], zs[i]
+            for j in members[a + 1:]:
+                distance_squared = (xs[j] - xi) ** 2 + (ys[j] - yi) ** 2 + (zs[j] - zi) ** 2
+                if distance_squared < cutoff_squared:
+                    pairs.append((i, j, distance_squared) if i < j else (j, i, distance_squared))
+        for dx, dy, dz in _HALF_SHELL:
+            others = cells.get((cx + dx, cy + dy, cz + dz))
+            if others is None:
+                continue
+            for i in members:
+                xi, yi, zi = xs[i], ys[i], zs[i]
+                for j in others:
+                    distance_squared = (xs[j] - xi) ** 2 + (ys[j] - yi) ** 2 + (zs[j] - zi) ** 2
+                    if distance_squared < cutoff_squared:
+                        pairs.append((i, j, distance_squared) if i < j else (j, i, distance_squared))
+    return pairs
+
+
+def connected_fragments(n_atoms, bonds):
+    """
+    Groups atoms into covalently connected fragments with a union-find.
+    :return: List of lists of atom indices, largest fragment first.
+    """
+    parent = list(range(n_atoms))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]  # Path halving
+            i = parent[i]
+        return i
+
+    for i, j in bonds:
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[root_j] = root_i
+
+    fragments = {}
+    for i in range(n_atoms):
+        fragments.setdefault(find(i), []).append(i)
+    return sorted(fragments.values(), key=len, reverse=True)
+
+
+class GeometryReport:
+    """
+    Bonds, clashes and fragments of one geometry, as found by analyze_geometry.
+    """
+
+    def __init__(self, bonds, clashes, fragments):
+        self.bonds = bonds  # List of (i, j) atom index pairs, i < j
+        self.clashes = clashes  # List of (i, j, distance) for atoms much closer than a bond
+        self.fragments = fragments  # List of lists of atom indices, largest first
+
+
+def analyze_geometry(molecule, bond_tolerance=0.45, clash_factor=0.5):
+    """
+    Finds bonds, clashing atoms and disconnected fragments from covalent radii in one neighbor search.
+    :param bond_tolerance: Two atoms are bonded if closer than the sum of their covalent radii plus this (Angstrom).
+    :param clash_factor: Two atoms clash if closer than this fraction of the sum of their covalent radii.
+    :return: GeometryReport
+    """
+    radii = PeriodicData.covalent_radii(molecule.atomic_numbers)
+    bonds, clashes = [], []
+    if len(radii) > 1:
+        for i, j, distance_squared in neighbor_pairs(molecule, 2 * max(radii) + bond_tolerance):
+            radius_sum = radii[i] + radii[j]
+            if distance_squared < (radius_sum + bond_tolerance) ** 2:
+                bonds.append((i, j))
+                if distance_squared < (clash_factor * radius_sum) ** 2:
+                    clashes.append((i, j, math.sqrt(distance_squared)))
+    bonds.sort()
+    return GeometryReport(bonds, clashes, connected_fragments(len(molecule), bonds))
+
+
+def format_connectivity(n_atoms, bonds):
+    """
+    Formats the connectivity section read by Gaussian with geom=connectivity: one line per atom (1-based) listing the
+    atoms with a higher index it is bonded to, each with bond order 1.0.
+    """
+    lines = [[str(i + 1)] for i in range(n_atoms)]
+    for i, j in bonds:
+        lines[i].append(f"{j + 1} 1.0")
+    return "".join(" ".join(line) + "\n" for line in lines)
+
+
+class GeometryCheck:
+    """
+    Rejects geometries that would make Gaussian fail or waste time: overlapping atoms and molecules that have fallen
+    apart into more fragments than expected.
+    """
+
+    def __init__(self, max_fragments=1, clash_factor=0.5, bond_tolerance=0.45):
+        """
+        :param max_fragments: Number of covalently connected fragments allowed (e.g. 2 for an ion pair).
+        :param clash_factor: See analyze_geometry.
+        :param bond_tolerance: See analyze_geometry.
+        """
+        if max_fragments < 1:
+            raise ValueError("At least one fragment must be allowed")
+        self.max_fragments = max_fragments
+        self.clash_factor = clash_factor
+        self.bond_tolerance = bond_tolerance
+
+    def analyze(self, molecule):
+        return analyze_geometry(molecule, self.bond_tolerance, self.clash_factor)
+
+    def problems(self, molecule, report):
+        """
+        :return: List of human-readable problems, empty if the geometry passes.
+        """
+        problems = []
+        if report.clashes:
+            symbols = molecule.symbols
+            i, j, distance = min(report.clashes, key=lambda clash: clash[2])
+            problems.append(f"{len(report.clashes)} clashing atom pair(s), closest {symbols[i]}{i + 1}-"
+                            f"{symbols[j]}{j + 1} at {distance:.2f} Å")
+        if len(report.fragments) > self.max_fragments:
+            sizes = ", ".join(str(len(fragment)) for fragment in report.fragments[:5])
+            problems.append(f"{len(report.fragments)} disconnected fragments (atoms: {sizes}"
+                            f"{', ...' if len(report.fragments) > 5 else ''})")
+        return problems
+
+    def validate(self, molecule, report=None):
+        """
+        :return: GeometryReport of the molecule.
+        :raises ValueError: If the geometry has clashes or too many fragments.
+        """
+        report = report or self.analyze(molecule)
+        problems = self.problems(molecule, report)
+        if problems:
+            raise ValueError(f"Suspicious geometry: {'; '.join(problems)}")
+        return report
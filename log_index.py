@@ -0,0 +1,355 @@
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+from gaussian_parser import _read_orientation_block
+from gaussian_scanner import GaussianFrame, _CHARGE_MULTIPLICITY, _IRC_POINT, _SCAN_POINT
+from log_io import compression_suffix
+
+# Kinds of indexed lines
+STANDARD_ORIENTATION = 0
+INPUT_ORIENTATION = 1
+SCF_DONE = 2
+HARMONIC_FREQUENCIES = 3
+LINK1 = 4
+OPTIMIZATION_COMPLETED = 5
+SCAN_POINT = 6
+IRC_POINT = 7
+CHARGE = 8
+NORMAL_TERMINATION = 9
+ERROR_TERMINATION = 10
+
+# (kind, bytes searched for, True if the bytes must start a line); the same lines GaussianOutputScanner reacts to
+_MARKERS = (
+    (STANDARD_ORIENTATION, b"Standard orientation:", False),
+    (INPUT_ORIENTATION, b"Input orientation:", False),
+    (SCF_DONE, b" SCF Done:", True),
+    (HARMONIC_FREQUENCIES, b" Harmonic frequencies", True),
+    (LINK1, b" Link1:", True),
+    (OPTIMIZATION_COMPLETED, b" Optimization completed", True),
+    (SCAN_POINT, b"on scan point", False),
+    (IRC_POINT, b" Point Number:", True),
+    (CHARGE, b" Charge =", True),
+    (NORMAL_TERMINATION, b" Normal termination", True),
+    (ERROR_TERMINATION, b" Error termination", True),
+)
+_ORIENTATIONS = (STANDARD_ORIENTATION, INPUT_ORIENTATION)
+_NEEDLES = {(b"\n" + marker if at_line_start else marker): kind for kind, marker, at_line_start in _MARKERS}
+_NEEDLE_PATTERN = re.compile(b"|".join(re.escape(needle) for needle in _NEEDLES))
+
+
+class LogIndex:
+    """
+    Byte offsets of the lines of a Gaussian log that GaussianLog seeks to: orientation blocks, SCF Done lines,
+    frequency sections, Link1 job boundaries, optimization/scan/IRC markers, charge and termination lines.
+
+    The index is kept next to the log in a binary sidecar file (<log>.gpidx): a header with the size and mtime of the
+    log it was built from, then one kind byte and one 64-bit offset per line. It is rebuilt when the log's size or
+    mtime no longer match, e.g. while a job is still writing to it.
+    """
+
+    MAGIC = b"GPIX"
+    VERSION = 1
+    SUFFIX = ".gpidx"
+    _HEADER = struct.Struct("<4sHxxQqQ")  # magic, version, log size, log mtime in ns, number of entries
+
+    def __init__(self, size, mtime_ns, kinds, offsets):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.kinds = kinds  # bytes, one kind per entry
+        self.offsets = offsets  # array("Q") of line start offsets, ascending
+
+    def __len__(self):
+        return len(self.kinds)
+
+    @classmethod
+    def sidecar_path(cls, log_path):
+        return f"{log_path}{cls.SUFFIX}"
+
+    @classmethod
+    def build(cls, mapped, size, mtime_ns):
+        """
+        Indexes the contents of a log in a single pass that matches all kinds of lines at once, so a log larger than
+        memory is only read from disk once.
+        :param mapped: bytes or a memory map of the whole log
+        """
+        kinds = bytearray()
+        offsets = array("Q")
+        for match in _NEEDLE_PATTERN.finditer(mapped):
+            needle = match.group()
+            kinds.append(_NEEDLES[needle])
+            if needle.startswith(b"\n"):
+                offsets.append(match.start() + 1)
+            else:
+                offsets.append(mapped.rfind(b"\n", 0, match.start()) + 1)
+        return cls(size, mtime_ns, bytes(kinds), offsets)
+
+    @classmethod
+    def load(cls, index_path, size, mtime_ns):
+        """
+        :return: LogIndex, or None if the sidecar is missing, unreadable or was built from a different log.
+        """
+        try:
+            with open(index_path, "rb") as file:
+                data = file.read()
+        except OSError:
+            return None
+        if len(data) < cls._HEADER.size:
+            return None
+        magic, version, indexed_size, indexed_mtime, count = cls._HEADER.unpack_from(data)
+        if (magic, version, indexed_size, indexed_mtime) != (cls.MAGIC, cls.VERSION, size, mtime_ns):
+            return None
+        start = cls._HEADER.size
+        if len(data) != start + 9 * count:
+            return None
+        offsets = array("Q")
+        offsets.frombytes(data[start + count:])
+        if sys.byteorder != "little":
+            offsets.byteswap()
+        return cls(size, mtime_ns, data[start:start + count], offsets)
+
+    def save(self, index_path):
+        offsets = array("Q", self.offsets)
+        if sys.byteorder != "little":
+            offsets.byteswap()
+        temp_path = f"{index_path}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(self._HEADER.pack(self.MAGIC, self.VERSION, self.size, self.mtime_ns, len(self.kinds)))
+            file.write(self.kinds)
+            file.write(offsets.tobytes())
+        os.replace(temp_path, index_path)
+
+    def positions(self, kind):
+        """
+        :return: Offsets of all lines of one kind, in file order.
+        """
+        return [offset for offset, entry_kind in zip(self.offsets, self.kinds) if entry_kind == kind]
+
+
+class _FrameEntry:
+    __slots__ = ("orientation", "is_standard", "scf", "scan_point", "irc_point", "converged")
+
+    def __init__(self, orientation, is_standard):
+        self.orientation = orientation
+        self.is_standard = is_standard
+        self.scf = None
+        self.scan_point = None
+        self.irc_point = None
+        self.converged = False
+
+
+class GaussianLog:
+    """
+    Random access to the frames and properties of one (uncompressed) Gaussian log. The log is memory-mapped and,
+    using its LogIndex, only the requested block is decoded and parsed, so reading frame 1,200 of a long optimization
+    costs the same as reading frame 0. Frames, energies and frequencies match what iter_gaussian_frames and
+    parse_gaussian_properties return for the same log.
+
+    Usage:
+        with GaussianLog("scan.out") as log:
+            frame = log.frame(1200)
+            energies = log.scan_energies()
+    """
+
+    def __init__(self, log_path, use_sidecar=True):
+        """
+        :param use_sidecar: Load the index from, and save a rebuilt index to, <log>.gpidx. The index is only kept in
+                            memory if the sidecar cannot be written.
+        """
+        if compression_suffix(log_path):
+            raise ValueError("Compressed logs cannot be memory-mapped; decompress them first")
+        self.path = log_path
+        self._file = open(log_path, "rb")
+        stat = os.fstat(self._file.fileno())
+        self._mapped = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b""
+        self.index = self._load_index(stat, use_sidecar)
+        self._frames = None
+        self._charges = None
+
+    def _load_index(self, stat, use_sidecar):
+        index_path = LogIndex.sidecar_path(self.path)
+        index = LogIndex.load(index_path, stat.st_size, stat.st_mtime_ns) if use_sidecar else None
+        if index is None:
+            index = LogIndex.build(self._mapped, stat.st_size, stat.st_mtime_ns)
+            if use_sidecar:
+                try:
+                    index.save(index_path)
+                except OSError:
+                    pass  # Read-only directory: the index is rebuilt next time
+        return index
+
+    def close(self):
+        if isinstance(self._mapped, mmap.mmap):
+            self._mapped.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _line(self, offset):
+        end = self._mapped.find(b"\n", offset)
+        return self._mapped[offset:end if end != -1 else len(self._mapped)].decode("ascii", errors="replace")
+
+    def _frame_entries(self):
+        """
+        Groups the indexed lines into frames the way GaussianOutputScanner does: the standard orientation printed
+        right after the input orientation of the same step (before its SCF) does not start a new frame.
+        """
+        if self._frames is not None:
+            return self._frames
+        frames = []
+        frame = None
+        for offset, kind in zip(self.index.offsets, self.index.kinds):
+            if kind in _ORIENTATIONS:
+                is_standard = kind == STANDARD_ORIENTATION
+                if is_standard and frame is not None and frame.scf is None and not frame.is_standard:
+                    continue
+                frame = _FrameEntry(offset, is_standard)
+                frames.append(frame)
+            elif frame is None:
+                continue
+            elif kind == SCF_DONE and frame.scf is None:
+                frame.scf = offset
+            elif kind == SCAN_POINT:
+                frame.scan_point = offset
+            elif kind == IRC_POINT:
+                frame.irc_point = offset
+            elif kind == OPTIMIZATION_COMPLETED:
+                frame.converged = True
+        self._frames = frames
+        return frames
+
+    def __len__(self):
+        """
+        Number of frames.
+        """
+        return len(self._frame_entries())
+
+    def _scf_energy(self, offset):
+        return float(self._line(offset).split("=")[1].split()[0])
+
+    def _charge_multiplicity(self, offset):
+        """
+        Charge and multiplicity of the geometry at `offset`, from the last charge line before it. Every job prints one
+        in its input section, so after a Link1 boundary the new job's charge and multiplicity are used.
+        """
+        if self._charges is None:
+            self._charges = self.index.positions(CHARGE)
+        for position in reversed(self._charges[:bisect_left(self._charges, offset)]):
+            match = _CHARGE_MULTIPLICITY.search(self._line(position))
+            if match:
+                return int(match.group(1)), int(match.group(2))
+        return None
+
+    def _molecule(self, offset):
+        molecule = _read_orientation_block(self._mapped, offset)
+        charge_multiplicity = self._charge_multiplicity(offset)
+        if charge_multiplicity is not None:
+            molecule.charge, molecule.multiplicity = charge_multiplicity
+        return molecule
+
+    def frame(self, index):
+        """
+        :param index: Frame number, negative numbers count from the end.
+        :return: GaussianFrame
+        """
+        entries = self._frame_entries()
+        index = range(len(entries))[index]  # Resolves negative numbers and raises IndexError when out of range
+        entry = entries[index]
+        frame = GaussianFrame(index, self._molecule(entry.orientation), entry.is_standard)
+        if entry.scf is not None:
+            frame.energy = self._scf_energy(entry.scf)
+        if entry.scan_point is not None:
+            match = _SCAN_POINT.search(self._line(entry.scan_point))
+            if match:
+                frame.scan_point = int(match.group(1))
+        if entry.irc_point is not None:
+            match = _IRC_POINT.search(self._line(entry.irc_point))
+            if match:
+                frame.irc_point, frame.irc_path = int(match.group(1)), int(match.group(2))
+        frame.converged = entry.converged
+        return frame
+
+    def frames(self, start=0, stop=None, step=1):
+        """
+        Lazily yields the frames in range(start, stop, step).
+        """
+        for index in range(*slice(start, stop, step).indices(len(self))):
+            yield self.frame(index)
+
+    def final_geometry(self):
+        """
+        :return: Molecule of the last standard orientation, or of the last input orientation without symmetry.
+        """
+        positions = self.index.positions(STANDARD_ORIENTATION) or self.index.positions(INPUT_ORIENTATION)
+        if not positions:
+            raise ValueError("Standard orientation section not found in the file")
+        return self._molecule(positions[-1])
+
+    def scf_energies(self):
+        """
+        :return: Every SCF energy in the log, in Hartree.
+        """
+        return [self._scf_energy(offset) for offset in self.index.positions(SCF_DONE)]
+
+    def scan_energies(self):
+        """
+        :return: List of (scan point, SCF energy) of the converged geometry of every point of a relaxed scan.
+        """
+        energies = []
+        for index, entry in enumerate(self._frame_entries()):
+            if entry.converged and entry.scan_point is not None and entry.scf is not None:
+                match = _SCAN_POINT.search(self._line(entry.scan_point))
+                if match:
+                    energies.append((int(match.group(1)), self._scf_energy(entry.scf)))
+        return energies
+
+    def job_ranges(self):
+        """
+        :return: List of (start, end) byte ranges of the jobs of the log, split at Link1 boundaries.
+        """
+        starts = [0] + self.index.positions(LINK1)
+        return list(zip(starts, starts[1:] + [self.index.size]))
+
+    def frequencies(self, job=None):
+        """
+        :param job: Number of the job (see job_ranges); None for the last frequency calculation in the log.
+        :return: Harmonic frequencies in cm^-1 of the last frequency section, empty if there is none.
+        """
+        start, end = (0, self.index.size) if job is None else self.job_ranges()[job]
+        sections = [offset for offset in self.index.positions(HARMONIC_FREQUENCIES) if start <= offset < end]
+        if not sections:
+            return []
+        # The section runs until the next frequency section or job
+        section = sections[-1]
+        later = [offset for offset, kind in zip(self.index.offsets, self.index.kinds)
+                 if offset > section and kind in (HARMONIC_FREQUENCIES, LINK1)]
+        limit = min(later + [end])
+        frequencies = []
+        # Not the " Frequencies ---" lines of the high-precision table that freq=HPModes prints first
+        position = self._mapped.find(b"\n Frequencies -- ", section, limit)
+        while position != -1:
+            frequencies.extend(float(value) for value in self._line(position + 1).split("--")[1].split())
+            position = self._mapped.find(b"\n Frequencies -- ", position + 1, limit)
+        return frequencies
+
+    def termination(self):
+        """
+        :return: "normal" or "error" from the last termination line, or None if the job (or the Link1 job after
+                 the last termination line) has not finished.
+        """
+        for kind in reversed(self.index.kinds):
+            if kind == LINK1:
+                return None
+            if kind == NORMAL_TERMINATION:
+                return "normal"
+            if kind == ERROR_TERMINATION:
+                return "error"
+        return None
@@ -0,0 +1,172 @@
+import bz2
+import contextlib
+import gzip
+import io
+import lzma
+import os
+import tarfile
+
+COMPRESSION_OPENERS = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+DECOMPRESSORS = {".gz": gzip.decompress, ".bz2": bz2.decompress, ".xz": lzma.decompress}
+TAR_EXTENSIONS = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+OUTPUT_EXTENSIONS = (".out", ".log")
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def compression_suffix(path):
+    """
+    :return: ".gz", ".bz2", ".xz" or None.
+    """
+    suffix = os.path.splitext(path)[1].lower()
+    return suffix if suffix in COMPRESSION_OPENERS else None
+
+
+def strip_compression(filename):
+    """
+    "job.out.gz" -> "job.out"
+    """
+    return filename[:-len(compression_suffix(filename))] if compression_suffix(filename) else filename
+
+
+def output_base_name(filename):
+    """
+    File name without directory, compression suffix and extension: "dir/job.log.xz" -> "job".
+    """
+    return os.path.splitext(strip_compression(os.path.basename(filename)))[0]
+
+
+def is_tar_archive(filename):
+    return filename.lower().endswith(TAR_EXTENSIONS)
+
+
+def archive_output_directory(archive_path, claimed):
+    """
+    Folder the members of a tar archive are converted into: the archive path without its archive suffix only,
+    "runs/proj.v2.tar.gz" -> "runs/proj.v2".
+    :param claimed: Dict of the folders already given to other archives in this run, updated with this one.
+    :raise ValueError: If another archive (e.g. "a.tar" next to "a.tar.gz") already converts into the same folder.
+    """
+    lower = archive_path.lower()
+    suffix = max((extension for extension in TAR_EXTENSIONS if lower.endswith(extension)), key=len)
+    directory = archive_path[:-len(suffix)]
+    other = claimed.setdefault(directory, archive_path)
+    if other != archive_path:
+        raise ValueError(f"its output folder {os.path.basename(directory)} is already used by "
+                         f"{os.path.basename(other)}")
+    return directory
+
+
+def archive_member_directory(output_directory, member_name):
+    """
+    Directory the outputs of an archive member are written to, mirroring the layout inside the archive:
+    <output_directory>/<directory of the member>.
+    :raise ValueError: If the member name is absolute or leads out of `output_directory`, e.g. "../../job.out".
+    """
+    directory = os.path.normpath(os.path.join(output_directory, os.path.dirname(member_name)))
+    root = os.path.abspath(output_directory)
+    if os.path.isabs(member_name) or os.path.commonpath([root, os.path.abspath(directory)]) != root:
+        raise ValueError(f"unsafe member path {member_name}")
+    return directory
+
+
+def is_gaussian_output(filename):
+    """
+    Plain files must end in .out (as before); compressed and archived logs may also use .log.
+    """
+    if is_tar_archive(filename):
+        return False
+    if compression_suffix(filename):
+        return strip_compression(filename).endswith(OUTPUT_EXTENSIONS)
+    return filename.endswith(".out")
+
+
+def decompress(path, data):
+    """
+    Decompresses the raw contents of `path` according to its extension. Uncompressed contents are returned as is.
+    """
+    suffix = compression_suffix(path)
+    return DECOMPRESSORS[suffix](data) if suffix else data
+
+
+def open_text(source):
+    """
+    Opens a log for reading as text, decompressing gzip, bz2 and xz on the fly. An already open file object is
+    returned as is (and is not closed when the returned context exits).
+    """
+    if not isinstance(source, (str, bytes, os.PathLike)):
+        return contextlib.nullcontext(source)
+    suffix = compression_suffix(os.fspath(source))
+    if suffix:
+        return COMPRESSION_OPENERS[suffix](source, "rt", errors="replace")
+    return open(source, "r", errors="replace")
+
+
+def text_stream(raw, filename):
+    """
+    Wraps a binary stream with the contents of `filename` as text, decompressing it according to its extension.
+    """
+    suffix = compression_suffix(filename)
+    if suffix:
+        return COMPRESSION_OPENERS[suffix](raw, "rt", errors="replace")
+    return io.TextIOWrapper(raw, errors="replace")
+
+
+def iter_tar_outputs(archive):
+    """
+    Iterates over the Gaussian logs inside a (possibly compressed) tar archive without extracting it. Members are
+    visited in archive order, so a compressed archive is decompressed in a single forward pass.
+    :param archive: Path of the archive, or a binary stream of it (e.g. from open_hashed), which is read forward only.
+    :return: Generator of (member name, text stream) tuples.
+    """
+    streamed = not isinstance(archive, (str, bytes, os.PathLike))
+    with tarfile.open(fileobj=archive, mode="r|*") if streamed else tarfile.open(archive, "r:*") as opened:
+        for member in opened:
+            if member.isfile() and is_gaussian_output(member.name):
+                with opened.extractfile(member) as raw:
+                    # Members of a streamed archive fail seekable(), which TextIOWrapper calls
+                    yield member.name, text_stream(io.BufferedReader(_ForwardReader(raw)) if streamed else raw,
+                                                   member.name)
+
+
+class _ForwardReader(io.RawIOBase):
+    """
+    Read-only, unseekable binary stream over `file`.
+    """
+
+    def __init__(self, file):
+        self._file = file
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._file.readinto(buffer)
+
+
+class _HashingReader(_ForwardReader):
+    """
+    Feeds every byte read from `file` into a hashlib `digest`.
+    """
+
+    def __init__(self, file, digest):
+        super().__init__(file)
+        self.digest = digest
+
+    def readinto(self, buffer):
+        count = self._file.readinto(buffer)
+        if count:
+            self.digest.update(memoryview(buffer)[:count])
+        return count
+
+
+@contextlib.contextmanager
+def open_hashed(path, digest):
+    """
+    Opens a file as a buffered binary stream that updates `digest` with its raw (still compressed) contents, so a
+    file is hashed by the same read that parses it. What the reader leaves unread is hashed on exit, so the digest
+    always covers the whole file.
+    """
+    with open(path, "rb") as file:
+        yield io.BufferedReader(_HashingReader(file, digest), HASH_CHUNK_SIZE)
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
@@ -0,0 +1,301 @@
+import cProfile
+import heapq
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak memory is then not reported
+    resource = None
+
+_NO_STAGE = nullcontext()
+# The timer of the task running on this thread. Pipeline renders run in threads next to each other, so a process-wide
+# timer would mix their stages.
+_local = threading.local()
+
+
+def stage(name):
+    """
+    Times the enclosed block as stage `name` ("read", "parse", "format", "write", ...) when the current process is
+    measuring a task, and does nothing otherwise, so the parsers and writers can be instrumented at no cost.
+    """
+    timer = getattr(_local, "timer", None)
+    if timer is None:
+        return _NO_STAGE
+    return timer.stage(name)
+
+
+def is_measuring():
+    return getattr(_local, "timer", None) is not None
+
+
+class StageTimer:
+    """
+    Wall time per stage. Stages may be nested; time spent in an inner stage is only counted for the inner one.
+    Used as a context manager, it becomes the timer that `stage()` records into on the current thread.
+    """
+
+    def __init__(self):
+        self.seconds = {}
+        self._stack = []
+        self._previous = None
+
+    @contextmanager
+    def stage(self, name):
+        entry = [time.perf_counter(), 0.0]  # Start time, time spent in nested stages
+        self._stack.append(entry)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - entry[0]
+            self.seconds[name] = self.seconds.get(name, 0.0) + elapsed - entry[1]
+            if self._stack:
+                self._stack[-1][1] += elapsed
+
+    def __enter__(self):
+        self._previous, _local.timer = getattr(_local, "timer", None), self
+        return self
+
+    def __exit__(self, *exc_info):
+        _local.timer = self._previous
+
+
+def measure_task(worker, input_file, output_file, options=None, profile=False):
+    """
+    Runs a single conversion like batch_runner._run_task, recording its stage times and, if requested, a cProfile
+    of the call. Runs in the worker process; the measurements are sent back with the result.
+    :return: Tuple of (exception or None, seconds, {stage: seconds}, raw cProfile stats or None).
+    """
+    profiler = cProfile.Profile() if profile else None
+    error = None
+    start = time.perf_counter()
+    with StageTimer() as timer:
+        if profiler is not None:
+            profiler.enable()
+        try:
+            worker(input_file, output_file, **(options or {}))
+        except Exception as e:
+            error = e
+        finally:
+            if profiler is not None:
+                profiler.disable()
+    seconds = time.perf_counter() - start
+
+    profile_stats = None
+    if profiler is not None:
+        profiler.create_stats()
+        profile_stats = profiler.stats
+    return error, seconds, timer.seconds, profile_stats
+
+
+class _ProfileData:
+    """
+    Adapter that lets pstats.Stats.add() merge raw stats sent back from worker processes.
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def _peak_rss_mb(who):
+    if resource is None:
+        return None
+    peak = resource.getrusage(who).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)  # bytes on macOS, KiB on Linux
+
+
+def _read_size(input_file):
+    try:
+        return os.path.getsize(input_file)
+    except OSError:
+        return 0
+
+
+def _output_size(output_file):
+    paths = output_file if isinstance(output_file, tuple) else (output_file,)
+    size = 0
+    for path in paths:
+        try:
+            size += os.path.getsize(path) if os.path.isfile(path) else 0
+        except OSError:
+            pass
+    return size
+
+
+class RunMetrics:
+    """
+    Metrics of a whole command, which may run several batches (e.g. .out -> .xyz followed by .xyz -> .com).
+
+    Per-file "Processed ..." lines are replaced by a throttled progress line on stderr; errors are still printed.
+    Stage times of the coordinating process (discover, manifest, schedule) and of the conversions (read, parse,
+    format, write, other) are summed over all files and workers, next to bytes read/written, files/s, the slowest
+    files and peak memory.
+    """
+
+    PROGRESS_INTERVAL = 0.5  # Seconds between progress updates on a terminal
+    PROGRESS_INTERVAL_LOG = 10.0  # ... and when stderr is redirected to a file
+
+    def __init__(self, slowest=10, profile_path=None, stream=None):
+        """
+        :param slowest: Number of slowest files to keep.
+        :param profile_path: If given, every conversion is run under cProfile and the merged stats are written here.
+        :param stream: Where the progress line goes (default: stderr).
+        """
+        self.slowest = slowest
+        self.profile_path = profile_path
+        self.stream = stream or sys.stderr
+        self.timer = StageTimer()  # Stages of the coordinating process
+        self.stages = {}
+        self.files = self.failed = self.skipped = 0
+        self.bytes_read = self.bytes_written = 0
+        self.batches = []
+        self._slowest = []  # Min-heap of (seconds, path, stages)
+        self._profile = None
+        self._batch = None
+        self._line_width = 0
+        self._last_progress = 0.0
+        self._started = time.perf_counter()
+        self._interactive = hasattr(self.stream, "isatty") and self.stream.isatty()
+
+    @property
+    def profile(self):
+        return self.profile_path is not None
+
+    def time_stage(self, name):
+        return self.timer.stage(name)
+
+    def begin_batch(self, name):
+        self._batch = {"name": name, "files": 0, "failed": 0, "skipped": 0, "seconds": 0.0,
+                       "started": time.perf_counter()}
+        self._last_progress = self._batch["started"]
+
+    def end_batch(self, skipped=0):
+        batch = self._batch
+        self._progress(force=True)
+        batch["skipped"] = skipped
+        self.skipped += skipped
+        batch["seconds"] = round(time.perf_counter() - batch.pop("started"), 6)
+        batch["files_per_second"] = round(batch["files"] / batch["seconds"], 2) if batch["seconds"] else None
+        self.batches.append(batch)
+        if self._interactive and self._line_width:
+            self.stream.write("\n")
+            self._line_width = 0
+        self._batch = None
+
+    def task_done(self, input_file, output_file, error, seconds, stages, profile_stats):
+        batch = self._batch
+        batch["files"] += 1
+        self.files += 1
+        self.bytes_read += _read_size(input_file)
+        if error is None:
+            self.bytes_written += _output_size(output_file)
+        else:
+            batch["failed"] += 1
+            self.failed += 1
+            self.message(f"Error processing {os.path.basename(input_file)}: {error}")
+
+        other = seconds - sum(stages.values())
+        for name, value in stages.items():
+            self.stages[name] = self.stages.get(name, 0.0) + value
+        self.stages["other"] = self.stages.get("other", 0.0) + max(other, 0.0)
+
+        if self.slowest:
+            item = (seconds, input_file, stages)
+            if len(self._slowest) < self.slowest:
+                heapq.heappush(self._slowest, item)
+            elif seconds > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+
+        if profile_stats is not None:
+            if self._profile is None:
+                self._profile = pstats.Stats(_ProfileData(profile_stats))
+            else:
+                self._profile.add(_ProfileData(profile_stats))
+        self._progress()
+
+    def message(self, text):
+        """
+        Prints a line without garbling the progress line.
+        """
+        if self._interactive and self._line_width:
+            self.stream.write("\r" + " " * self._line_width + "\r")
+            self.stream.flush()
+            self._line_width = 0
+        print(text)
+
+    def _progress(self, force=False):
+        batch = self._batch
+        now = time.perf_counter()
+        interval = self.PROGRESS_INTERVAL if self._interactive else self.PROGRESS_INTERVAL_LOG
+        if batch is None or (not force and now - self._last_progress < interval):
+            return
+        self._last_progress = now
+        elapsed = now - batch["started"]
+        rate = batch["files"] / elapsed if elapsed > 0 else 0.0
+        line = f"{batch['name']}: {batch['files']} file(s), {batch['failed']} failed, {rate:.1f} files/s"
+        if self._interactive:
+            self.stream.write("\r" + line.ljust(self._line_width))
+            self._line_width = len(line)
+        else:
+            self.stream.write(line + "\n")
+        self.stream.flush()
+
+    def summary(self):
+        """
+        :return: JSON-serializable summary of the run.
+        """
+        wall_seconds = time.perf_counter() - self._started
+        stages = dict(self.stages)
+        for name, value in self.timer.seconds.items():
+            stages[name] = stages.get(name, 0.0) + value
+        return {
+            "wall_seconds": round(wall_seconds, 6),
+            "files": self.files,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "files_per_second": round(self.files / wall_seconds, 2) if wall_seconds else None,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "read_mb_per_second": round(self.bytes_read / wall_seconds / 1e6, 3) if wall_seconds else None,
+            "stage_seconds": {name: round(value, 6) for name, value in
+                              sorted(stages.items(), key=lambda item: item[1], reverse=True)},
+            "batches": self.batches,
+            "slowest": [{"file": path, "seconds": round(seconds, 6),
+                         "stages": {name: round(value, 6) for name, value in file_stages.items()}}
+                        for seconds, path, file_stages in sorted(self._slowest, reverse=True)],
+            "peak_rss_mb": {"main": _peak_rss_mb(resource.RUSAGE_SELF) if resource is not None else None,
+                            "workers": _peak_rss_mb(resource.RUSAGE_CHILDREN) if resource is not None else None},
+        }
+
+    def finish(self, metrics_path=None):
+        """
+        Prints a short summary, writes the JSON summary to `metrics_path` and the cProfile dump to profile_path.
+        """
+        summary = self.summary()
+        print(f"{summary['files']} file(s) in {summary['wall_seconds']:.2f} s ({summary['files_per_second']} files/s), "
+              f"{summary['failed']} failed, {summary['skipped']} skipped; "
+              f"read {summary['bytes_read'] / 1e6:.1f} MB, wrote {summary['bytes_written'] / 1e6:.1f} MB")
+        total = sum(summary["stage_seconds"].values())
+        for name, value in summary["stage_seconds"].items():
+            print(f"  {name:10} {value:10.3f} s {100 * value / total if total else 0:6.1f} %")
+
+        if metrics_path:
+            with open(metrics_path, "w") as file:
+                json.dump(summary, file, indent=2)
+            print(f"Metrics written to {metrics_path}")
+        if self.profile_path:
+            if self._profile is None:
+                print("No conversions were profiled")
+            else:
+                self._profile.dump_stats(self.profile_path)
+                print(f"Profile written to {self.profile_path} (inspect with: python -m pstats {self.profile_path})")
+        return summary
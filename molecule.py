@@ -0,0 +1,140 @@
+from array import array
+
+from metrics import stage
+from periodic_data import PeriodicData
+
+
+class Molecule:
+    """
+    Compact geometry representation shared by the parsers and writers.
+
+    Atomic numbers are stored in an int8 array and coordinates (Angstrom) in a flat float64 array of x, y, z
+    triples, so a 20k-atom system is two buffers instead of 20k tuples of strings. Blocks of text are parsed with a
+    single split and sliced column-wise, and written with a single format operation.
+    """
+
+    __slots__ = ("atomic_numbers", "coordinates", "charge", "multiplicity", "title", "labels")
+
+    XYZ_LINE_FORMAT = "%-2s %14.8f %14.8f %14.8f\n"
+
+    def __init__(self, atomic_numbers, coordinates, charge=0, multiplicity=1, title=None, labels=None):
+        """
+        :param atomic_numbers: Iterable of atomic numbers (0 for unknown elements).
+        :param coordinates: Flat iterable of x, y, z values in Angstrom, three per atom.
+        :param labels: Optional dict of atom index -> original label for atoms that are not elements (ghost atoms
+                       "Bq", dummy atoms, fragment labels); they keep atomic number 0 and are written back unchanged.
+        """
+        self.atomic_numbers = atomic_numbers if isinstance(atomic_numbers, array) else array("b", atomic_numbers)
+        self.coordinates = coordinates if isinstance(coordinates, array) else array("d", coordinates)
+        if len(self.coordinates) != 3 * len(self.atomic_numbers):
+            raise ValueError("Number of coordinates does not match the number of atoms")
+        self.charge = charge
+        self.multiplicity = multiplicity
+        self.title = title
+        self.labels = labels or None
+
+    def __len__(self):
+        return len(self.atomic_numbers)
+
+    def __iter__(self):
+        """
+        Yields (element symbol, x, y, z) tuples.
+        """
+        coordinates = self.coordinates
+        for i, symbol in enumerate(self.symbols):
+            yield symbol, coordinates[3 * i], coordinates[3 * i + 1], coordinates[3 * i + 2]
+
+    @property
+    def symbols(self):
+        symbols = PeriodicData.numbers_to_symbols(self.atomic_numbers)
+        if self.labels:
+            for index, label in self.labels.items():
+                symbols[index] = label
+        return symbols
+
+    def position(self, index):
+        return tuple(self.coordinates[3 * index:3 * index + 3])
+
+    @classmethod
+    def from_symbols(cls, symbols, coordinates, **kwargs):
+        """
+        :param symbols: Element symbols (or atomic numbers as strings, as allowed in .xyz files). Labels that are not
+                        elements are kept as the molecule's labels.
+        :param coordinates: Flat iterable of x, y, z values.
+        """
+        symbols = symbols if isinstance(symbols, (list, tuple)) else list(symbols)
+        atomic_numbers = PeriodicData.symbols_to_numbers(symbols)
+        if 0 in atomic_numbers:
+            kwargs["labels"] = {index: symbols[index] for index, number in enumerate(atomic_numbers) if number == 0}
+        return cls(atomic_numbers, array("d", map(float, coordinates)), **kwargs)
+
+    @classmethod
+    def from_xyz_lines(cls, lines, **kwargs):
+        """
+        Parses coordinate lines of the form "El x y z". Extra columns are ignored; blank lines end the block.
+        """
+        lines = list(lines)
+        for i, line in enumerate(lines):
+            if not line.strip():
+                lines = lines[:i]
+                break
+
+        fields = "".join(lines).split()
+        if len(fields) == 4 * len(lines):  # Fast path: exactly four columns per line
+            coordinates = [None] * (3 * len(lines))
+            coordinates[0::3], coordinates[1::3], coordinates[2::3] = fields[1::4], fields[2::4], fields[3::4]
+            return cls.from_symbols(fields[0::4], coordinates, **kwargs)
+
+        symbols, coordinates = [], []
+        for line in lines:
+            parts = line.split()
+            if len(parts) < 4:
+                raise ValueError(f"Invalid coordinate line: {line.strip()}")
+            symbols.append(parts[0])
+            coordinates.extend(parts[1:4])
+        return cls.from_symbols(symbols, coordinates, **kwargs)
+
+    @classmethod
+    def from_xyz_file(cls, file_path):
+        """
+        Reads a single-molecule .xyz file (atom count, comment line, coordinates).
+        """
+        with stage("read"), open(file_path, "r") as file:
+            lines = file.readlines()
+        return cls.from_xyz_file_lines(lines)
+
+    @classmethod
+    def from_xyz_file_lines(cls, lines):
+        """
+        Parses the lines of a single-molecule .xyz file.
+        """
+        if len(lines) < 2:
+            raise ValueError("Not a valid .xyz file")
+
+        count = lines[0].strip()
+        content = lines[2:2 + int(count)] if count.isdigit() else lines[2:]
+        return cls.from_xyz_lines(content, title=lines[1].strip() or None)
+
+    @classmethod
+    def from_orientation_block(cls, text, **kwargs):
+        """
+        Parses the atom lines of a Gaussian "Standard/Input orientation" table
+        (center number, atomic number, atomic type, x, y, z).
+        """
+        fields = text.split()
+        if len(fields) % 6:
+            raise ValueError("Malformed orientation block")
+        coordinates = [None] * (len(fields) // 2)
+        coordinates[0::3], coordinates[1::3], coordinates[2::3] = fields[3::6], fields[4::6], fields[5::6]
+        return cls(array("b", map(int, fields[1::6])), array("d", map(float, coordinates)), **kwargs)
+
+    def format_xyz_block(self):
+        """
+        Formats the coordinates as "El x y z" lines in one operation.
+        """
+        n = len(self)
+        coordinates = self.coordinates
+        values = [None] * (4 * n)
+        values[0::4] = self.symbols
+        values[1::4], values[2::4], values[3::4] = coordinates[0::3], coordinates[1::3], coordinates[2::3]
+        return (self.XYZ_LINE_FORMAT * n) % tuple(values)
@@ -0,0 +1,152 @@
+import io
+import os
+import tarfile
+import threading
+import time
+import zipfile
+
+from pipeline import LocalFileSystem
+
+ARCHIVE_BUFFER_SIZE = 1024 * 1024
+_TAR_MODES = {".tar": "w", ".tar.gz": "w:gz", ".tgz": "w:gz", ".tar.bz2": "w:bz2", ".tbz2": "w:bz2", ".tar.xz": "w:xz",
+              ".txz": "w:xz"}
+
+
+class OutputSink(LocalFileSystem):
+    """
+    Destination of the files written by the pipeline's write stage. Inputs are still read from disk.
+    """
+
+    def close(self, complete=True):
+        """
+        Call once all files are written; complete=False discards what cannot be kept from an interrupted run.
+        """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        self.close(exc_type is None)
+
+
+class AtomicDirectorySink(OutputSink):
+    """
+    Writes every file to a temporary name next to it and renames it into place, so a run that is killed halfway
+    leaves either the complete previous file or the complete new one, never a truncated input that gets submitted.
+    Leftover temporary files end in .tmp and are not picked up as inputs.
+    """
+
+    def __init__(self):
+        self._directories = set()  # Created or known to exist, so each costs one metadata call per run
+
+    def write_text(self, path, content):
+        directory = os.path.dirname(path)
+        if directory and directory not in self._directories:
+            os.makedirs(directory, exist_ok=True)
+            self._directories.add(directory)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "x") as file:
+                file.write(content)
+                file.flush()
+                os.fsync(file.fileno())  # On disk before the rename, or a crash can leave an empty file in place
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+
+class ArchiveSink(OutputSink):
+    """
+    Streams all generated files into one tar (optionally gz/bz2/xz compressed) or zip archive through a buffered
+    file instead of creating one file per output. Member names are the output paths relative to `root`, and outputs
+    outside `root` are rejected. The archive is written under a temporary name and only renamed to `archive_path`
+    when the run completes; an interrupted run leaves no archive behind.
+    """
+
+    def __init__(self, archive_path, root):
+        """
+        :param archive_path: Path of the .tar, .tar.gz/.tgz, .tar.bz2/.tbz2, .tar.xz/.txz or .zip file to write.
+        :param root: Directory the member names are relative to (the data directory).
+        """
+        mode = archive_mode(archive_path)
+        if mode is None:
+            raise ValueError(f"Unsupported archive type: {archive_path} (use .tar, .tar.gz, .tar.bz2, .tar.xz or .zip)")
+        self.archive_path = archive_path
+        self.root = root
+        self.members = 0
+        self._temp_path = f"{archive_path}.{os.getpid()}.tmp"
+        self._lock = threading.Lock()  # The pipeline writes from several threads
+        self._file = open(self._temp_path, "wb", buffering=ARCHIVE_BUFFER_SIZE)
+        if mode == "zip":
+            self._tar, self._zip = None, zipfile.ZipFile(self._file, "w", zipfile.ZIP_DEFLATED)
+        else:
+            self._tar, self._zip = tarfile.open(fileobj=self._file, mode=mode), None
+
+    def member_name(self, path):
+        """
+        :return: Name of the member for the output at `path`, relative to `root`.
+        """
+        name = self.output_name(path)
+        if name == ".." or name.startswith("../"):  # Would be extracted outside the destination folder
+            raise ValueError(f"{path} is outside {self.root} and cannot be written to the archive")
+        return name
+
+    def output_name(self, path):
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def write_text(self, path, content):
+        data = content.encode("utf-8")
+        name = self.member_name(path)
+        now = time.time()
+        with self._lock:
+            if self._zip is not None:
+                info = zipfile.ZipInfo(name, time.localtime(now)[:6])
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.external_attr = 0o644 << 16
+                self._zip.writestr(info, data)
+            else:
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mtime = int(now)
+                info.mode = 0o644
+                self._tar.addfile(info, io.BytesIO(data))
+            self.members += 1
+
+    def close(self, complete=True):
+        """
+        Finishes the archive and moves it into place, or with complete=False discards it.
+        """
+        if self._file.closed:
+            return
+        try:
+            (self._zip or self._tar).close()
+        finally:
+            self._file.close()
+        if complete:
+            os.replace(self._temp_path, self.archive_path)
+        else:
+            os.remove(self._temp_path)
+
+
+def archive_mode(path):
+    """
+    :return: "zip", the tarfile write mode for the archive's extension, or None if it is not an archive.
+    """
+    lower = path.lower()
+    if lower.endswith(".zip"):
+        return "zip"
+    for extension, mode in _TAR_MODES.items():
+        if lower.endswith(extension):
+            return mode
+    return None
+
+
+def open_output_sink(root, archive_path=None, atomic=False):
+    """
+    :return: An ArchiveSink for `archive_path`, an AtomicDirectorySink if `atomic`, or None to write files directly.
+    """
+    if archive_path:
+        return ArchiveSink(archive_path, root)
+    return AtomicDirectorySink() if atomic else None
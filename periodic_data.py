@@ -1,4 +1,14 @@
+from array import array
+from functools import lru_cache
+
+
 class PeriodicData:
+    """
+    Element data shared by all parsers and writers. The tables are built once at import and indexed by atomic number
+    (0 stands for an unknown element "X"), so whole arrays of atomic numbers are converted and classified with C-level
+    map/translate calls instead of per-atom Python code.
+    """
+
     PERIODIC_TABLE = {
         1: "H", 2: "He", 3: "Li", 4: "Be", 5: "B", 6: "C", 7: "N", 8: "O", 9: "F", 10: "Ne",
         11: "Na", 12: "Mg", 13: "Al", 14: "Si", 15: "P", 16: "S", 17: "Cl", 18: "Ar", 19: "K", 20: "Ca",
@@ -14,7 +24,7 @@ class PeriodicData:
         111: "Rg", 112: "Cn", 113: "Nh", 114: "Fl", 115: "Mc", 116: "Lv", 117: "Ts", 118: "Og"
     }
 
-    HEAVY_METALS = [
+    HEAVY_METALS = frozenset({
         "Sc", "Ti", "V", "Cr", "Mn", "Fe", "Co", "Ni", "Cu", "Zn",  # Sc to Zn
         "Sr", "Y", "Zr", "Nb", "Mo", "Tc", "Ru", "Rh", "Pd", "Ag", "Cd", "In", "Sn", "Sb", "Te", "I", "Xe",
         # Metals after Rb
@@ -22,8 +32,142 @@ class PeriodicData:
         "Hf", "Ta", "W", "Re", "Os", "Ir", "Pt", "Au", "Hg", "Tl", "Pb", "Bi", "Po", "At", "Rn",
         "Fr", "Ra", "Ac", "Th", "Pa", "U", "Np", "Pu", "Am", "Cm", "Bk", "Cf", "Es", "Fm", "Md", "No", "Lr",
         "Rf", "Db", "Sg", "Bh", "Hs", "Mt", "Ds", "Rg", "Cn", "Nh", "Fl", "Mc", "Lv", "Ts", "Og"
-    ]
+    })
+
+    SYMBOLS = ("X",) + tuple(PERIODIC_TABLE.values())  # Symbol of every atomic number, "X" at 0
+    SYMBOL_TO_NUMBER = dict(zip(SYMBOLS, range(len(SYMBOLS))))
+    HEAVY_METAL_MASK = bytes(map(HEAVY_METALS.__contains__, SYMBOLS))  # 1 at the atomic number of every heavy metal
+
+    # Standard atomic weights (IUPAC, abridged); mass number of the longest-lived isotope for radioactive elements
+    ATOMIC_MASSES = array("d", [
+        0.0,
+        1.008, 4.0026, 6.94, 9.0122, 10.81, 12.011, 14.007, 15.999, 18.998, 20.180,
+        22.990, 24.305, 26.982, 28.085, 30.974, 32.06, 35.45, 39.948, 39.098, 40.078,
+        44.956, 47.867, 50.942, 51.996, 54.938, 55.845, 58.933, 58.693, 63.546, 65.38,
+        69.723, 72.630, 74.922, 78.971, 79.904, 83.798, 85.468, 87.62, 88.906, 91.224,
+        92.906, 95.95, 98.0, 101.07, 102.91, 106.42, 107.87, 112.41, 114.82, 118.71,
+        121.76, 127.60, 126.90, 131.29, 132.91, 137.33, 138.91, 140.12, 140.91, 144.24,
+        145.0, 150.36, 151.96, 157.25, 158.93, 162.50, 164.93, 167.26, 168.93, 173.05,
+        174.97, 178.49, 180.95, 183.84, 186.21, 190.23, 192.22, 195.08, 196.97, 200.59,
+        204.38, 207.2, 208.98, 209.0, 210.0, 222.0, 223.0, 226.0, 227.0, 232.04,
+        231.04, 238.03, 237.0, 244.0, 243.0, 247.0, 247.0, 251.0, 252.0, 257.0,
+        258.0, 259.0, 262.0, 267.0, 268.0, 269.0, 270.0, 269.0, 278.0, 281.0,
+        282.0, 285.0, 286.0, 289.0, 290.0, 293.0, 294.0, 294.0,
+    ])
+
+    # Covalent radii in Angstrom (Cordero et al., Dalton Trans. 2008, low-spin values for Mn, Fe and Co).
+    # No values are tabulated after Cm; those elements and unknown atoms get DEFAULT_COVALENT_RADIUS.
+    DEFAULT_COVALENT_RADIUS = 1.50
+    COVALENT_RADII = array("d", [
+        DEFAULT_COVALENT_RADIUS,
+        0.31, 0.28, 1.28, 0.96, 0.84, 0.76, 0.71, 0.66, 0.57, 0.58,
+        1.66, 1.41, 1.21, 1.11, 1.07, 1.05, 1.02, 1.06, 2.03, 1.76,
+        1.70, 1.60, 1.53, 1.39, 1.39, 1.32, 1.26, 1.24, 1.32, 1.22,
+        1.22, 1.20, 1.19, 1.20, 1.20, 1.16, 2.20, 1.95, 1.90, 1.75,
+        1.64, 1.54, 1.47, 1.46, 1.42, 1.39, 1.45, 1.44, 1.42, 1.39,
+        1.39, 1.38, 1.39, 1.40, 2.44, 2.15, 2.07, 2.04, 2.03, 2.01,
+        1.99, 1.98, 1.98, 1.96, 1.94, 1.92, 1.92, 1.89, 1.90, 1.87,
+        1.87, 1.75, 1.70, 1.62, 1.51, 1.44, 1.41, 1.36, 1.36, 1.32,
+        1.45, 1.46, 1.48, 1.40, 1.50, 1.50, 2.60, 2.21, 2.15, 2.06,
+        2.00, 1.96, 1.90, 1.87, 1.80, 1.69,
+    ] + [DEFAULT_COVALENT_RADIUS] * 22)
+
+    # 256-entry versions, so that any int8 value (negative ones wrap around) maps to "X" / not a heavy metal
+    _SYMBOLS_INT8 = SYMBOLS + ("X",) * (256 - len(SYMBOLS))
+    _HEAVY_METAL_TRANSLATION = HEAVY_METAL_MASK.ljust(256, b"\0")
 
     @classmethod
     def convert_element_number_to_symbol(cls, atomic_number):
         return cls.PERIODIC_TABLE.get(atomic_number, 'X')
+
+    @classmethod
+    def convert_element_symbol_to_number(cls, symbol):
+        """
+        Accepts symbols in any case ("NI", "ni") as well as atomic numbers written as strings. Unknown symbols map to 0.
+        :raise ValueError: If an atomic number written as a string is not one of the periodic table (0-118).
+        """
+        if symbol.isdigit():
+            atomic_number = int(symbol)
+            if atomic_number >= len(cls.SYMBOLS):
+                raise ValueError(f"Invalid atomic number: {symbol}")
+            return atomic_number
+        return cls.SYMBOL_TO_NUMBER.get(symbol.capitalize(), 0)
+
+    @classmethod
+    def numbers_to_symbols(cls, atomic_numbers):
+        """
+        :param atomic_numbers: Iterable of atomic numbers, e.g. Molecule.atomic_numbers.
+        :return: List of element symbols ("X" for unknown numbers).
+        """
+        try:
+            return list(map(cls._SYMBOLS_INT8.__getitem__, atomic_numbers))
+        except IndexError:  # Only possible for numbers outside the int8 range
+            return [cls.convert_element_number_to_symbol(number) for number in atomic_numbers]
+
+    @classmethod
+    def symbols_to_numbers(cls, symbols):
+        """
+        :param symbols: Iterable of element symbols, in any case, or atomic numbers written as strings.
+        :return: array("b") of atomic numbers (0 for unknown symbols).
+        """
+        symbols = symbols if isinstance(symbols, (list, tuple)) else list(symbols)
+        try:
+            return array("b", map(cls.SYMBOL_TO_NUMBER.__getitem__, symbols))
+        except KeyError:  # Not all symbols are in canonical form
+            return array("b", map(cls.convert_element_symbol_to_number, symbols))
+
+    @classmethod
+    def heavy_metal_mask(cls, atomic_numbers):
+        """
+        :param atomic_numbers: array("b") or iterable of atomic numbers.
+        :return: bytes with 1 for every heavy-metal atom and 0 for every other atom.
+        """
+        if not (isinstance(atomic_numbers, array) and atomic_numbers.typecode == "b"):
+            atomic_numbers = array("b", atomic_numbers)
+        return atomic_numbers.tobytes().translate(cls._HEAVY_METAL_TRANSLATION)
+
+    @classmethod
+    def masses(cls, atomic_numbers):
+        """
+        :return: array("d") of the atomic masses of the atoms (atomic numbers 0-118).
+        """
+        return array("d", map(cls.ATOMIC_MASSES.__getitem__, atomic_numbers))
+
+    @classmethod
+    def covalent_radii(cls, atomic_numbers):
+        """
+        :return: array("d") of the covalent radii of the atoms (atomic numbers 0-118).
+        """
+        return array("d", map(cls.COVALENT_RADII.__getitem__, atomic_numbers))
+
+    @classmethod
+    def genecp_sort_key(cls, symbol):
+        """
+        Order of elements in GenECP basis blocks: C first, then H, then the rest by atomic number, unknown ones last.
+        """
+        if symbol == "C":
+            return (0,)
+        if symbol == "H":
+            return (1,)
+        return (2, cls.SYMBOL_TO_NUMBER.get(symbol) or len(cls.SYMBOLS))
+
+    @classmethod
+    def classify_elements(cls, atomic_numbers):
+        """
+        Splits the distinct elements of a molecule into heavy metals and other elements, both in GenECP order. Atoms
+        without an element (0: ghost atoms "Bq", dummy atoms "X") are left out, as they get no basis set.
+        Results are cached per set of elements, so a batch of molecules with the same composition is classified once.
+        :param atomic_numbers: Iterable of atomic numbers, e.g. Molecule.atomic_numbers.
+        :return: Tuple of (heavy metal symbols, other symbols), both tuples.
+        """
+        return _classify_elements(frozenset(atomic_numbers))
+
+
+@lru_cache(maxsize=4096)
+def _classify_elements(elements):
+    symbols = PeriodicData.numbers_to_symbols(elements.difference((0,)))
+    heavy_metals = sorted({symbol for symbol in symbols if symbol in PeriodicData.HEAVY_METALS},
+                          key=PeriodicData.genecp_sort_key)
+    other_elements = sorted({symbol for symbol in symbols if symbol not in PeriodicData.HEAVY_METALS},
+                            key=PeriodicData.genecp_sort_key)
+    return tuple(heavy_metals), tuple(other_elements)
@@ -0,0 +1,256 @@
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from batch_runner import _report, resolve_jobs
+from metrics import StageTimer
+
+_DONE = object()  # End-of-stream marker passed from stage to stage
+
+
+class LocalFileSystem:
+    """
+    File access used by the pipeline's read and write stages.
+    """
+
+    def read_bytes(self, path):
+        with open(path, "rb") as file:
+            return file.read()
+
+    def write_text(self, path, content):
+        with open(path, "w") as file:
+            file.write(content)
+
+    def output_name(self, path):
+        """
+        :return: Name under which the file written to `path` is reported.
+        """
+        return path
+
+
+class DelayedFileSystem(LocalFileSystem):
+    """
+    Stand-in for a network filesystem (NFS, Lustre) on a local disk: every open costs `latency` seconds and, if
+    `bandwidth` is given, data moves at `bandwidth` bytes per second. Used to test and benchmark the pipeline.
+    """
+
+    def __init__(self, latency=0.005, bandwidth=None):
+        self.latency = latency
+        self.bandwidth = bandwidth
+
+    def _delay(self, size):
+        time.sleep(self.latency + (size / self.bandwidth if self.bandwidth else 0.0))
+
+    def read_bytes(self, path):
+        data = super().read_bytes(path)
+        self._delay(len(data))
+        return data
+
+    def write_text(self, path, content):
+        self._delay(len(content))
+        super().write_text(path, content)
+
+
+class _Item:
+    __slots__ = ("input_file", "output_file", "options", "data", "outputs", "error", "stages")
+
+    def __init__(self, input_file, output_file, options=None):
+        self.input_file = input_file
+        self.output_file = output_file
+        self.options = options or {}
+        self.data = None
+        self.outputs = ()
+        self.error = None
+        self.stages = {}
+
+
+class _Stage:
+    """
+    A pool of threads that take items from `inbox`, process them and put them into `outbox`. Both queues are bounded,
+    so a slow stage stops the stages before it instead of letting work pile up in memory. The end-of-stream marker is
+    forwarded once every thread of the stage has finished.
+    """
+
+    def __init__(self, name, process, workers, inbox, outbox):
+        self.process = process
+        self.inbox = inbox
+        self.outbox = outbox
+        self._running = workers
+        self._lock = threading.Lock()
+        self.threads = [threading.Thread(target=self._run, name=f"pipeline-{name}-{i}", daemon=True)
+                        for i in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def _run(self):
+        while True:
+            item = self.inbox.get()
+            if item is _DONE:
+                self.inbox.put(_DONE)  # Let the other threads of this stage see it too
+                break
+            if item.error is None:
+                try:
+                    self.process(item)
+                except Exception as e:
+                    item.error = e
+            self.outbox.put(item)
+
+        with self._lock:
+            self._running -= 1
+            last = self._running == 0
+        if last:
+            self.outbox.put(_DONE)
+
+
+def _output_names(file_system, output_file):
+    if isinstance(output_file, tuple):
+        return tuple(file_system.output_name(path) for path in output_file)
+    return file_system.output_name(output_file)
+
+
+def _render_task(renderer, input_file, output_file, data, options, measure):
+    """
+    Runs the CPU-bound part of one conversion (in a worker process when jobs > 1).
+    :return: Tuple of (list of (output path, contents), {stage: seconds}); stages are only timed if `measure`.
+    """
+    if not measure:
+        return renderer(input_file, output_file, data, **options), {}
+    start = time.perf_counter()
+    with StageTimer() as timer:
+        outputs = renderer(input_file, output_file, data, **options)
+    stages = timer.seconds
+    stages["parse"] = stages.get("parse", 0.0) + max(time.perf_counter() - start - sum(stages.values()), 0.0)
+    return outputs, stages
+
+
+def run_pipeline(tasks, renderer, jobs=1, io_concurrency=8, manifest=None, config=None, metrics=None,
+                 should_read=None, file_system=None, stream=None):
+    """
+    Pipelined counterpart of run_batch for filesystems where every open, read and write has a high round-trip
+    latency. Reading, rendering and writing run as overlapping stages connected by bounded queues:
+
+        tasks -> read (io_concurrency threads) -> render (jobs processes) -> write (io_concurrency threads)
+
+    so up to `io_concurrency` reads and writes are in flight while the CPU works on files that are already in memory.
+
+    :param tasks: Iterable of (input_file, output_file) tuples, consumed lazily, optionally with a dict of keyword
+                  arguments for the renderer as a third item, as in run_batch.
+    :param renderer: Module-level function (or functools.partial of one) renderer(input_file, output_file, data)
+                     returning a list of (output path, contents) tuples. data is the raw contents of input_file, or
+                     None for inputs excluded by `should_read` (the renderer then reads and writes them itself).
+    :param jobs: Number of render processes. 1 renders in a thread of the current process, 0 uses all CPUs.
+    :param io_concurrency: Maximum number of reads and of writes in flight.
+    :param manifest: Optional BuildManifest, as in run_batch.
+    :param config: Configuration stored in the manifest, as in run_batch.
+    :param metrics: Optional RunMetrics, as in run_batch.
+    :param should_read: Optional predicate on the input path; inputs for which it is False are not read.
+    :param file_system: LocalFileSystem (default), a stand-in such as DelayedFileSystem, or an output sink from
+                        output_sinks (archive or atomic writes) that receives every output.
+    :param stream: Optional predicate on the input path; for these inputs the renderer returns an iterator of
+                   (output path, contents) instead of a list, e.g. the members of a tar archive. It is not sent to a
+                   worker process but consumed by the write stage, so only one of its files is in memory at a time;
+                   its rendering time is counted as writing. Its task options may therefore hold objects that cannot
+                   be pickled, such as `file_system.output_name` for reporting its files.
+    :return: Number of files that failed.
+    """
+    file_system = file_system or LocalFileSystem()
+    jobs = resolve_jobs(jobs)
+    io_concurrency = max(io_concurrency, 1)
+    executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    measure = metrics is not None
+
+    def read(item):
+        if should_read is None or should_read(item.input_file):
+            start = time.perf_counter()
+            item.data = file_system.read_bytes(item.input_file)
+            item.stages["read"] = time.perf_counter() - start
+
+    def render(item):
+        if stream is not None and stream(item.input_file):
+            # Rendered as it is written
+            item.outputs = renderer(item.input_file, item.output_file, item.data, **item.options)
+            item.data = None
+            return
+        if executor is not None:
+            future = executor.submit(_render_task, renderer, item.input_file, item.output_file, item.data,
+                                     item.options, measure)
+            item.outputs, stages = future.result()
+        else:
+            item.outputs, stages = _render_task(renderer, item.input_file, item.output_file, item.data, item.options,
+                                                measure)
+        item.data = None  # Release the input as soon as it is parsed
+        item.stages.update(stages)
+
+    def write(item):
+        start = time.perf_counter()
+        for path, content in item.outputs:
+            file_system.write_text(path, content)
+        item.outputs = ()
+        item.stages["write"] = time.perf_counter() - start
+
+    to_read = queue.Queue(maxsize=io_concurrency)
+    to_render = queue.Queue(maxsize=2 * jobs)
+    to_write = queue.Queue(maxsize=io_concurrency)
+    finished = queue.Queue()
+    _Stage("read", read, io_concurrency, to_read, to_render)
+    _Stage("render", render, jobs, to_render, to_write)
+    _Stage("write", write, io_concurrency, to_write, finished)
+
+    skipped = 0
+    failed = 0
+    feeder_error = []
+    timed = metrics.time_stage if metrics is not None else None
+
+    def feed():
+        nonlocal skipped
+        try:
+            for task in tasks:
+                input_file, output_file = task[:2]
+                if manifest is not None:
+                    if timed is not None:
+                        with timed("manifest"):
+                            up_to_date = manifest.is_up_to_date(input_file, output_file, config)
+                    else:
+                        up_to_date = manifest.is_up_to_date(input_file, output_file, config)
+                    if up_to_date:
+                        skipped += 1
+                        continue
+                to_read.put(_Item(*task))  # Blocks while the pipeline is full
+        except Exception as e:
+            feeder_error.append(e)
+        finally:
+            to_read.put(_DONE)
+
+    if metrics is not None:
+        metrics.begin_batch(getattr(renderer, "__name__", None) or renderer.func.__name__)
+    feeder = threading.Thread(target=feed, name="pipeline-feed", daemon=True)
+    feeder.start()
+    try:
+        while True:
+            item = finished.get()
+            if item is _DONE:
+                break
+            if metrics is not None:
+                metrics.task_done(item.input_file, item.output_file, item.error, sum(item.stages.values()),
+                                  item.stages, None)
+            else:
+                _report(item.input_file, _output_names(file_system, item.output_file), item.error)
+            if item.error is not None:
+                failed += 1
+            elif manifest is not None:
+                manifest.record(item.input_file, item.output_file, config)
+        feeder.join()
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        if manifest is not None:
+            manifest.save()
+        if metrics is not None:
+            metrics.end_batch(skipped)
+
+    if feeder_error:
+        raise feeder_error[0]
+    if skipped:
+        (metrics.message if metrics is not None else print)(f"Skipped {skipped} up-to-date file(s)")
+    return failed
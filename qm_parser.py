@@ -1,34 +1,11 @@
 import os
 import re
 
-periodic_table = {
-    1: "H", 2: "He", 3: "Li", 4: "Be", 5: "B", 6: "C", 7: "N", 8: "O", 9: "F", 10: "Ne",
-    11: "Na", 12: "Mg", 13: "Al", 14: "Si", 15: "P", 16: "S", 17: "Cl", 18: "Ar", 19: "K", 20: "Ca",
-    21: "Sc", 22: "Ti", 23: "V", 24: "Cr", 25: "Mn", 26: "Fe", 27: "Co", 28: "Ni", 29: "Cu", 30: "Zn",
-    31: "Ga", 32: "Ge", 33: "As", 34: "Se", 35: "Br", 36: "Kr", 37: "Rb", 38: "Sr", 39: "Y", 40: "Zr",
-    41: "Nb", 42: "Mo", 43: "Tc", 44: "Ru", 45: "Rh", 46: "Pd", 47: "Ag", 48: "Cd", 49: "In", 50: "Sn",
-    51: "Sb", 52: "Te", 53: "I", 54: "Xe", 55: "Cs", 56: "Ba", 57: "La", 58: "Ce", 59: "Pr", 60: "Nd",
-    61: "Pm", 62: "Sm", 63: "Eu", 64: "Gd", 65: "Tb", 66: "Dy", 67: "Ho", 68: "Er", 69: "Tm", 70: "Yb",
-    71: "Lu", 72: "Hf", 73: "Ta", 74: "W", 75: "Re", 76: "Os", 77: "Ir", 78: "Pt", 79: "Au", 80: "Hg",
-    81: "Tl", 82: "Pb", 83: "Bi", 84: "Po", 85: "At", 86: "Rn", 87: "Fr", 88: "Ra", 89: "Ac", 90: "Th",
-    91: "Pa", 92: "U", 93: "Np", 94: "Pu", 95: "Am", 96: "Cm", 97: "Bk", 98: "Cf", 99: "Es", 100: "Fm",
-    101: "Md", 102: "No", 103: "Lr", 104: "Rf", 105: "Db", 106: "Sg", 107: "Bh", 108: "Hs", 109: "Mt", 110: "Ds",
-    111: "Rg", 112: "Cn", 113: "Nh", 114: "Fl", 115: "Mc", 116: "Lv", 117: "Ts", 118: "Og"
-}
-
-heavy_metals = [
-    "Sc", "Ti", "V", "Cr", "Mn", "Fe", "Co", "Ni", "Cu", "Zn",  # Sc to Zn
-    "Sr", "Y", "Zr", "Nb", "Mo", "Tc", "Ru", "Rh", "Pd", "Ag", "Cd", "In", "Sn", "Sb", "Te", "I", "Xe",
-    # Metals after Rb
-    "Cs", "Ba", "La", "Ce", "Pr", "Nd", "Pm", "Sm", "Eu", "Gd", "Tb", "Dy", "Ho", "Er", "Tm", "Yb", "Lu",
-    "Hf", "Ta", "W", "Re", "Os", "Ir", "Pt", "Au", "Hg", "Tl", "Pb", "Bi", "Po", "At", "Rn",
-    "Fr", "Ra", "Ac", "Th", "Pa", "U", "Np", "Pu", "Am", "Cm", "Bk", "Cf", "Es", "Fm", "Md", "No", "Lr",
-    "Rf", "Db", "Sg", "Bh", "Hs", "Mt", "Ds", "Rg", "Cn", "Nh", "Fl", "Mc", "Lv", "Ts", "Og"
-]
+from periodic_data import PeriodicData
 
 
 def convert_element_number_to_symbol(atomic_number):
-    return periodic_table.get(atomic_number, 'X')  # Default to 'X' if element is not found
+    return PeriodicData.convert_element_number_to_symbol(atomic_number)  # Default to 'X' if element is not found
 
 
 def parse_gaussian_output(file_path):
@@ -170,19 +147,7 @@ def sort_elements_for_genecp(elements):
     :param elements: List of elements to sort
     :return:
     """
-    atomic_numbers = {symbol: num for num, symbol in
-                      periodic_table.items()}  # Create a reverse lookup to get atomic numbers for symbols
-
-    def sort_key(element):
-        if element == "C":
-            return (0,)
-        elif element == "H":
-            return (1,)
-        else:
-            return (2, atomic_numbers.get(element,
-                                          str('X')))  # Return a tuple where second item is the atomic number or X if not found
-
-    return sorted(elements, key=sort_key)
+    return sorted(elements, key=PeriodicData.genecp_sort_key)
 
 
 def process_elements(content):
@@ -195,8 +160,8 @@ def process_elements(content):
         elements.add(element)  # add the element to the set
 
     # Separate elements into heavy metals and non-heavy metals
-    heavy_metals_in_molecule = [el for el in elements if el in heavy_metals]
-    non_heavy_metals_in_molecule = [el for el in elements if el not in heavy_metals]
+    heavy_metals_in_molecule = [el for el in elements if el in PeriodicData.HEAVY_METALS]
+    non_heavy_metals_in_molecule = [el for el in elements if el not in PeriodicData.HEAVY_METALS]
 
     # Sort the elements for GenECP
     heavy_metals_sorted = sort_elements_for_genecp(heavy_metals_in_molecule)
@@ -0,0 +1,236 @@
+import os
+import re
+
+from periodic_data import PeriodicData
+
+# Approximate number of basis functions per atom of each row of the periodic table (H-He, Li-Ne, Na-Ar, K-Kr, Rb
+# and beyond with the basis set's ECP), keyed by the basis set name in lower case without dashes and spaces
+_BASIS_FUNCTIONS = {
+    "631g(d,p)": (5, 15, 19, 29, 29),
+    "631g**": (5, 15, 19, 29, 29),
+    "631+g(d,p)": (5, 19, 23, 33, 33),
+    "6311g(d,p)": (6, 18, 22, 35, 35),
+    "6311++g(d,p)": (7, 22, 26, 39, 39),
+    "def2svp": (5, 14, 18, 31, 31),
+    "def2tzvp": (6, 31, 37, 67, 61),
+    "def2tzvpp": (14, 31, 37, 72, 64),
+    "lanl2dz": (2, 9, 13, 22, 22),
+    "sdd": (2, 9, 13, 36, 36),
+}
+_DEFAULT_BASIS_FUNCTIONS = _BASIS_FUNCTIONS["def2tzvp"]  # Unknown basis sets are assumed to be of triple-zeta size
+_ROW_STARTS = (3, 11, 19, 37)  # First atomic number of the 2nd to 5th rows
+
+# Dense N x N matrices Gaussian keeps in memory per calculation type; frequencies need many more than energies
+_MATRIX_COPIES = {"spe": 16, "reopt": 48}
+_PROGRAM_MEMORY = 1  # GB
+
+
+def _row(atomic_number):
+    return sum(atomic_number >= start for start in _ROW_STARTS)
+
+
+def _basis_functions_by_row(basis_set):
+    key = re.sub(r"[\s-]", "", (basis_set or "").lower())
+    return _BASIS_FUNCTIONS.get(key, _DEFAULT_BASIS_FUNCTIONS)
+
+
+def scheduler_memory(mem_alloc):
+    """
+    Memory in GB to request from the batch scheduler for a job with %mem=`mem_alloc`GB: Gaussian uses about 10% (at
+    least 1 GB) more than %mem.
+    """
+    return mem_alloc + max(1, -(-mem_alloc // 10))
+
+
+class Resources:
+    """
+    %mem and %nprocshared assigned to one input file.
+    """
+
+    def __init__(self, mem_alloc, nproc, basis_functions=None):
+        self.mem_alloc = mem_alloc  # GB
+        self.nproc = nproc
+        self.basis_functions = basis_functions
+
+
+class ResourcePlanner:
+    """
+    Assigns %mem and %nprocshared per molecule within the limits of one compute node. The cost of a calculation is
+    estimated from the number of basis functions, which follows from the element composition and the basis sets of the
+    template. The number of cores grows with the number of basis functions and is always a divisor of the cores of a
+    node, so jobs of the same size fill a node exactly; memory is the node's share for those cores, and a job whose
+    matrices do not fit gets more cores (and so more memory).
+    """
+
+    def __init__(self, node_cores=32, node_mem=128, functions_per_core=100):
+        """
+        :param node_cores: Cores of one compute node.
+        :param node_mem: Memory of one compute node in GB.
+        :param functions_per_core: Number of basis functions per core at which another core pays off.
+        """
+        if node_cores < 1 or scheduler_memory(1) > node_mem:
+            raise ValueError("A node needs at least one core and 2 GB of memory")
+        self.node_cores = node_cores
+        self.node_mem = node_mem
+        self.functions_per_core = functions_per_core
+        self.config = dict(node_cores=node_cores, node_mem=node_mem, functions_per_core=functions_per_core)
+        self._core_counts = [n for n in range(1, node_cores + 1) if node_cores % n == 0]
+        self._tables = {}
+
+    def _functions_table(self, template):
+        """
+        :return: Number of basis functions per atomic number for the basis sets of `template`.
+        """
+        key = (template.basis_set, template.basis_set_heavy_atoms if template.split_basis_set else None)
+        table = self._tables.get(key)
+        if table is None:
+            light = _basis_functions_by_row(template.basis_set)
+            heavy = _basis_functions_by_row(key[1]) if key[1] else light
+            table = [(heavy if PeriodicData.HEAVY_METAL_MASK[z] else light)[_row(z)]
+                     for z in range(len(PeriodicData.HEAVY_METAL_MASK))]
+            self._tables[key] = table
+        return table
+
+    def basis_functions(self, molecule, template):
+        """
+        :return: Estimated number of basis functions of `molecule` with the basis sets of `template`.
+        """
+        table = self._functions_table(template)
+        return sum(table[z] for z in molecule.atomic_numbers)
+
+    def memory(self, nproc):
+        """
+        :return: Largest %mem in GB for a job on `nproc` cores when the node is full of such jobs.
+        """
+        budget = self.node_mem // (self.node_cores // nproc)
+        mem_alloc = max(budget * 10 // 11 - 1, 1)
+        while scheduler_memory(mem_alloc + 1) <= budget:
+            mem_alloc += 1
+        return mem_alloc
+
+    def plan(self, molecule, template):
+        """
+        :return: Resources for `molecule` written with `template`.
+        :raise ValueError: If even all cores of a node do not come with enough memory for the calculation.
+        """
+        functions = self.basis_functions(molecule, template)
+        matrices = _MATRIX_COPIES[template.calculation_type] * functions * functions * 8 / 1e9 + _PROGRAM_MEMORY
+        wanted = -(-functions // self.functions_per_core)
+        for nproc in self._core_counts:
+            if nproc >= wanted and self.memory(nproc) >= matrices:
+                break
+        else:
+            raise ValueError(f"about {functions} basis functions need {matrices:.0f} GB of memory, more than a node "
+                             f"with {self.node_mem} GB provides")
+        return Resources(self.memory(nproc), nproc, functions)
+
+
+def read_link0_resources(com_file_path):
+    """
+    Reads %mem and %nprocshared from the Link0 lines of a Gaussian input file.
+    :return: Tuple of (memory in GB, number of cores); Gaussian's defaults (1 GB, 1 core) where a line is missing.
+    """
+    mem_alloc, nproc = 1, 1
+    with open(com_file_path) as file:
+        for line in file:
+            line = line.strip().lower()
+            if not line.startswith("%"):
+                if line.startswith("#"):
+                    break
+                continue
+            keyword, _, value = line[1:].partition("=")
+            if keyword == "mem":
+                match = re.fullmatch(r"(\d+)\s*(gb|mb|gw|mw)?", value.strip())
+                if match is None:
+                    raise ValueError(f"Unsupported %mem value: {value}")
+                size, unit = int(match.group(1)), match.group(2) or "mw"  # Gaussian's default unit is words
+                size *= 8 if unit in ("gw", "mw") else 1
+                mem_alloc = max(size if unit in ("gb", "gw") else -(-size // 1000), 1)
+            elif keyword in ("nprocshared", "nproc"):
+                nproc = int(value)
+    return mem_alloc, nproc
+
+
+class ArrayJob:
+    """
+    Input files with the same %nprocshared and %mem, run `slots` at a time on whole nodes by one array job.
+    """
+
+    def __init__(self, nproc, mem_alloc, slots, inputs):
+        self.nproc = nproc
+        self.mem_alloc = mem_alloc
+        self.slots = slots
+        self.inputs = inputs
+
+    @property
+    def tasks(self):
+        return -(-len(self.inputs) // self.slots)
+
+    @property
+    def name(self):
+        return f"gaussian_{self.nproc}cores_{self.mem_alloc}gb"
+
+
+def pack_inputs(com_file_paths, node_cores=32, node_mem=128):
+    """
+    Groups input files by their Link0 resources and works out how many of each group fit on one node. Within a group,
+    inputs are ordered by size, largest first, so the inputs sharing a node take similar times.
+    :return: List of ArrayJob, largest jobs first.
+    """
+    groups = {}
+    for com_file_path in com_file_paths:
+        mem_alloc, nproc = read_link0_resources(com_file_path)
+        if nproc > node_cores or scheduler_memory(mem_alloc) > node_mem:
+            raise ValueError(f"{com_file_path} needs more than one node ({nproc} cores, {mem_alloc} GB)")
+        groups.setdefault((nproc, mem_alloc), []).append(com_file_path)
+
+    jobs = []
+    for (nproc, mem_alloc), inputs in sorted(groups.items(), reverse=True):
+        inputs.sort(key=lambda path: (-os.path.getsize(path), path))
+        slots = min(node_cores // nproc, node_mem // scheduler_memory(mem_alloc), len(inputs))
+        jobs.append(ArrayJob(nproc, mem_alloc, slots, inputs))
+    return jobs
+
+
+def format_slurm_array(job, directory, list_file, command="g16"):
+    """
+    :return: SLURM batch script running the inputs listed in `list_file` (relative to `directory`) as an array job.
+             Every array task takes one node and runs `job.slots` inputs side by side; the output of each input is
+             written next to it as <name>.out.
+    """
+    return (f"#!/bin/bash\n"
+            f"#SBATCH --job-name={job.name}\n"
+            f"#SBATCH --chdir={os.path.abspath(directory)}\n"
+            f"#SBATCH --array=0-{job.tasks - 1}\n"
+            f"#SBATCH --nodes=1\n"
+            f"#SBATCH --ntasks=1\n"
+            f"#SBATCH --cpus-per-task={job.slots * job.nproc}\n"
+            f"#SBATCH --mem={job.slots * scheduler_memory(job.mem_alloc)}G\n"
+            f"\n"
+            f"# {len(job.inputs)} input(s) with %nprocshared={job.nproc} and %mem={job.mem_alloc}GB, "
+            f"{job.slots} per node\n"
+            f"first=$((SLURM_ARRAY_TASK_ID * {job.slots} + 1))\n"
+            f"mapfile -t inputs < <(sed -n \"${{first}},$((first + {job.slots - 1}))p\" {list_file})\n"
+            f"for input in \"${{inputs[@]}}\"; do\n"
+            f"    (cd \"$(dirname \"$input\")\" && {command} < \"$(basename \"$input\")\" "
+            f"> \"$(basename \"${{input%.com}}\").out\") &\n"
+            f"done\n"
+            f"wait\n")
+
+
+def write_slurm_arrays(directory, com_file_paths, node_cores=32, node_mem=128, command="g16"):
+    """
+    Packs input files into SLURM array jobs that fill whole nodes (see pack_inputs) and writes, per group of inputs
+    with the same resources, <name>.txt listing the inputs and <name>.sh to submit with sbatch.
+    :return: List of (script path, ArrayJob) tuples.
+    """
+    written = []
+    for job in pack_inputs(com_file_paths, node_cores, node_mem):
+        list_file = f"{job.name}.txt"
+        with open(os.path.join(directory, list_file), "w") as file:
+            file.writelines(os.path.relpath(path, directory) + "\n" for path in job.inputs)
+        script_path = os.path.join(directory, f"{job.name}.sh")
+        with open(script_path, "w") as file:
+            file.write(format_slurm_array(job, directory, list_file, command))
+        written.append((script_path, job))
+    return written
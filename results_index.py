@@ -0,0 +1,236 @@
+import hashlib
+import os
+import re
+import sqlite3
+import tarfile
+from concurrent.futures import ProcessPoolExecutor
+
+from batch_runner import resolve_jobs
+from build_manifest import BuildManifest
+from discovery import FileDiscovery
+from gaussian_scanner import parse_gaussian_properties
+from log_io import is_gaussian_output, is_tar_archive, iter_tar_outputs, open_hashed, output_base_name, text_stream
+
+
+class ResultsIndex:
+    """
+    SQLite database of parsed Gaussian results for a whole calculation campaign, so repeated analyses cost a query
+    instead of a full parse of every output file.
+
+    Files already in the index are skipped when their size and mtime are unchanged (or, if only the mtime moved,
+    when their SHA-256 is unchanged). Changed files are re-parsed and replace their previous rows. Plain and
+    compressed logs are one job each; a tar archive of logs is one file with a job per member.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL UNIQUE,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            sha256 TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY,
+            file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+            name TEXT NOT NULL,
+            family TEXT NOT NULL,
+            route TEXT,
+            charge INTEGER,
+            multiplicity INTEGER,
+            termination TEXT,
+            n_atoms INTEGER,
+            scf_energy REAL,
+            zero_point_correction REAL,
+            enthalpy REAL,
+            free_energy REAL,
+            homo REAL,
+            lumo REAL
+        );
+        CREATE TABLE IF NOT EXISTS geometries (
+            job_id INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+            atom_index INTEGER NOT NULL,
+            atomic_number INTEGER NOT NULL,
+            x REAL NOT NULL,
+            y REAL NOT NULL,
+            z REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS energies (
+            job_id INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+            kind TEXT NOT NULL,
+            step INTEGER NOT NULL,
+            value REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS jobs_family ON jobs(family);
+        CREATE INDEX IF NOT EXISTS jobs_file ON jobs(file_id);
+        CREATE INDEX IF NOT EXISTS geometries_job ON geometries(job_id);
+        CREATE INDEX IF NOT EXISTS energies_job ON energies(job_id, kind);
+    """
+
+    NAMED_QUERIES = {
+        "summary": "SELECT termination, COUNT(*) AS jobs FROM jobs GROUP BY termination ORDER BY jobs DESC",
+        "failed": "SELECT f.path, j.termination FROM jobs j JOIN files f ON f.id = j.file_id "
+                  "WHERE j.termination IS NOT 'normal' ORDER BY f.path",
+        # SQLite returns the bare columns of the row that holds the MIN()
+        "lowest-g": "SELECT family, name, MIN(free_energy) AS free_energy FROM jobs "
+                    "WHERE free_energy IS NOT NULL GROUP BY family ORDER BY family",
+        "lowest-e": "SELECT family, name, MIN(scf_energy) AS scf_energy FROM jobs "
+                    "WHERE scf_energy IS NOT NULL GROUP BY family ORDER BY family",
+    }
+
+    def __init__(self, db_path):
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.executescript(self.SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    @staticmethod
+    def family_name(name):
+        """
+        Conformers are named <family>_<n> (or <family>-<n>); strips the trailing counter.
+        """
+        return re.sub(r"[_-]\d+$", "", name) or name
+
+    def _index_task(self, path):
+        """
+        Compares a file with its row by size and mtime only; nothing is hashed here.
+        :return: None if the file is indexed and unchanged, otherwise the task for _parse_for_index: the path and,
+                 if only its mtime moved, the SHA-256 it was indexed with.
+        """
+        stat = os.stat(path)
+        row = self.connection.execute("SELECT size, mtime_ns, sha256 FROM files WHERE path = ?", (path,)).fetchone()
+        if row is None or row[0] != stat.st_size:
+            return path, None
+        if row[1] == stat.st_mtime_ns:
+            return None
+        return path, row[2]
+
+    def index_directory(self, directory, jobs=1, batch_size=500, discovery=None):
+        """
+        Parses every Gaussian output file (plain, compressed or in a tar archive) in the directory that is not
+        already indexed and stores the results.
+        :param directory: Path to the directory containing Gaussian output files.
+        :param jobs: Number of worker processes used for parsing (0 uses all CPUs).
+        :param batch_size: Number of files written per transaction.
+        :param discovery: FileDiscovery selecting the files (default: top level of `directory`).
+        :return: Tuple of (number of files indexed, number of files skipped, number of files that failed).
+        """
+        discovery = discovery or FileDiscovery()
+        tasks = []
+        skipped = 0
+        for path in discovery.iter_files(directory, lambda name: is_tar_archive(name) or is_gaussian_output(name)):
+            task = self._index_task(os.path.abspath(path))
+            if task is None:
+                skipped += 1
+            else:
+                tasks.append(task)
+        if not discovery.streaming:
+            tasks.sort()
+
+        indexed = failed = 0
+        batch = []
+        jobs = resolve_jobs(jobs)
+        executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 and len(tasks) > 1 else None
+        try:
+            parse = executor.map(_parse_for_index, tasks, chunksize=16) if executor else map(_parse_for_index, tasks)
+            for path, fingerprint, records, error in parse:
+                if error is not None:
+                    print(f"Error processing {os.path.basename(path)}: {error}")
+                    failed += 1
+                    continue
+                if records is None:  # Only the mtime moved
+                    skipped += 1
+                else:
+                    indexed += 1
+                batch.append((path, fingerprint, records))
+                if len(batch) >= batch_size:
+                    self._insert_batch(batch)
+                    batch = []
+            self._insert_batch(batch)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        return indexed, skipped, failed
+
+    def _insert_batch(self, batch):
+        """
+        Writes parsed records in a single transaction. The size, mtime and hash come from the worker's read, so no
+        file is read again here.
+        :param batch: List of (path, (size, mtime_ns, sha256), list of (job name, GaussianOutputRecord) or None if
+                      the file is unchanged and only its mtime is updated).
+        """
+        if not batch:
+            return
+        with self.connection:
+            cursor = self.connection.cursor()
+            for path, (size, mtime_ns, sha256), records in batch:
+                if records is None:
+                    cursor.execute("UPDATE files SET mtime_ns = ? WHERE path = ?", (mtime_ns, path))
+                    continue
+                cursor.execute("DELETE FROM files WHERE path = ?", (path,))
+                cursor.execute("INSERT INTO files (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+                               (path, size, mtime_ns, sha256))
+                file_id = cursor.lastrowid
+                for name, record in records:
+                    self._insert_job(cursor, file_id, name, record)
+
+    def _insert_job(self, cursor, file_id, name, record):
+        molecule = record.molecule
+        cursor.execute(
+            "INSERT INTO jobs (file_id, name, family, route, charge, multiplicity, termination, n_atoms, "
+            "scf_energy, zero_point_correction, enthalpy, free_energy, homo, lumo) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (file_id, name, self.family_name(name), record.route, record.charge, record.multiplicity,
+             record.termination, len(molecule) if molecule is not None else None, record.scf_energy,
+             record.zero_point_correction, record.enthalpy, record.free_energy, record.homo, record.lumo))
+        job_id = cursor.lastrowid
+
+        if molecule is not None:
+            coordinates = molecule.coordinates
+            cursor.executemany(
+                "INSERT INTO geometries (job_id, atom_index, atomic_number, x, y, z) VALUES (?, ?, ?, ?, ?, ?)",
+                ((job_id, i, number, coordinates[3 * i], coordinates[3 * i + 1], coordinates[3 * i + 2])
+                 for i, number in enumerate(molecule.atomic_numbers)))
+        cursor.executemany("INSERT INTO energies (job_id, kind, step, value) VALUES (?, 'scf', ?, ?)",
+                           ((job_id, step, value) for step, value in enumerate(record.scf_energies)))
+
+    def query(self, query):
+        """
+        Runs one of NAMED_QUERIES or an arbitrary SQL statement.
+        :return: Tuple of (column names, rows).
+        """
+        cursor = self.connection.execute(self.NAMED_QUERIES.get(query, query))
+        columns = [description[0] for description in cursor.description or []]
+        return columns, cursor.fetchall()
+
+
+def _parse_for_index(task):
+    """
+    Parses a log, or every log in a tar archive, and hashes the file during the same read. A file whose mtime moved
+    without a size change is hashed first and only parsed if its contents changed.
+    :param task: Tuple from ResultsIndex._index_task.
+    :return: Tuple of (path, (size, mtime_ns, sha256), list of (job name, GaussianOutputRecord) or None if the
+             contents are unchanged, error or None).
+    """
+    path, indexed_sha256 = task
+    try:
+        stat = os.stat(path)
+        if indexed_sha256 is not None:
+            sha256 = BuildManifest.file_hash(path)
+            if sha256 == indexed_sha256:
+                return path, (stat.st_size, stat.st_mtime_ns, sha256), None, None
+        digest = hashlib.sha256()
+        with open_hashed(path, digest) as raw:
+            if is_tar_archive(path):
+                records = [(output_base_name(name), parse_gaussian_properties(stream))
+                           for name, stream in iter_tar_outputs(raw)]
+            else:
+                with text_stream(raw, path) as stream:
+                    records = [(output_base_name(path), parse_gaussian_properties(stream))]
+        return path, (stat.st_size, stat.st_mtime_ns, digest.hexdigest()), records, None
+    except (OSError, ValueError, EOFError, tarfile.TarError) as e:
+        return path, None, None, e
@@ -1,8 +1,21 @@
 import argparse
+from contextlib import nullcontext
 
+from conformers import ConformerDeduplicator
+from conversion_options import ConversionOptions
 from default_config import DefaultConfig
-from file_converter import all_files_directory_out_to_xyz, all_files_directory_com_to_xyz
-from to_com import xyz_to_com
+from discovery import FileDiscovery
+from follow import follow_directory
+from geometry import GeometryCheck
+from metrics import RunMetrics
+from output_sinks import open_output_sink
+from resources import ResourcePlanner, write_slurm_arrays
+from results_index import ResultsIndex
+from server import serve
+from xyz_frames import FrameSelection
+from file_converter import all_files_directory_out_to_xyz, all_files_directory_com_to_xyz, \
+    all_files_directory_out_to_json, all_files_directory_out_to_xyz_trajectory, all_files_directory_fchk_to_xyz
+from to_com import fchk_to_com_configs, out_to_com_configs, xyz_to_com_configs
 
 
 def setup_parser():
@@ -12,102 +25,312 @@ def setup_parser():
     input_group.add_argument("--from-gaussian-out", type=str, help="Path to Gaussian output file(s) directory")
     input_group.add_argument("--from-xyz", type=str, help="Path to XYZ file(s) directory")
     input_group.add_argument("--from-gaussian-in", type=str, help="Path to Gaussian input file(s) directory")
+    input_group.add_argument("--from-fchk", type=str, help="Path to formatted checkpoint (.fchk) file(s) directory")
 
     output_group = parser.add_mutually_exclusive_group()
     output_group.add_argument("--to-spe", action="store_true")
     output_group.add_argument("--to-opt", action="store_true")
     output_group.add_argument("--to-xyz", action="store_true")
+    output_group.add_argument("--to-json", action="store_true",
+                              help="Extract energies, thermochemistry, frequencies, charges and geometry to .json")
 
-    parser.add_argument("--config", type=str, help="Choose pre-defined configuration from 1-6")
+    parser.add_argument("--follow", action="store_true",
+                        help="With --from-gaussian-out, follow running jobs and print new frames and energies")
+    parser.add_argument("--poll-interval", type=float, default=10.0, help="Seconds between polls in --follow mode")
+    parser.add_argument("--index", type=str, metavar="DB",
+                        help="SQLite results database. With --from-gaussian-out, parse and store new/changed outputs")
+    parser.add_argument("--query", type=str,
+                        help=f"With --index, run a named query ({', '.join(ResultsIndex.NAMED_QUERIES)}) or SQL")
+    parser.add_argument("--config", type=str,
+                        help="Choose pre-defined configuration(s) from 1-6: a single key, a list like 1,3,5 or 'all'")
     parser.add_argument("--list-config", action="store_true")
+    parser.add_argument("--trajectory", action="store_true",
+                        help="With --to-xyz, write every geometry of an optimization, scan or IRC as multi-frame .xyz")
+    parser.add_argument("--jobs", type=int, default=1, help="Number of worker processes to use (0 = all CPUs)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only reprocess files whose source or configuration changed since the last run")
+    parser.add_argument("--recursive", action="store_true", help="Also process files in subdirectories")
+    parser.add_argument("--include", type=str, action="append", metavar="GLOB",
+                        help="Only process files matching this pattern (name or relative path); repeatable")
+    parser.add_argument("--exclude", type=str, action="append", metavar="GLOB",
+                        help="Skip files and directories matching this pattern; repeatable")
+    parser.add_argument("--max-depth", type=int, help="With --recursive, maximum subdirectory depth")
+    parser.add_argument("--files-from", type=str, metavar="FILE",
+                        help="Read the input file paths from FILE ('-' for stdin) instead of listing the directory")
+    parser.add_argument("--null", action="store_true", help="The --files-from list is NUL-separated (find -print0)")
+    parser.add_argument("--metrics", type=str, metavar="FILE",
+                        help="Record per-stage times, bytes, files/s, slowest files and peak memory; write JSON here")
+    parser.add_argument("--profile", type=str, metavar="FILE",
+                        help="Run every conversion under cProfile and write the merged stats here")
+    parser.add_argument("--slowest", type=int, default=10, help="Number of slowest files kept by --metrics/--profile")
+    parser.add_argument("--serve", type=str, metavar="SOCKET",
+                        help="Run a conversion server on this Unix socket (send requests with client.py)")
+    parser.add_argument("--io-concurrency", type=int, default=0, metavar="N",
+                        help="Overlap reading, parsing and writing with up to N reads and writes in flight "
+                             "(for network filesystems; 0 = off)")
+    parser.add_argument("--dedup", action="store_true",
+                        help="With --to-spe/--to-opt, skip geometries that duplicate an earlier one (by RMSD)")
+    parser.add_argument("--dedup-threshold", type=float, default=0.125, metavar="RMSD",
+                        help="RMSD in Angstrom at or below which --dedup treats two geometries as duplicates")
+    parser.add_argument("--check-geometry", action="store_true",
+                        help="With --to-spe/--to-opt, reject geometries with clashing atoms or disconnected fragments")
+    parser.add_argument("--max-fragments", type=int, default=1, metavar="N",
+                        help="Number of separate molecules allowed by --check-geometry (e.g. 2 for an ion pair)")
+    parser.add_argument("--connectivity", action="store_true",
+                        help="Write geom=connectivity and a connectivity section derived from covalent radii")
 
-    # TODO: add argument for 'mem_alloc' and 'nproc'. Currently, hard-coded to mem_alloc=16, nproc=10.
+    parser.add_argument("--keep-xyz", action="store_true",
+                        help="With --from-gaussian-out/--from-fchk and --to-spe/--to-opt, also write the geometries "
+                             "to .xyz")
+    parser.add_argument("--mem", type=int, default=16, metavar="GB", help="%%mem of generated input files in GB")
+    parser.add_argument("--nproc", type=int, default=10, metavar="N", help="%%nprocshared of generated input files")
+    parser.add_argument("--auto-resources", action="store_true",
+                        help="Choose %%mem and %%nprocshared per molecule from its size and basis set, within the "
+                             "limits of one node (--node-cores, --node-mem)")
+    parser.add_argument("--node-cores", type=int, default=32, metavar="N", help="Cores of one compute node")
+    parser.add_argument("--node-mem", type=int, default=128, metavar="GB", help="Memory of one compute node in GB")
+    parser.add_argument("--slurm-array", action="store_true",
+                        help="Pack the .com files written by the conversion (or, with --from-gaussian-in, the .com "
+                             "files of the directory) into SLURM array scripts that fill whole nodes")
+    parser.add_argument("--frames", type=str, metavar="START:STOP",
+                        help="With --from-xyz, convert only frames START to STOP-1 of multi-frame .xyz files")
+    parser.add_argument("--stride", type=int, default=1, metavar="N",
+                        help="With --from-xyz, convert every Nth frame of multi-frame .xyz files")
+    parser.add_argument("--energy-window", type=float, metavar="KCAL",
+                        help="With --from-xyz, convert only frames within KCAL kcal/mol of the lowest energy of their "
+                             "file (energies from the comment lines)")
+    parser.add_argument("--output-archive", type=str, metavar="FILE",
+                        help="Write all generated files into one .tar, .tar.gz, .tar.bz2, .tar.xz or .zip archive "
+                             "instead of next to their inputs (member names relative to the input directory)")
+    parser.add_argument("--atomic-writes", action="store_true",
+                        help="Write every generated file to a temporary name and rename it into place, so an "
+                             "interrupted run never leaves a truncated file")
     # TODO: add argument/config for defining your own methods
 
     return parser
 
 
-def xyz_to_com_spe(folder_path, theory, dispersion, solvent, basis_set, split_basis_set, mem_alloc, nproc,
-                   basis_set_heavy_atoms, ecp_heavy_atoms):
-    xyz_to_com(folder_path, theory, dispersion, solvent, basis_set, "spe", split_basis_set, mem_alloc, nproc,
-               basis_set_heavy_atoms, ecp_heavy_atoms)
+def xyz_to_com_spe(folder_path, configs, options=None):
+    return xyz_to_com_configs(folder_path, configs, "spe", options)
 
 
-def xyz_to_com_opt(folder_path, theory, dispersion, solvent, basis_set, split_basis_set, mem_alloc, nproc,
-                   basis_set_heavy_atoms, ecp_heavy_atoms):
-    xyz_to_com(folder_path, theory, dispersion, solvent, basis_set, "reopt", split_basis_set, mem_alloc, nproc,
-               basis_set_heavy_atoms, ecp_heavy_atoms)
+def xyz_to_com_opt(folder_path, configs, options=None):
+    return xyz_to_com_configs(folder_path, configs, "reopt", options)
 
 
-def convert_gaussian_output_files_to_input_files_for_spe_calculation(data_dir, config):
-    print("Convert Gaussian output files to input files for SPE calculation with config: ", config)
-    all_files_directory_out_to_xyz(data_dir)
-    xyz_to_com_spe(data_dir, config["level_of_theory"], config["empirical_dispersion"], config["solvent"],
-                   config["basis_set"], config["split_basis_set"], 16, 10, config["basis_set_heavy_atoms"],
-                   config["ecp_heavy_atoms"])
+def selected_configs(args):
+    configs = DefaultConfig.select(DefaultConfig.SPE_DEFAULTS, args.config)
+    if args.connectivity:
+        configs = [dict(config, connectivity=True) for config in configs]
+    return configs
 
 
-def convert_gaussian_output_files_to_input_files_for_optimization(data_dir, config):
-    print("Convert Gaussian output files to input files for optimization with configuration: ", config)
-    all_files_directory_out_to_xyz(data_dir)
-    xyz_to_com_opt(data_dir, config["level_of_theory"], config["empirical_dispersion"], config["solvent"],
-                   config["basis_set"], config["split_basis_set"], 16, 10, config["basis_set_heavy_atoms"],
-                   config["ecp_heavy_atoms"])
+def config_names(configs):
+    return ", ".join(config["name"] for config in configs)
 
 
-def convert_xyz_files_to_input_files_for_spe_calculation(data_dir, config):
-    print("Convert .xyz files to input files for SPE calculation with configuration: ", config)
-    xyz_to_com_spe(data_dir, config["level_of_theory"], config["empirical_dispersion"], config["solvent"],
-                   config["basis_set"], config["split_basis_set"], 16, 10, config["basis_set_heavy_atoms"],
-                   config["ecp_heavy_atoms"])
+def convert_gaussian_output_files_to_input_files_for_spe_calculation(data_dir, configs, options=None):
+    print("Convert Gaussian output files to input files for SPE calculation with config: ", config_names(configs))
+    return out_to_com_configs(data_dir, configs, "spe", options)
 
 
-def convert_xyz_files_to_input_files_for_optimization(data_dir, config):
-    print("Convert .xyz files to input files for optimization with configuration: ", config)
-    xyz_to_com_opt(data_dir, config["level_of_theory"], config["empirical_dispersion"], config["solvent"],
-                   config["basis_set"], config["split_basis_set"], 16, 10, config["basis_set_heavy_atoms"],
-                   config["ecp_heavy_atoms"])
+def convert_gaussian_output_files_to_input_files_for_optimization(data_dir, configs, options=None):
+    print("Convert Gaussian output files to input files for optimization with configuration: ", config_names(configs))
+    return out_to_com_configs(data_dir, configs, "reopt", options)
 
 
-def convert_gaussian_input_files_to_xyz_files(data_dir):
+def convert_xyz_files_to_input_files_for_spe_calculation(data_dir, configs, options=None):
+    print("Convert .xyz files to input files for SPE calculation with configuration: ", config_names(configs))
+    return xyz_to_com_spe(data_dir, configs, options)
+
+
+def convert_xyz_files_to_input_files_for_optimization(data_dir, configs, options=None):
+    print("Convert .xyz files to input files for optimization with configuration: ", config_names(configs))
+    return xyz_to_com_opt(data_dir, configs, options)
+
+
+def convert_fchk_files_to_input_files_for_spe_calculation(data_dir, configs, options=None):
+    print("Convert .fchk files to input files for SPE calculation with configuration: ", config_names(configs))
+    return fchk_to_com_configs(data_dir, configs, "spe", options)
+
+
+def convert_fchk_files_to_input_files_for_optimization(data_dir, configs, options=None):
+    print("Convert .fchk files to input files for optimization with configuration: ", config_names(configs))
+    return fchk_to_com_configs(data_dir, configs, "reopt", options)
+
+
+def convert_fchk_files_to_xyz_files(data_dir, options=None):
+    print("Convert .fchk files to .xyz files")
+    all_files_directory_fchk_to_xyz(data_dir, options)
+
+
+def convert_gaussian_input_files_to_xyz_files(data_dir, options=None):
     print("Convert Gaussian input files to .xyz files")
-    all_files_directory_com_to_xyz(data_dir)
+    all_files_directory_com_to_xyz(data_dir, options)
 
 
-def convert_gaussian_output_files_to_xyz_files(data_dir):
+def convert_gaussian_output_files_to_xyz_files(data_dir, options=None):
     print("Convert Gaussian output files to .xyz files")
-    all_files_directory_out_to_xyz(data_dir)
+    all_files_directory_out_to_xyz(data_dir, options)
+
+
+def convert_gaussian_output_files_to_xyz_trajectories(data_dir, options=None):
+    print("Convert Gaussian output files to multi-frame .xyz trajectories")
+    all_files_directory_out_to_xyz_trajectory(data_dir, options)
+
+
+def convert_gaussian_output_files_to_json_files(data_dir, options=None):
+    print("Extract properties from Gaussian output files to .json files")
+    all_files_directory_out_to_json(data_dir, options)
+
+
+def pack_input_files_into_slurm_arrays(data_dir, discovery=None, node_cores=32, node_mem=128, com_files=None):
+    """
+    :param com_files: Input files to pack, e.g. those a conversion just wrote (default: the .com files found by
+                      `discovery` in data_dir).
+    """
+    print(f"Pack Gaussian input files into SLURM array jobs for nodes with {node_cores} cores and {node_mem} GB")
+    if com_files is None:
+        discovery = discovery or FileDiscovery()
+        com_files = discovery.iter_files(data_dir, lambda name: name.endswith(".com"))
+    com_files = list(com_files)
+    for script_path, job in write_slurm_arrays(data_dir, com_files, node_cores, node_mem):
+        print(f"Wrote {script_path}: {len(job.inputs)} input(s) with {job.nproc} core(s) and {job.mem_alloc} GB, "
+              f"{job.slots} per node, {job.tasks} array task(s)")
+
+
+def index_gaussian_output_files(data_dir, db_path, jobs=1, discovery=None):
+    print(f"Index Gaussian output files into {db_path}")
+    index = ResultsIndex(db_path)
+    try:
+        indexed, skipped, failed = index.index_directory(data_dir, jobs, discovery=discovery)
+    finally:
+        index.close()
+    print(f"Indexed {indexed} file(s), skipped {skipped} unchanged, {failed} failed")
+
+
+def query_results_index(db_path, query):
+    index = ResultsIndex(db_path)
+    try:
+        columns, rows = index.query(query)
+    finally:
+        index.close()
+    print("\t".join(columns))
+    for row in rows:
+        print("\t".join("" if value is None else str(value) for value in row))
+
+
+def follow_gaussian_output_files(data_dir, poll_interval):
+    print("Follow running Gaussian jobs (Ctrl+C to stop)")
+    try:
+        follow_directory(data_dir, poll_interval)
+    except KeyboardInterrupt:
+        pass
 
 
 def run():
     parser = setup_parser()
     args = parser.parse_args()
+    discovery = FileDiscovery(args.recursive, args.include, args.exclude, args.max_depth, args.files_from, args.null)
+    metrics = RunMetrics(args.slowest, args.profile) if args.metrics or args.profile else None
+    frames = None
+    if args.frames or args.stride != 1 or args.energy_window is not None:
+        frames = FrameSelection.parse(args.frames, args.stride, args.energy_window)
+    sink = None
+    if args.output_archive or args.atomic_writes:
+        data_dir = args.from_gaussian_out or args.from_xyz or args.from_gaussian_in or args.from_fchk
+        if not data_dir or not (args.to_spe or args.to_opt or args.to_xyz or args.to_json):
+            parser.error("--output-archive and --atomic-writes apply to conversions (--to-spe, --to-opt, --to-xyz, "
+                         "--to-json)")
+        if args.output_archive and args.incremental:
+            parser.error("--incremental cannot be combined with --output-archive, which is written anew every run")
+        if args.output_archive and args.slurm_array:
+            parser.error("--slurm-array packs the .com files on disk and cannot be combined with --output-archive")
+        try:
+            sink = open_output_sink(data_dir, args.output_archive, args.atomic_writes)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    planner = None
+    if args.auto_resources:
+        try:
+            planner = ResourcePlanner(args.node_cores, args.node_mem)
+        except ValueError as e:
+            parser.error(str(e))
+    options = ConversionOptions(
+        jobs=args.jobs, incremental=args.incremental, discovery=discovery, metrics=metrics,
+        io_concurrency=args.io_concurrency, sink=sink, mem_alloc=args.mem, nproc=args.nproc,
+        dedup=ConformerDeduplicator(args.dedup_threshold) if args.dedup else None,
+        geometry_check=GeometryCheck(args.max_fragments) if args.check_geometry else None,
+        planner=planner,
+        frames=frames, keep_xyz=args.keep_xyz)
 
-    # gaussian output -> [spe, opt, xyz]
+    # gaussian output -> [spe, opt, xyz, json]
     # xyz             -> [spe, opt]
     # gaussian input  -> [xyz]
+    # fchk            -> [spe, opt, xyz]
+
+    com_files = None  # The .com files written by a --to-spe/--to-opt conversion, for --slurm-array
+    with sink or nullcontext():  # An archive is only moved into place if the conversion finishes
+        if args.from_gaussian_out and args.to_spe and args.config:
+            configs = selected_configs(args)
+            com_files = convert_gaussian_output_files_to_input_files_for_spe_calculation(
+                args.from_gaussian_out, configs, options)
+        elif args.from_gaussian_out and args.to_opt and args.config:
+            configs = selected_configs(args)
+            com_files = convert_gaussian_output_files_to_input_files_for_optimization(
+                args.from_gaussian_out, configs, options)
+        elif args.from_xyz and args.to_spe and args.config:
+            configs = selected_configs(args)
+            com_files = convert_xyz_files_to_input_files_for_spe_calculation(args.from_xyz, configs, options)
+        elif args.from_xyz and args.to_opt and args.config:
+            configs = selected_configs(args)
+            com_files = convert_xyz_files_to_input_files_for_optimization(args.from_xyz, configs, options)
+        elif args.from_fchk and args.to_spe and args.config:
+            configs = selected_configs(args)
+            com_files = convert_fchk_files_to_input_files_for_spe_calculation(args.from_fchk, configs, options)
+        elif args.from_fchk and args.to_opt and args.config:
+            configs = selected_configs(args)
+            com_files = convert_fchk_files_to_input_files_for_optimization(args.from_fchk, configs, options)
+        elif args.from_fchk and args.to_xyz:
+            convert_fchk_files_to_xyz_files(args.from_fchk, options)
+        elif args.from_gaussian_in and args.slurm_array:
+            try:
+                pack_input_files_into_slurm_arrays(args.from_gaussian_in, discovery, args.node_cores, args.node_mem)
+            except ValueError as e:  # An input needs more than one node
+                print(f"Error: {e}")
+                exit(1)
+        elif args.from_gaussian_in and args.to_xyz:
+            convert_gaussian_input_files_to_xyz_files(args.from_gaussian_in, options)
+        elif args.from_gaussian_out and args.to_xyz and args.trajectory:
+            convert_gaussian_output_files_to_xyz_trajectories(args.from_gaussian_out, options)
+        elif args.from_gaussian_out and args.to_xyz:
+            convert_gaussian_output_files_to_xyz_files(args.from_gaussian_out, options)
+        elif args.from_gaussian_out and args.to_json:
+            convert_gaussian_output_files_to_json_files(args.from_gaussian_out, options)
+        elif args.from_gaussian_out and args.follow:
+            follow_gaussian_output_files(args.from_gaussian_out, args.poll_interval)
+        elif args.index and args.query:
+            query_results_index(args.index, args.query)
+        elif args.index and args.from_gaussian_out:
+            index_gaussian_output_files(args.from_gaussian_out, args.index, args.jobs, discovery)
+        elif args.serve:
+            serve(args.serve)
+        elif args.list_config:
+            print(f"Available configurations:\n{DefaultConfig()}")
+        else:
+            parser.print_help()
+            exit(1)
+
+    if args.slurm_array and com_files is not None:
+        try:
+            pack_input_files_into_slurm_arrays(args.from_gaussian_out or args.from_xyz or args.from_fchk, None,
+                                               args.node_cores, args.node_mem, com_files)
+        except ValueError as e:
+            print(f"Error: {e}")
+            exit(1)
 
-    if args.from_gaussian_out and args.to_spe and args.config:
-        config = DefaultConfig.SPE_DEFAULTS[args.config]
-        convert_gaussian_output_files_to_input_files_for_spe_calculation(args.from_gaussian_out, config)
-    elif args.from_gaussian_out and args.to_opt and args.config:
-        config = DefaultConfig.SPE_DEFAULTS[args.config]
-        convert_gaussian_output_files_to_input_files_for_optimization(args.from_gaussian_out, config)
-    elif args.from_xyz and args.to_spe and args.config:
-        config = DefaultConfig.SPE_DEFAULTS[args.config]
-        convert_xyz_files_to_input_files_for_spe_calculation(args.from_xyz, config)
-    elif args.from_xyz and args.to_opt and args.config:
-        config = DefaultConfig.SPE_DEFAULTS[args.config]
-        convert_xyz_files_to_input_files_for_optimization(args.from_xyz, config)
-    elif args.from_gaussian_in and args.to_xyz:
-        convert_gaussian_input_files_to_xyz_files(args.from_gaussian_in)
-    elif args.from_gaussian_out and args.to_xyz:
-        convert_gaussian_output_files_to_xyz_files(args.from_gaussian_out)
-    elif args.list_config:
-        print(f"Available configurations:\n{DefaultConfig()}")
-    else:
-        parser.print_help()
-        exit(1)
+    if metrics is not None and metrics.batches:
+        metrics.finish(args.metrics)
 
 
 if __name__ == "__main__":
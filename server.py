@@ -0,0 +1,248 @@
+import json
+import os
+import signal
+import socket
+import socketserver
+import threading
+from collections import OrderedDict
+from functools import partial
+
+from default_config import DefaultConfig
+from file_converter import _input_job_molecules
+from gaussian_input import iter_gaussian_input_jobs
+from gaussian_parser import parse_gaussian_output
+from gaussian_scanner import iter_gaussian_frames, parse_gaussian_properties
+from log_io import is_gaussian_output, output_base_name
+from molecule import Molecule
+from to_com import _output_paths, molecule_to_coms, out_file_to_coms
+from writer import ComTemplate, write_xyz_file, write_xyz_trajectory
+
+
+class ParseCache:
+    """
+    Thread-safe LRU cache of parsed files. Entries are keyed by path, size and mtime, so a file that is rewritten is
+    parsed again. Cached objects are shared between requests and must not be modified.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.hits = self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, kind, path, parser):
+        """
+        :param kind: Name of the parser, so that one file can be cached as several kinds of result.
+        :param parser: Function parsing `path` on a cache miss.
+        """
+        stat = os.stat(path)
+        key = (kind, path, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        value = parser(path)  # Parsed outside the lock so other requests are not blocked
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+
+class ConversionServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Long-running conversion service on a Unix domain socket. Every connection is served by its own thread and may
+    send any number of requests, one JSON object per line; each request is answered with one JSON line.
+
+    Interpreter startup and imports are paid once, and the server keeps compiled ComTemplates per configuration and
+    a cache of parsed geometries between requests.
+
+    Request: {"op": ..., "input": path to a file or directory, "output": optional path for single-file operations,
+              "config": "1" | "1,3,5" | "all", "calculation_type": "spe" | "reopt", "mem": GB, "nproc": n,
+              "keep_xyz": also write the .xyz file for out_to_com}
+    Operations: out_to_xyz, out_to_xyz_trajectory, out_to_json, out_to_com, xyz_to_com, com_to_xyz, ping, stats,
+                shutdown.
+    Response: {"ok": bool, "processed": [[input, output or list of outputs], ...], "errors": [[input, message], ...]}
+    """
+
+    daemon_threads = True
+    INPUT_EXTENSIONS = {"out_to_xyz": ".out", "out_to_xyz_trajectory": ".out", "out_to_json": ".out",
+                        "out_to_com": ".out", "xyz_to_com": ".xyz", "com_to_xyz": ".com"}
+
+    def __init__(self, socket_path, cache_size=256):
+        if os.path.exists(socket_path):
+            if _is_listening(socket_path):
+                raise ValueError(f"A server is already listening on {socket_path}")
+            os.unlink(socket_path)  # Left behind by a server that was killed
+        self.socket_path = socket_path
+        self.cache = ParseCache(cache_size)
+        self.requests = 0
+        self._templates = {}
+        self._lock = threading.Lock()
+        # Only the owner may submit conversions. The socket is created with these permissions, so there is no window
+        # in which another user could connect before a chmod.
+        previous_umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, _RequestHandler)
+        finally:
+            os.umask(previous_umask)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def templates(self, config_keys, calculation_type, mem_alloc, nproc):
+        """
+        :return: ComTemplates for the selected configurations, built once and reused.
+        """
+        key = (config_keys, calculation_type, mem_alloc, nproc)
+        with self._lock:
+            templates = self._templates.get(key)
+            if templates is None:
+                templates = [ComTemplate.from_config(config, calculation_type, mem_alloc, nproc)
+                             for config in DefaultConfig.select(DefaultConfig.SPE_DEFAULTS, config_keys)]
+                self._templates[key] = templates
+        return templates
+
+    def handle_request(self, request):
+        """
+        Runs one request.
+        :return: Response dictionary.
+        """
+        with self._lock:
+            self.requests += 1
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True}
+        if op == "stats":
+            return {"ok": True, "requests": self.requests, "cache_hits": self.cache.hits,
+                    "cache_misses": self.cache.misses, "templates": len(self._templates)}
+        if op == "shutdown":
+            threading.Thread(target=self.shutdown).start()
+            return {"ok": True}
+        if op not in self.INPUT_EXTENSIONS:
+            raise ValueError(f"Unknown operation: {op}")
+
+        convert = getattr(self, f"_{op}")
+        templates = None
+        if op in ("out_to_com", "xyz_to_com"):
+            if not request.get("config"):
+                raise ValueError(f"{op} requires a config")
+            templates = self.templates(request["config"], request.get("calculation_type", "spe"),
+                                       request.get("mem", 16), request.get("nproc", 10))
+        if op == "out_to_com":
+            convert = partial(convert, keep_xyz=bool(request.get("keep_xyz")))
+
+        processed, errors = [], []
+        for input_file in self._input_files(request["input"], self.INPUT_EXTENSIONS[op]):
+            try:
+                processed.append([input_file, convert(input_file, request.get("output"), templates)])
+            except Exception as e:  # Reported for this file; the other files of the request are still converted
+                errors.append([input_file, str(e) or type(e).__name__])
+        return {"ok": not errors, "processed": processed, "errors": errors}
+
+    @staticmethod
+    def _input_files(path, extension):
+        if not os.path.isdir(path):
+            return [path]
+        if extension == ".out":
+            return sorted(os.path.join(path, name) for name in os.listdir(path) if is_gaussian_output(name))
+        return sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(extension))
+
+    @staticmethod
+    def _output_path(input_file, output_file, suffix):
+        if output_file and not os.path.isdir(output_file):
+            return output_file
+        directory = output_file or os.path.dirname(input_file)
+        return os.path.join(directory, f"{output_base_name(input_file)}{suffix}")
+
+    def _out_to_xyz(self, input_file, output_file, templates):
+        output_file = self._output_path(input_file, output_file, ".xyz")
+        write_xyz_file(self.cache.get("out", input_file, parse_gaussian_output), output_file)
+        return output_file
+
+    def _out_to_xyz_trajectory(self, input_file, output_file, templates):
+        output_file = self._output_path(input_file, output_file, "_trajectory.xyz")
+        write_xyz_trajectory(iter_gaussian_frames(input_file), output_file)
+        return output_file
+
+    def _out_to_json(self, input_file, output_file, templates):
+        output_file = self._output_path(input_file, output_file, ".json")
+        record = self.cache.get("properties", input_file, parse_gaussian_properties)
+        with open(output_file, 'w') as file:
+            json.dump(record.to_dict(), file, indent=2)
+        return output_file
+
+    def _com_to_xyz(self, input_file, output_file, templates):
+        # Same as --from-gaussian-in --to-xyz: every job of a --Link1-- deck with a geometry gets its own .xyz file
+        output_file = self._output_path(input_file, output_file, ".xyz")
+        jobs = self.cache.get("com", input_file, lambda path: list(iter_gaussian_input_jobs(path)))
+        output_files = []
+        for path, molecule in _input_job_molecules(jobs, output_file):
+            write_xyz_file(molecule, path)
+            output_files.append(path)
+        return output_files[0] if len(output_files) == 1 else output_files
+
+    def _xyz_to_com(self, input_file, output_file, templates):
+        molecule = self.cache.get("xyz", input_file, Molecule.from_xyz_file)
+        directory, xyz_file = os.path.split(input_file)
+        if output_file and os.path.isdir(output_file):
+            directory = output_file
+        com_file_paths = tuple(os.path.join(directory, template.com_file_name(xyz_file)) for template in templates)
+        molecule_to_coms(molecule, com_file_paths, templates)
+        return list(com_file_paths)
+
+    def _out_to_com(self, input_file, output_file, templates, keep_xyz=False):
+        # Same as --from-gaussian-out --to-spe/--to-opt: the inputs are generated from the cached final geometry, and
+        # the .xyz file is only written with keep_xyz (--keep-xyz)
+        directory = output_file if output_file and os.path.isdir(output_file) else os.path.dirname(input_file)
+        output_paths = _output_paths(directory, output_base_name(input_file), templates, keep_xyz)
+        molecule = self.cache.get("out", input_file, parse_gaussian_output)
+        out_file_to_coms(input_file, output_paths, templates, keep_xyz=keep_xyz, molecule=molecule)
+        return list(output_paths)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                response = self.server.handle_request(json.loads(line))
+            except KeyError as e:
+                response = {"ok": False, "error": f"Missing field {e}"}
+            except Exception as e:  # A bad request must not drop the connection without a response
+                response = {"ok": False, "error": str(e) or type(e).__name__}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+def _is_listening(socket_path):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            return False
+    return True
+
+
+def serve(socket_path, cache_size=256):
+    """
+    Runs the conversion server until it receives a shutdown request, SIGTERM or Ctrl+C.
+    """
+    server = ConversionServer(socket_path, cache_size)
+    # shutdown() waits for serve_forever() to return, so it must not run on the thread that is serving
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    print(f"Listening on {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,39 @@
+import math
+import random
+
+from conformers import ConformerDeduplicator, distance_spectrum, spectrum_profile
+from molecule import Molecule
+
+SYMBOLS = ["C"] * 10 + ["H"] * 22
+
+
+def _geometry(seed):
+    rng = random.Random(seed)
+    return [rng.uniform(-4.0, 4.0) for _ in range(3 * len(SYMBOLS))]
+
+
+def _rotated(coordinates, angle, shift):
+    c, s = math.cos(angle), math.sin(angle)
+    rotated = []
+    for x, y, z in zip(coordinates[0::3], coordinates[1::3], coordinates[2::3]):
+        rotated.extend((c * x - s * y + shift, s * x + c * y, z - shift))
+    return rotated
+
+
+def test_profile_has_a_fixed_size():
+    spectrum = distance_spectrum(Molecule.from_symbols(SYMBOLS, _geometry(0)))
+    means, lengths = spectrum_profile(spectrum)
+    assert len(spectrum) == 32 * 31 // 2
+    assert len(means) == len(lengths) == 64
+    assert sum(lengths) == len(spectrum)
+    assert math.isclose(sum(m * n for m, n in zip(means, lengths)), sum(spectrum))
+
+
+def test_moved_copies_are_duplicates_and_other_geometries_are_kept():
+    coordinates = _geometry(0)
+    dedup = ConformerDeduplicator(0.1)
+    assert dedup.check("first", Molecule.from_symbols(SYMBOLS, coordinates)) is None
+    name, rmsd = dedup.check("moved", Molecule.from_symbols(SYMBOLS, _rotated(coordinates, 1.0, 3.0)))
+    assert name == "first" and rmsd < 1e-9
+    assert dedup.check("other", Molecule.from_symbols(SYMBOLS, _geometry(1))) is None
+    assert dedup.duplicates == 1
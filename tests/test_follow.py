@@ -0,0 +1,31 @@
+from benchmark import SyntheticGaussianData
+from follow import FollowedLog
+
+
+def test_link1_chain_is_followed_past_the_first_normal_termination(tmp_path):
+    data = SyntheticGaussianData(n_atoms=4, n_steps=3)
+    log_path = tmp_path / "opt_freq.out"
+    log_path.write_text(data.output_text(0))
+    log = FollowedLog(str(log_path))
+
+    first_frames, first_energies = log.poll()
+    assert first_energies and not log.finished
+
+    with open(log_path, "a") as file:
+        file.write(" Link1:  Proceeding to internal job step number  2.\n" + data.output_text(1))
+    frames, energies = log.poll()
+    assert len(energies) == len(first_energies) and not log.finished
+
+    frames += log.poll()[0]  # Nothing appended since the second job terminated
+    assert log.finished
+    assert len(first_frames) + len(frames) == 2 * data.n_steps
+    assert log.poll() == ([], [])
+
+
+def test_error_termination_finishes_at_once(tmp_path):
+    log_path = tmp_path / "failed.out"
+    log_path.write_text(SyntheticGaussianData(n_atoms=4, n_steps=2).output_text(0).replace(
+        " Normal termination", " Error termination"))
+    log = FollowedLog(str(log_path))
+    log.poll()
+    assert log.finished
@@ -0,0 +1,75 @@
+import io
+
+from gaussian_input import iter_gaussian_input_jobs
+
+DECK = """\
+%chk=water.chk
+%mem=16GB
+# opt b3lyp/genecp
+
+water with ghost atoms
+
+0 1
+O     0.000000    0.000000    0.117300
+H     0.000000    0.757200   -0.469200
+H     0.000000   -0.757200   -0.469200
+Bq    1.000000    0.000000    0.000000
+C-Bq  2.000000    0.000000    0.000000
+X     3.000000    0.000000    0.000000
+
+H O 0
+6-31G(d)
+****
+
+--Link1--
+%chk=water.chk
+# freq geom=check guess=read
+
+frequencies
+
+0 1
+
+--Link1--
+# sp
+
+cation
+
+1 2
+O  0  0.0  0.0  0.0
+H -1  0.0  0.0  0.96
+
+"""
+
+
+def _jobs():
+    return list(iter_gaussian_input_jobs(io.StringIO(DECK)))
+
+
+def test_link1_jobs_are_split():
+    jobs = _jobs()
+    assert [job.index for job in jobs] == [0, 1, 2]
+    assert [job.title for job in jobs] == ["water with ghost atoms", "frequencies", "cation"]
+    assert jobs[0].link0 == {"chk": "water.chk", "mem": "16GB"}
+    assert jobs[1].route_has(r"geom=check")
+
+
+def test_job_reading_its_geometry_from_the_checkpoint_has_no_molecule():
+    assert _jobs()[1].molecule is None
+
+
+def test_ghost_and_dummy_atoms_keep_their_labels():
+    molecule = _jobs()[0].molecule
+    assert list(molecule.atomic_numbers) == [8, 1, 1, 0, 0, 0]
+    assert molecule.symbols == ["O", "H", "H", "Bq", "C-Bq", "X"]
+
+
+def test_gen_basis_section_follows_the_geometry():
+    assert _jobs()[0].basis == "H O 0\n6-31G(d)\n****\n"
+
+
+def test_charge_multiplicity_and_freeze_flags_of_a_later_job():
+    job = _jobs()[2]
+    assert (job.charge, job.multiplicity) == (1, 2)
+    assert (job.molecule.charge, job.molecule.multiplicity) == (1, 2)
+    assert job.freeze_flags == [0, -1]
+    assert list(job.molecule.coordinates) == [0.0, 0.0, 0.0, 0.0, 0.0, 0.96]
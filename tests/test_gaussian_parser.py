@@ -0,0 +1,43 @@
+import io
+
+from gaussian_parser import parse_gaussian_output_bytes, parse_gaussian_output_stream
+
+NOSYMM_LOG = """\
+ #p opt b3lyp/6-31g(d) nosymm
+ ----------------------------
+ Charge =  0 Multiplicity = 1
+                          Input orientation:
+ ---------------------------------------------------------------------
+ Center     Atomic      Atomic             Coordinates (Angstroms)
+ Number     Number       Type             X           Y           Z
+ ---------------------------------------------------------------------
+      1          8           0        0.000000    0.000000    0.120000
+      2          1           0        0.000000    0.760000   -0.480000
+      3          1           0        0.000000   -0.760000   -0.480000
+ ---------------------------------------------------------------------
+                          Input orientation:
+ ---------------------------------------------------------------------
+ Center     Atomic      Atomic             Coordinates (Angstroms)
+ Number     Number       Type             X           Y           Z
+ ---------------------------------------------------------------------
+      1          8           0        0.000000    0.000000    0.117300
+      2          1           0        0.000000    0.757200   -0.469200
+      3          1           0        0.000000   -0.757200   -0.469200
+ ---------------------------------------------------------------------
+ 1\\1\\GINC-NODE\\FOpt\\RB3LYP\\6-31G(d)\\H2O1\\USER\\01-Jan-2024\\0\\\\#p opt\\\\title\\\\0,1\\O,0.,0.,0.
+ \\H,0.,1.,0.\\H,0.,-1.,0.\\\\@
+ Normal termination of Gaussian 16 at Mon Jan  1 00:00:00 2024.
+"""
+
+
+def test_last_input_orientation_is_used_without_standard_orientation():
+    molecule = parse_gaussian_output_bytes(NOSYMM_LOG.encode())
+    assert list(molecule.atomic_numbers) == [8, 1, 1]
+    assert list(molecule.coordinates) == [0.0, 0.0, 0.1173, 0.0, 0.7572, -0.4692, 0.0, -0.7572, -0.4692]
+    assert (molecule.charge, molecule.multiplicity) == (0, 1)
+
+
+def test_reverse_and_forward_scans_agree_without_standard_orientation():
+    reverse = parse_gaussian_output_bytes(NOSYMM_LOG.encode())
+    forward = parse_gaussian_output_stream(io.StringIO(NOSYMM_LOG))
+    assert list(reverse.coordinates) == list(forward.coordinates)
@@ -0,0 +1,29 @@
+import io
+
+from gaussian_scanner import parse_gaussian_properties
+
+HPMODES_LOG = """\
+ Harmonic frequencies (cm**-1), IR intensities (KM/Mole), Raman scattering
+ activities (A**4/AMU), depolarization ratios for plane and unpolarized
+ incident light, reduced masses (AMU), force constants (mDyne/A),
+ and normal coordinates:
+                                  1                      2                      3
+                                  A                      A                      A
+ Frequencies ---    -100.1234              1590.4567              3657.8901
+ Reduced masses ---    1.0782                 1.0449                 1.0895
+ Harmonic frequencies (cm**-1), IR intensities (KM/Mole), Raman scattering
+ activities (A**4/AMU), depolarization ratios for plane and unpolarized
+ incident light, reduced masses (AMU), force constants (mDyne/A),
+ and normal coordinates:
+                      1                      2                      3
+                      A                      A                      A
+ Frequencies --   -100.1234              1590.4567              3657.8901
+ Red. masses --      1.0782                 1.0449                 1.0895
+ Normal termination of Gaussian 16 at Mon Jan  1 00:00:00 2024.
+"""
+
+
+def test_hpmodes_frequencies_are_read_from_the_standard_table():
+    record = parse_gaussian_properties(io.StringIO(HPMODES_LOG))
+    assert record.frequencies == [-100.1234, 1590.4567, 3657.8901]
+    assert record.termination == "normal"
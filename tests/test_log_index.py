@@ -0,0 +1,21 @@
+from gaussian_scanner import parse_gaussian_properties
+from log_index import GaussianLog, LogIndex, NORMAL_TERMINATION, HARMONIC_FREQUENCIES
+from test_gaussian_scanner import HPMODES_LOG
+
+LOG = " Entering Gaussian System, Link 0=g16\n" + HPMODES_LOG
+
+
+def test_hpmodes_frequencies_match_the_scanner(tmp_path):
+    log_path = tmp_path / "hpmodes.out"
+    log_path.write_text(LOG)
+    with GaussianLog(str(log_path), use_sidecar=False) as log:
+        assert log.frequencies() == [-100.1234, 1590.4567, 3657.8901]
+        assert log.frequencies() == parse_gaussian_properties(str(log_path)).frequencies
+        assert log.termination() == "normal"
+
+
+def test_index_is_built_in_file_order():
+    index = LogIndex.build(LOG.encode(), 0, 0)
+    assert list(index.kinds) == [HARMONIC_FREQUENCIES, HARMONIC_FREQUENCIES, NORMAL_TERMINATION]
+    assert list(index.offsets) == sorted(index.offsets)
+    assert LOG[index.offsets[-1]:].startswith(" Normal termination")
@@ -0,0 +1,29 @@
+import threading
+
+from metrics import StageTimer, is_measuring, stage
+
+
+def test_stage_timers_are_per_thread():
+    entered = threading.Event()
+    release = threading.Event()
+    seen = []
+
+    def other_thread():
+        entered.wait()
+        seen.append(is_measuring())
+        with stage("parse"):  # Must not land in the main thread's timer
+            pass
+        release.set()
+
+    thread = threading.Thread(target=other_thread)
+    thread.start()
+    with StageTimer() as timer:
+        entered.set()
+        release.wait()
+        with stage("write"):
+            pass
+    thread.join()
+
+    assert seen == [False]
+    assert set(timer.seconds) == {"write"}
+    assert not is_measuring()
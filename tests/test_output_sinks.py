@@ -0,0 +1,26 @@
+import os
+import tarfile
+
+import pytest
+
+from output_sinks import ArchiveSink
+
+
+def test_archive_members_are_relative_to_the_root(tmp_path):
+    root = tmp_path / "data"
+    with ArchiveSink(str(tmp_path / "out.tar"), str(root)) as sink:
+        sink.write_text(os.path.join(root, "sub", "a.com"), "content\n")
+        assert sink.output_name(os.path.join(root, "sub", "a.com")) == "sub/a.com"
+    with tarfile.open(tmp_path / "out.tar") as archive:
+        assert archive.getnames() == ["sub/a.com"]
+
+
+def test_archive_rejects_outputs_outside_the_root(tmp_path):
+    root = tmp_path / "data"
+    with ArchiveSink(str(tmp_path / "out.tar"), str(root)) as sink:
+        with pytest.raises(ValueError):
+            sink.write_text(str(tmp_path / "a.com"), "content\n")
+        with pytest.raises(ValueError):
+            sink.write_text(str(root / ".." / ".." / "a.com"), "content\n")
+    with tarfile.open(tmp_path / "out.tar") as archive:
+        assert archive.getnames() == []
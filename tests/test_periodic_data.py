@@ -0,0 +1,15 @@
+import pytest
+
+from periodic_data import PeriodicData
+
+
+def test_ghost_and_dummy_atoms_get_no_basis_set():
+    # Pt, C, H and two atoms without an element (Bq, X)
+    assert PeriodicData.classify_elements([78, 6, 1, 0, 0]) == (("Pt",), ("C", "H"))
+
+
+def test_atomic_numbers_written_as_strings():
+    assert list(PeriodicData.symbols_to_numbers(["6", "118", "ni"])) == [6, 118, 28]
+    for label in ("119", "200"):
+        with pytest.raises(ValueError, match="Invalid atomic number"):
+            PeriodicData.symbols_to_numbers([label])
@@ -0,0 +1,87 @@
+import threading
+
+from pipeline import DelayedFileSystem, run_pipeline
+
+
+def _upper(input_file, output_file, data):
+    if data.startswith(b"bad"):
+        raise ValueError("cannot convert")
+    return [(output_file, data.decode().upper())]
+
+
+class CountingFileSystem(DelayedFileSystem):
+    """
+    Records how many reads are in flight at once and how far reading runs ahead of writing.
+    """
+
+    def __init__(self):
+        super().__init__(latency=0.01)
+        self._lock = threading.Lock()
+        self.reading = 0
+        self.max_reading = 0
+        self.produced = 0
+        self.written = 0
+        self.max_ahead = 0
+
+    def read_bytes(self, path):
+        with self._lock:
+            self.reading += 1
+            self.max_reading = max(self.max_reading, self.reading)
+        try:
+            return super().read_bytes(path)
+        finally:
+            with self._lock:
+                self.reading -= 1
+
+    def write_text(self, path, content):
+        super().write_text(path, content)
+        with self._lock:
+            self.written += 1
+
+
+def _inputs(directory, count, bad=()):
+    tasks = []
+    for i in range(count):
+        path = directory / f"{i}.txt"
+        path.write_text(f"bad {i}" if i in bad else f"file {i}")
+        tasks.append((str(path), str(directory / f"{i}.out")))
+    return tasks
+
+
+def test_every_task_is_read_rendered_written_and_reported(tmp_path, capsys):
+    tasks = _inputs(tmp_path, 12, bad={5})
+    failed = run_pipeline(tasks, _upper, io_concurrency=4, file_system=DelayedFileSystem(latency=0.002))
+
+    assert failed == 1
+    for i, (_, output_file) in enumerate(tasks):
+        if i == 5:
+            assert not (tmp_path / "5.out").exists()
+        else:
+            assert (tmp_path / f"{i}.out").read_text() == f"FILE {i}"
+    lines = capsys.readouterr().out.splitlines()
+    assert sorted(lines) == sorted([f"Processed {i}.txt -> {tmp_path / f'{i}.out'}" for i in range(12) if i != 5]
+                                   + ["Error processing 5.txt: cannot convert"])
+
+
+def test_reads_overlap_up_to_the_io_concurrency(tmp_path):
+    file_system = CountingFileSystem()
+    run_pipeline(_inputs(tmp_path, 20), _upper, io_concurrency=3, file_system=file_system)
+    assert 1 < file_system.max_reading <= 3
+
+
+def test_bounded_queues_keep_reading_from_running_ahead_of_writing(tmp_path):
+    file_system = CountingFileSystem()
+    io_concurrency = 2
+
+    def tasks():
+        for task in _inputs(tmp_path, 40):
+            with file_system._lock:
+                file_system.produced += 1
+                file_system.max_ahead = max(file_system.max_ahead, file_system.produced - file_system.written)
+            yield task
+
+    assert run_pipeline(tasks(), _upper, io_concurrency=io_concurrency, file_system=file_system) == 0
+    assert file_system.written == 40
+    # Queues and threads of the read, render (one job) and write stages, plus the task being fed
+    in_flight = 2 * io_concurrency + 2 + 1 + 2 * io_concurrency + 1
+    assert file_system.max_ahead <= in_flight
@@ -0,0 +1,75 @@
+import pytest
+
+from default_config import DefaultConfig
+from molecule import Molecule
+from resources import ResourcePlanner, pack_inputs, read_link0_resources, scheduler_memory
+from writer import ComTemplate
+
+TEMPLATE = ComTemplate.from_config(DefaultConfig.SPE_DEFAULTS["1"], "spe", 16, 10)
+
+
+def _alkane(n_carbons):
+    symbols = ["C"] * n_carbons + ["H"] * (2 * n_carbons + 2)
+    return Molecule.from_symbols(symbols, [float(i) for i in range(3 * len(symbols))])
+
+
+def _write_input(directory, name, mem, nproc, atoms=1):
+    path = directory / name
+    path.write_text(f"%mem={mem}\n%nprocshared={nproc}\n# sp\n\ntitle\n\n0 1\n" + "H 0.0 0.0 0.0\n" * atoms + "\n")
+    return str(path)
+
+
+@pytest.mark.parametrize("node_cores, node_mem", [(32, 128), (48, 192), (16, 64)])
+def test_planned_jobs_fill_a_node_without_exceeding_it(node_cores, node_mem):
+    planner = ResourcePlanner(node_cores, node_mem)
+    for n_carbons in (1, 10, 40):
+        resources = planner.plan(_alkane(n_carbons), TEMPLATE)
+        assert node_cores % resources.nproc == 0
+        assert (node_cores // resources.nproc) * scheduler_memory(resources.mem_alloc) <= node_mem
+
+
+def test_larger_molecules_get_more_cores():
+    planner = ResourcePlanner(32, 128)
+    cores = [planner.plan(_alkane(n_carbons), TEMPLATE).nproc for n_carbons in (1, 10, 40, 80)]
+    assert cores == sorted(cores)
+    assert cores[0] < cores[-1]
+
+
+def test_molecule_too_large_for_a_node_is_rejected():
+    with pytest.raises(ValueError):
+        ResourcePlanner(4, 8).plan(_alkane(200), TEMPLATE)
+
+
+def test_link0_memory_units(tmp_path):
+    assert read_link0_resources(_write_input(tmp_path, "gb.com", "16GB", 8)) == (16, 8)
+    assert read_link0_resources(_write_input(tmp_path, "mb.com", "2500MB", 1)) == (3, 1)
+    assert read_link0_resources(_write_input(tmp_path, "mw.com", "250MW", 2)) == (2, 2)
+
+
+def test_inputs_are_packed_by_resources_within_the_node_limits(tmp_path):
+    small = [_write_input(tmp_path, f"small_{i}.com", "4GB", 4, atoms=i + 1) for i in range(10)]
+    large = [_write_input(tmp_path, f"large_{i}.com", "56GB", 16) for i in range(3)]
+    jobs = pack_inputs(small + large, node_cores=32, node_mem=128)
+
+    assert [(job.nproc, job.mem_alloc) for job in jobs] == [(16, 56), (4, 4)]
+    large_job, small_job = jobs
+    assert large_job.slots == 2  # Two 16-core jobs per node; 2 x 62 GB fits into 128 GB
+    assert large_job.tasks == 2
+    assert small_job.slots == 8  # Limited by cores, not by memory
+    assert small_job.inputs == small[::-1]  # Largest input first
+    for job in jobs:
+        assert job.slots * job.nproc <= 32
+        assert job.slots * scheduler_memory(job.mem_alloc) <= 128
+
+
+def test_memory_can_limit_the_inputs_per_node(tmp_path):
+    inputs = [_write_input(tmp_path, f"{i}.com", "40GB", 2) for i in range(6)]
+    job, = pack_inputs(inputs, node_cores=32, node_mem=128)
+    assert job.slots == 2  # 44 GB each with the scheduler's margin
+
+
+def test_input_larger_than_a_node_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        pack_inputs([_write_input(tmp_path, "huge.com", "200GB", 8)], node_cores=32, node_mem=128)
+    with pytest.raises(ValueError):
+        pack_inputs([_write_input(tmp_path, "wide.com", "8GB", 64)], node_cores=32, node_mem=128)
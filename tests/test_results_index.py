@@ -0,0 +1,35 @@
+import gzip
+import os
+import tarfile
+
+from benchmark import SyntheticGaussianData
+from build_manifest import BuildManifest
+from results_index import ResultsIndex
+
+
+def test_plain_compressed_and_archived_logs_are_indexed_once(tmp_path):
+    data = SyntheticGaussianData(n_atoms=5, n_steps=2)
+    directory = tmp_path / "logs"
+    directory.mkdir()
+    (directory / "conf_1.out").write_text(data.output_text(0))
+    with gzip.open(directory / "conf_2.out.gz", "wt") as file:
+        file.write(data.output_text(1))
+    member = tmp_path / "conf_3.out"
+    member.write_text(data.output_text(2))
+    with tarfile.open(directory / "batch.tar.gz", "w:gz") as archive:
+        archive.add(member, "runs/conf_3.out")
+
+    index = ResultsIndex(str(tmp_path / "results.db"))
+    try:
+        assert index.index_directory(str(directory)) == (3, 0, 0)
+        columns, rows = index.query("SELECT name, family, n_atoms FROM jobs ORDER BY name")
+        assert rows == [("conf_1", "conf", 5), ("conf_2", "conf", 5), ("conf_3", "conf", 5)]
+        for path, sha256 in index.connection.execute("SELECT path, sha256 FROM files"):
+            assert sha256 == BuildManifest.file_hash(path)
+
+        assert index.index_directory(str(directory)) == (0, 3, 0)
+        os.utime(directory / "conf_1.out")  # Touched but unchanged
+        assert index.index_directory(str(directory)) == (0, 3, 0)
+        assert index.index_directory(str(directory)) == (0, 3, 0)
+    finally:
+        index.close()
@@ -0,0 +1,42 @@
+import os
+
+from conversion_options import ConversionOptions
+from default_config import DefaultConfig
+from to_com import xyz_to_com_configs
+
+WATER = "3\nwater\nO 0.0 0.0 0.1173\nH 0.0 0.7572 -0.4692\nH 0.0 -0.7572 -0.4692\n"
+
+
+def _convert(folder, capsys, **options):
+    options = ConversionOptions(incremental=True, **options)
+    xyz_to_com_configs(str(folder), [DefaultConfig.SPE_DEFAULTS["1"]], "spe", options)
+    return capsys.readouterr().out.splitlines()
+
+
+def test_incremental_rerun_only_converts_changed_inputs(tmp_path, capsys):
+    for name in ("a", "b", "c"):
+        (tmp_path / f"{name}.xyz").write_text(WATER)
+
+    first = _convert(tmp_path, capsys)
+    assert len([line for line in first if line.startswith("Processed")]) == 3
+    assert _convert(tmp_path, capsys) == ["Skipped 3 up-to-date file(s)"]
+
+    (tmp_path / "b.xyz").write_text(WATER.replace("water", "water, moved").replace("0.1173", "0.2173"))
+    os.utime(tmp_path / "c.xyz", ns=(0, os.stat(tmp_path / "c.xyz").st_mtime_ns + 10 ** 9))  # Touched, not changed
+    rerun = _convert(tmp_path, capsys)
+    assert [line.split(" ->")[0] for line in rerun if line.startswith("Processed")] == ["Processed b.xyz"]
+    assert rerun[-1] == "Skipped 2 up-to-date file(s)"
+
+
+def test_incremental_rerun_in_the_pipeline_redoes_deleted_outputs(tmp_path, capsys):
+    for name in ("a", "b"):
+        (tmp_path / f"{name}.xyz").write_text(WATER)
+    _convert(tmp_path, capsys, io_concurrency=2)
+
+    com_files = sorted(path for path in os.listdir(tmp_path) if path.endswith(".com"))
+    assert len(com_files) == 2
+    os.remove(tmp_path / com_files[0])
+    rerun = _convert(tmp_path, capsys, io_concurrency=2)
+    assert len([line for line in rerun if line.startswith("Processed")]) == 1
+    assert rerun[-1] == "Skipped 1 up-to-date file(s)"
+    assert os.path.exists(tmp_path / com_files[0])
@@ -0,0 +1,18 @@
+import pytest
+
+from xyz_frames import comment_energy
+
+
+@pytest.mark.parametrize("comment, energy", [
+    ("E=-1234.5", -1234.5),
+    (" energy: -12.3 gnorm: 0.0004 xtb: 6.5.1", -12.3),
+    ("Coordinates from ORCA-job input E -123.4", -123.4),
+    ("       -27.17627443\n", -27.17627443),  # CREST
+])
+def test_comment_energy(comment, energy):
+    assert comment_energy(comment) == energy
+
+
+@pytest.mark.parametrize("comment", ["123 conformers", "1.5 kcal/mol above the minimum", "frame 3", "", "42"])
+def test_comment_without_energy(comment):
+    assert comment_energy(comment) is None
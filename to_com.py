@@ -1,7 +1,21 @@
 import os
-import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
-from writer import write_com_file
+from batch_runner import _untimed, run_batch
+from build_manifest import BuildManifest
+from conversion_options import ConversionOptions
+from fchk_reader import is_fchk_file, parse_fchk_geometry
+from gaussian_parser import parse_gaussian_output, parse_gaussian_output_bytes
+from geometry import analyze_geometry
+from log_io import (archive_member_directory, archive_output_directory, decompress, is_gaussian_output,
+                    is_tar_archive, iter_tar_outputs, output_base_name)
+from metrics import is_measuring, stage
+from molecule import Molecule
+from pipeline import run_pipeline
+from writer import ComTemplate, format_xyz_file, write_xyz_file
+from xyz_frames import is_xyz_ensemble, iter_xyz_frames
 from periodic_data import PeriodicData
 
 
@@ -11,45 +25,23 @@ def sort_elements_for_genecp(elements):
     :param elements: List of elements to sort
     :return:
     """
-    atomic_numbers = {symbol: num for num, symbol in
-                      PeriodicData.PERIODIC_TABLE.items()}  # Create a reverse lookup to get atomic numbers for symbols
-
-    def sort_key(element):
-        if element == "C":
-            return (0,)
-        elif element == "H":
-            return (1,)
-        else:
-            return (2, atomic_numbers.get(element,
-                                          str('X')))  # Return a tuple where second item is the atomic number or X if not found
-
-    return sorted(elements, key=sort_key)
+    return sorted(elements, key=PeriodicData.genecp_sort_key)
 
 
-def process_elements(content):
+def process_elements(molecule):
     """
-    Extracts unique elements from the content of an .xyz file and separates them into heavy metals and non-heavy metals.
+    Extracts unique elements from a molecule and separates them into heavy metals and non-heavy metals.
     """
-    elements = set()  # initialize an empty set
-    for line in content:
-        element = line.split()[0]  # extract the element from the line
-        elements.add(element)  # add the element to the set
-
-    # Separate elements into heavy metals and non-heavy metals
-    heavy_metals_in_molecule = [el for el in elements if el in PeriodicData.HEAVY_METALS]
-    non_heavy_metals_in_molecule = [el for el in elements if el not in PeriodicData.HEAVY_METALS]
-
-    # Sort the elements for GenECP
-    heavy_metals_sorted = sort_elements_for_genecp(heavy_metals_in_molecule)
-    non_heavy_metals_sorted = sort_elements_for_genecp(non_heavy_metals_in_molecule)
-
-    return heavy_metals_sorted, non_heavy_metals_sorted
+    # Classified once per distinct composition, sorted for GenECP
+    heavy_metals_sorted, non_heavy_metals_sorted = PeriodicData.classify_elements(molecule.atomic_numbers)
+    return list(heavy_metals_sorted), list(non_heavy_metals_sorted)
 
 
 def xyz_to_com(folder_path, theory, dispersion, solvent, basis_set, calculation_type, split_basis_set, mem_alloc, nproc,
-               basis_set_heavy_atoms, ecp_heavy_atoms):
+               basis_set_heavy_atoms, ecp_heavy_atoms, options=None):
     """
-    Processes all .xyz files in the specified folder, creating a new .com file for each of them.
+    Processes all .xyz files in the specified folder, creating a new .com file for each of them (for each selected
+    frame of a multi-frame .xyz file, see xyz_to_com_templates).
     The new file will be a Gaussian input file for either optimization or SPE calculation.
 
     :param folder_path: Path to the folder containing the .xyz files
@@ -63,32 +55,567 @@ def xyz_to_com(folder_path, theory, dispersion, solvent, basis_set, calculation_
     :param nproc:
     :param mem_alloc:
     :param split_basis_set:
+    :param options: ConversionOptions; its mem_alloc and nproc are not used, the template gets the ones given here.
+    """
+    template = ComTemplate(theory, dispersion, solvent, basis_set, calculation_type, split_basis_set, mem_alloc, nproc,
+                           basis_set_heavy_atoms, ecp_heavy_atoms)
+    return xyz_to_com_templates(folder_path, [template], options)
+
+
+def xyz_to_com_configs(folder_path, configs, calculation_type, options=None):
+    """
+    Generates Gaussian input files for several configurations in a single pass over the .xyz files.
+    Each geometry is read and its elements classified once, then one .com file per configuration is written.
+
+    :param folder_path: Path to the folder containing the .xyz files
+    :param configs: List of DefaultConfig.SPE_DEFAULTS/OPT_DEFAULTS entries
+    :param calculation_type: Either 'reopt' for optimization or 'spe' for single point energy
+    :param options: ConversionOptions (default: the top level of the folder, one file at a time).
+    """
+    options = options or ConversionOptions()
+    return xyz_to_com_templates(folder_path, _config_templates(configs, calculation_type, options), options)
+
+
+def xyz_to_com_templates(folder_path, templates, options=None):
+    """
+    Writes one .com file per template for every .xyz file in the folder, next to the .xyz file. With
+    options.io_concurrency > 0, reading, rendering and writing overlap (see pipeline.run_pipeline). With a
+    ConformerDeduplicator as options.dedup, geometries that duplicate an earlier one are reported and skipped; with a
+    GeometryCheck, broken geometries are reported as errors; with a ResourcePlanner, every input gets its own %mem
+    and %nprocshared.
+
+    Multi-frame .xyz files (conformer ensembles, trajectories) are streamed frame by frame: the frames selected by
+    options.frames are written into a folder named after the file as <name>_f<frame>_<template>.com, as members of
+    tar archives are. Ensembles are not compared by `dedup`.
+
+    With an output_sinks.OutputSink as options.sink, the run always uses the pipeline and every file, including the
+    frames of ensembles, is handed to the sink instead of being written next to its input.
+
+    :param options: ConversionOptions (default: the top level of the folder, one file at a time); its mem_alloc and
+                    nproc are not used, the templates carry their own.
+    :return: Generator of the .com files of the converted inputs that exist after the run (see _com_files).
+    """
+    options = options or ConversionOptions()
+    discovery, metrics, dedup, sink = options.discovery, options.metrics, options.dedup, options.sink
+    ensembles = set()
+    parsed = set()
+
+    def xyz_files():
+        paths = discovery.iter_files(folder_path, lambda name: name.endswith(".xyz"))
+        for xyz_file_path, is_ensemble in _concurrently(is_xyz_ensemble, paths, max(options.io_concurrency, 8)):
+            if is_ensemble:
+                ensembles.add(xyz_file_path)
+            yield xyz_file_path
+
+    def tasks():
+        for xyz_file_path, molecule in _unique_geometries(xyz_files(), Molecule.from_xyz_file, dedup, discovery,
+                                                          metrics, ensembles.__contains__):
+            xyz_directory, xyz_file = os.path.split(xyz_file_path)
+            if xyz_file_path in ensembles:
+                yield xyz_file_path, os.path.join(xyz_directory, os.path.splitext(xyz_file)[0])
+            else:
+                yield _task(xyz_file_path, tuple(os.path.join(xyz_directory, template.com_file_name(xyz_file))
+                                                 for template in templates), molecule, parsed)
+
+    manifest = BuildManifest(folder_path) if options.incremental else None
+    configs = _manifest_configs(templates, options.planner, frames=options.frames)
+    arguments = dict(templates=tuple(templates), geometry_check=options.geometry_check, planner=options.planner,
+                     frames=options.frames)
+    targets = []
+    if options.pipelined:
+        renderer = partial(render_xyz_to_coms, **arguments, to_sink=sink is not None)
+        run_pipeline(_record_targets(tasks(), targets), renderer, options.jobs, max(options.io_concurrency, 1),
+                     manifest, configs, metrics, should_read=lambda path: path not in ensembles and path not in parsed,
+                     file_system=sink, stream=(lambda path: path in ensembles) if sink is not None else None)
+    else:
+        run_batch(_record_targets(tasks(), targets), partial(xyz_file_to_coms, **arguments), options.jobs, manifest,
+                  configs, largest_first=not discovery.streaming, metrics=metrics)
+    return _com_files(targets, templates)
+
+
+def out_to_com_configs(folder_path, configs, calculation_type, options=None):
+    """
+    Generates Gaussian input files for several configurations directly from Gaussian output files. The final
+    geometry of every log is passed to the templates in memory, so no .xyz file is written and read back (unless
+    options.keep_xyz asks for it), and .xyz files already in the folder are left alone.
+    See xyz_to_com_configs for the parameters.
+    """
+    options = options or ConversionOptions()
+    return out_to_com_templates(folder_path, _config_templates(configs, calculation_type, options), options)
+
+
+def out_to_com_templates(folder_path, templates, options=None):
+    """
+    Writes one .com file per template (and with options.keep_xyz the .xyz file) for every Gaussian output in the folder,
+    next to the log. Members of tar archives are written into a folder named after the archive, as by --to-xyz;
+    they are not compared by `dedup`. See xyz_to_com_templates for the other parameters and the return value.
+    """
+    options = options or ConversionOptions()
+    discovery, metrics, sink, keep_xyz = options.discovery, options.metrics, options.sink, options.keep_xyz
+
+    def is_input(name):
+        return is_tar_archive(name) or is_gaussian_output(name)
+
+    parsed = set()
+    # Archives are streamed into the sink in this process, so their members can be reported by their name in the sink
+    archive_options = ({"output_name": sink.output_name},) if sink is not None else ()
+
+    def tasks():
+        archive_directories = {}
+        input_files = discovery.iter_files(folder_path, is_input)
+        for input_file, molecule in _unique_geometries(input_files, _parse_output_geometry, options.dedup, discovery,
+                                                       metrics):
+            input_directory, filename = os.path.split(input_file)
+            if is_tar_archive(filename):
+                try:
+                    output_directory = archive_output_directory(input_file, archive_directories)
+                except ValueError as e:
+                    (metrics.message if metrics is not None else print)(f"Error processing {filename}: {e}")
+                    continue
+                yield (input_file, output_directory) + archive_options
+            else:
+                yield _task(input_file, _output_paths(input_directory, output_base_name(filename), templates,
+                                                      keep_xyz), molecule, parsed)
+
+    manifest = BuildManifest(folder_path) if options.incremental else None
+    configs = _manifest_configs(templates, options.planner, keep_xyz)
+    arguments = _output_arguments(templates, options)
+    targets = []
+    if options.pipelined:
+        renderer = partial(render_out_to_coms, **arguments, to_sink=sink is not None)
+        run_pipeline(_record_targets(tasks(), targets), renderer, options.jobs, max(options.io_concurrency, 1),
+                     manifest, configs, metrics,
+                     should_read=lambda path: not is_tar_archive(path) and path not in parsed, file_system=sink,
+                     stream=is_tar_archive if sink is not None else None)
+    else:
+        run_batch(_record_targets(tasks(), targets), partial(out_file_to_coms, **arguments), options.jobs, manifest,
+                  configs, largest_first=not discovery.streaming, metrics=metrics)
+    return _com_files(targets, templates)
+
+
+def fchk_to_com_configs(folder_path, configs, calculation_type, options=None):
+    """
+    Generates Gaussian input files for several configurations from formatted checkpoint (.fchk) files. Only the
+    sections holding the current geometry, charge and multiplicity are read from each file.
+    See xyz_to_com_configs for the parameters.
+    """
+    options = options or ConversionOptions()
+    return fchk_to_com_templates(folder_path, _config_templates(configs, calculation_type, options), options)
+
+
+def fchk_to_com_templates(folder_path, templates, options=None):
+    """
+    Writes one .com file per template (and with options.keep_xyz the .xyz file) for every .fchk file in the folder,
+    next to it. See xyz_to_com_templates for the other parameters and the return value.
+    """
+    options = options or ConversionOptions()
+    discovery, metrics = options.discovery, options.metrics
+    parsed = set()
+
+    def tasks():
+        fchk_files = discovery.iter_files(folder_path, is_fchk_file)
+        for fchk_file_path, molecule in _unique_geometries(fchk_files, _parse_fchk_geometry, options.dedup, discovery,
+                                                           metrics):
+            directory, filename = os.path.split(fchk_file_path)
+            yield _task(fchk_file_path, _output_paths(directory, output_base_name(filename), templates,
+                                                      options.keep_xyz), molecule, parsed)
+
+    manifest = BuildManifest(folder_path) if options.incremental else None
+    configs = _manifest_configs(templates, options.planner, options.keep_xyz)
+    arguments = _output_arguments(templates, options)
+    targets = []
+    if options.pipelined:
+        run_pipeline(_record_targets(tasks(), targets), partial(render_fchk_to_coms, **arguments), options.jobs,
+                     max(options.io_concurrency, 1), manifest, configs, metrics,
+                     should_read=lambda path: path not in parsed, file_system=options.sink)
+    else:
+        run_batch(_record_targets(tasks(), targets), partial(fchk_file_to_coms, **arguments), options.jobs, manifest,
+                  configs, largest_first=not discovery.streaming, metrics=metrics)
+    return _com_files(targets, templates)
+
+
+def _config_templates(configs, calculation_type, options):
+    return [ComTemplate.from_config(config, calculation_type, options.mem_alloc, options.nproc) for config in configs]
+
+
+def _output_arguments(templates, options):
+    """
+    :return: Keyword arguments of the Gaussian output and .fchk workers and renderers, the same for every file.
+    """
+    return dict(templates=tuple(templates), geometry_check=options.geometry_check, planner=options.planner,
+                keep_xyz=options.keep_xyz)
+
+
+def _record_targets(tasks, targets):
+    for task in tasks:
+        targets.append(task[1])
+        yield task
+
+
+def _com_files(targets, templates):
+    """
+    :return: Generator of the .com files among `targets` that exist after the run, so the inputs that failed to
+             convert are left out. Archives and ensembles have a folder as their target; in it, every .com file named
+             after one of `templates` is taken.
+    """
+    suffixes = tuple(template.com_file_name(".xyz") for template in templates)
+    for target in targets:
+        if isinstance(target, tuple):
+            yield from (path for path in target if path.endswith(".com") and os.path.exists(path))
+        else:
+            for directory, _, filenames in os.walk(target):
+                yield from (os.path.join(directory, filename) for filename in sorted(filenames)
+                            if filename.endswith(suffixes))
+
+
+def _output_paths(directory, base_name, templates, keep_xyz):
+    """
+    :return: Tuple of the .com paths for a geometry named `base_name`, preceded by the .xyz path if `keep_xyz`.
+    """
+    xyz_file = f"{base_name}.xyz"
+    com_file_paths = tuple(os.path.join(directory, template.com_file_name(xyz_file)) for template in templates)
+    return ((os.path.join(directory, xyz_file),) if keep_xyz else ()) + com_file_paths
+
+
+def _manifest_configs(templates, planner, keep_xyz=False, frames=None):
+    """
+    :return: Manifest configuration of every output, matching the paths from _output_paths.
+    """
+    extra = {}
+    if planner is not None:
+        extra["resources"] = planner.config
+    if frames is not None:
+        extra["frames"] = frames.config
+    configs = tuple(dict(template.config, **extra) if extra else template.config for template in templates)
+    return ((None,) if keep_xyz else ()) + configs
+
+
+def _task(input_file, output_file, molecule, parsed):
+    """
+    :return: The task for run_batch/run_pipeline. A molecule already parsed for `dedup` is passed to the worker as its
+             `molecule` argument, so the file is not parsed again, and its path is added to `parsed`, so the pipeline
+             does not read it either.
+    """
+    if molecule is None:
+        return input_file, output_file
+    parsed.add(input_file)
+    return input_file, output_file, {"molecule": molecule}
+
+
+def _concurrently(function, items, workers):
+    """
+    Yields (item, function(item)) for every item, in order, while `function` already runs on the next items in
+    `workers` threads, e.g. to open many files over a high-latency filesystem at once.
+    """
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="to-com-check") as executor:
+        pending = deque()
+        for item in items:
+            pending.append((item, executor.submit(function, item)))
+            if len(pending) > 2 * workers:
+                item, future = pending.popleft()
+                yield item, future.result()
+        while pending:
+            item, future = pending.popleft()
+            yield item, future.result()
+
+
+def _unique_geometries(input_files, parser, dedup, discovery, metrics, is_group=is_tar_archive):
+    """
+    Yields (input file, molecule) tuples, without the files whose geometry duplicates an earlier one when a
+    ConformerDeduplicator is given. The molecule is the one parsed for the comparison, or None without `dedup` and for
+    files holding several geometries (`is_group`: tar archives, multi-frame .xyz files), which are passed through.
+    """
+    if dedup is None:
+        yield from ((input_file, None) for input_file in input_files)
+        return
+
+    say = metrics.message if metrics is not None else print
+    timed = metrics.time_stage if metrics is not None else _untimed
+    if not discovery.streaming:
+        input_files = sorted(input_files)  # The first file of a set of duplicates by name is kept, whatever the listing
+    duplicates = 0
+    for input_file in input_files:
+        molecule = None
+        if not is_group(input_file):
+            with timed("dedup"):
+                molecule, duplicate = _find_duplicate(dedup, input_file, parser)
+            if duplicate is not None:
+                original, rmsd = duplicate
+                say(f"Skipped {os.path.basename(input_file)}: duplicate of {os.path.basename(original)} "
+                    f"(RMSD {rmsd:.3f} Å)")
+                duplicates += 1
+                continue
+        yield input_file, molecule
+
+    if duplicates:
+        say(f"Skipped {duplicates} duplicate geometr{'y' if duplicates == 1 else 'ies'}")
+
+
+def _find_duplicate(dedup, input_file, parser):
+    """
+    :return: Tuple of (molecule or None if the file cannot be parsed, result of dedup.check).
+    """
+    try:
+        molecule = parser(input_file)
+    except (OSError, ValueError):
+        return None, None  # Left to the conversion, which reports the error
+    return molecule, dedup.check(input_file, molecule)
+
+
+def _parse_output_geometry(out_file_path):
+    with stage("parse"):
+        return parse_gaussian_output(out_file_path)
+
+
+def _parse_fchk_geometry(fchk_file_path):
+    with stage("parse"):
+        return parse_fchk_geometry(fchk_file_path)
+
+
+def xyz_file_to_coms(xyz_file_path, com_file_paths, templates, geometry_check=None, planner=None, frames=None,
+                     molecule=None):
+    """
+    Converts a single .xyz file to one Gaussian input file per template.
+    :param com_file_paths: Paths of the .com files, or for a multi-frame .xyz file the folder its frames are
+                           written to.
+    :param frames: Optional FrameSelection choosing the frames of a multi-frame .xyz file.
+    :param molecule: The file's geometry if it was already parsed (for `dedup`), so it is not parsed again.
+    """
+    if isinstance(com_file_paths, str):
+        _ensemble_to_coms(xyz_file_path, com_file_paths, templates, geometry_check, planner, frames)
+        return
+    if molecule is None:
+        with stage("parse"):
+            molecule = Molecule.from_xyz_file(xyz_file_path)
+    molecule_to_coms(molecule, com_file_paths, templates, geometry_check, planner)
+
+
+def out_file_to_coms(out_file_path, output_paths, templates, geometry_check=None, planner=None, keep_xyz=False,
+                     molecule=None):
+    """
+    Converts the final geometry of a Gaussian output file (or every log in a tar archive) to one Gaussian input file
+    per template.
+    :param output_paths: Paths from _output_paths, or for a tar archive the folder its members are written to.
+    :param molecule: The final geometry if it was already parsed (for `dedup`), so the log is not parsed again.
+    """
+    if is_tar_archive(out_file_path):
+        _archive_to_coms(out_file_path, output_paths, templates, geometry_check, planner, keep_xyz)
+        return
+    if molecule is None:
+        molecule = _parse_output_geometry(out_file_path)
+    _write_outputs(molecule, output_paths, templates, geometry_check, planner, keep_xyz)
+
+
+def fchk_file_to_coms(fchk_file_path, output_paths, templates, geometry_check=None, planner=None, keep_xyz=False,
+                      molecule=None):
+    """
+    Converts the current geometry of a formatted checkpoint file to one Gaussian input file per template.
+    :param output_paths: Paths from _output_paths.
+    :param molecule: The geometry if it was already parsed (for `dedup`), so the file is not parsed again.
+    """
+    if molecule is None:
+        molecule = _parse_fchk_geometry(fchk_file_path)
+    _write_outputs(molecule, output_paths, templates, geometry_check, planner, keep_xyz)
+
+
+def _write_outputs(molecule, output_paths, templates, geometry_check, planner, keep_xyz):
+    if keep_xyz:
+        # The geometry is checked before anything is written, so a rejected geometry leaves no .xyz behind either
+        bonds = _check_geometry(molecule, templates, geometry_check)
+        write_xyz_file(molecule, output_paths[0])
+        molecule_to_coms(molecule, output_paths[1:], templates, None, planner, bonds)
+    else:
+        molecule_to_coms(molecule, output_paths, templates, geometry_check, planner)
+
+
+def _archive_to_coms(archive_path, output_directory, templates, geometry_check, planner, keep_xyz):
+    _write_rendered(_render_archive_to_coms(archive_path, output_directory, templates, geometry_check, planner,
+                                            keep_xyz))
+
+
+def _render_archive_to_coms(archive_path, output_directory, templates, geometry_check, planner, keep_xyz,
+                            output_name=None):
+    """
+    Yields the files of every log in a tar archive as (output path, contents) tuples, one member at a time. Members
+    are converted into <archive name>/<member path>, mirroring the layout inside the archive. Members that fail are
+    reported, and the archive fails once the others are done.
+    """
+    failed = 0
+    for member_name, stream in iter_tar_outputs(archive_path):
+        try:
+            member_directory = archive_member_directory(output_directory, member_name)
+            output_paths = _output_paths(member_directory, output_base_name(member_name), templates, keep_xyz)
+            molecule = _parse_output_geometry(stream)
+            outputs = _render_outputs(molecule, output_paths, templates, geometry_check, planner, keep_xyz)
+        except ValueError as e:
+            print(f"Error processing {member_name}: {e}")
+            failed += 1
+            continue
+        yield from outputs
+        if not is_measuring():  # Progress is reported per archive when metrics are collected
+            names = map(output_name, output_paths) if output_name is not None else output_paths
+            print(f"Processed {member_name} -> {', '.join(names)}")
+    if failed:
+        raise ValueError(f"{failed} archive member(s) could not be converted")
+
+
+def _ensemble_to_coms(xyz_file_path, output_directory, templates, geometry_check, planner, frames):
+    _write_rendered(_render_ensemble_to_coms(xyz_file_path, output_directory, templates, geometry_check, planner,
+                                             frames))
+
+
+def _render_ensemble_to_coms(xyz_file_path, output_directory, templates, geometry_check, planner, frames):
+    """
+    Yields the .com files of the selected frames of a multi-frame .xyz file as (output path, contents) tuples, one
+    frame in memory at a time. Frames are converted into <file name>/<file name>_f<frame>_<template>.com. Frames
+    that fail are reported, and the file fails once the others are done.
+    """
+    base_name = os.path.basename(output_directory)
+    converted = failed = 0
+    with stage("parse"):  # Writing each frame is counted separately
+        for index, molecule in iter_xyz_frames(xyz_file_path, frames):
+            frame_file = f"{base_name}_f{index:05d}.xyz"
+            com_file_paths = [os.path.join(output_directory, template.com_file_name(frame_file))
+                              for template in templates]
+            try:
+                outputs = render_molecule_to_coms(molecule, com_file_paths, templates, geometry_check, planner)
+            except ValueError as e:
+                print(f"Error processing {os.path.basename(xyz_file_path)} frame {index}: {e}")
+                failed += 1
+                continue
+            yield from outputs
+            converted += 1
+    if failed:
+        raise ValueError(f"{failed} frame(s) could not be converted")
+    if not is_measuring():  # Progress is reported per file when metrics are collected
+        print(f"Processed {converted} frame(s) of {os.path.basename(xyz_file_path)}")
+
+
+def _write_rendered(outputs):
+    """
+    Writes (output path, contents) tuples as they are generated, creating their folders.
     """
-    # Get a list of all .xyz files in the specified folder
-    xyz_files = [f for f in os.listdir(folder_path) if f.endswith(".xyz")]
+    directories = set()
+    for path, content in outputs:
+        directory = os.path.dirname(path)
+        if directory not in directories:
+            os.makedirs(directory, exist_ok=True)
+            directories.add(directory)
+        with stage("write"), open(path, "w") as file:
+            file.write(content)
 
-    for xyz_file in xyz_files:
-        # Construct the full file path
-        xyz_file_path = os.path.join(folder_path, xyz_file)
 
-        # Read the content of the .xyz file, skipping the first two lines
-        with open(xyz_file_path, "r") as file:
-            lines = file.readlines()
-            content = lines[2:]  # Skip the first two lines
+def molecule_to_coms(molecule, com_file_paths, templates, geometry_check=None, planner=None, bonds=None):
+    """
+    Writes one Gaussian input file per template for an already parsed molecule.
+    :param geometry_check: Optional GeometryCheck; a geometry that fails it raises ValueError and nothing is written.
+    :param planner: Optional ResourcePlanner choosing %mem and %nprocshared for the molecule and each template.
+    :param bonds: Bonds already found by a geometry check, if any.
+    """
+    if bonds is None:
+        bonds = _check_geometry(molecule, templates, geometry_check)
+    with stage("parse"):
+        # Extract elements contained in the molecule
+        heavy_metals_in_molecule, non_heavy_metals_in_molecule = process_elements(molecule)
 
-        # Extract elements contained in the xyz file
-        heavy_metals_in_molecule, non_heavy_metals_in_molecule = process_elements(content)
+    # Write the content to the com files
+    for com_file_path, template in zip(com_file_paths, templates):
+        with stage("write"), open(com_file_path, "w") as file:
+            template.write(file, os.path.basename(com_file_path), molecule, heavy_metals_in_molecule,
+                           non_heavy_metals_in_molecule, bonds, _plan(planner, molecule, template))
+
+
+def render_xyz_to_coms(xyz_file_path, com_file_paths, data, templates, geometry_check=None, planner=None,
+                       frames=None, to_sink=False, molecule=None):
+    """
+    xyz_file_to_coms on the raw contents of the .xyz file, for pipelined runs. Multi-frame .xyz files (data is
+    None) are streamed and written directly, so their frames never pile up in the write queue. With `to_sink` their
+    files are yielded one frame at a time instead, for the write stage to hand to an output sink (see the `stream`
+    parameter of run_pipeline).
+    :return: List (or for a multi-frame .xyz file with `to_sink`, generator) of (output path, contents) tuples.
+    """
+    if molecule is None and data is None and to_sink:
+        return _render_ensemble_to_coms(xyz_file_path, com_file_paths, templates, geometry_check, planner, frames)
+    if molecule is None and data is None:
+        xyz_file_to_coms(xyz_file_path, com_file_paths, templates, geometry_check, planner, frames)
+        return []
+    if molecule is None:
+        with stage("parse"):
+            molecule = Molecule.from_xyz_file_lines(data.decode("utf-8", errors="replace").splitlines(keepends=True))
+    return render_molecule_to_coms(molecule, com_file_paths, templates, geometry_check, planner)
 
-        # Create the new file name with .com extension
-        clean_basis_set = re.sub(r"[(),]", "", basis_set)  # Removes ( ) and ,
-        clean_basis_set = clean_basis_set.replace("+", "plus")  # Converts + to plus and makes it lower case
-        com_file_name = xyz_file.replace(".xyz", f"_{theory}_{clean_basis_set}_{calculation_type}.com").lower()
-        com_file_path = os.path.join(folder_path, com_file_name)
 
-        # Write the content to the com file
-        with open(com_file_path, "w") as file:
-            write_com_file(file, theory, dispersion, solvent, basis_set, com_file_name, content,
-                           heavy_metals_in_molecule, non_heavy_metals_in_molecule, calculation_type, split_basis_set,
-                           mem_alloc, nproc, basis_set_heavy_atoms, ecp_heavy_atoms)
+def render_out_to_coms(out_file_path, output_paths, data, templates, geometry_check=None, planner=None,
+                       keep_xyz=False, to_sink=False, molecule=None, output_name=None):
+    """
+    out_file_to_coms on the raw contents of the output file, for pipelined runs. Tar archives (data is None) are
+    converted and written directly, or with `to_sink` yielded member by member for the write stage to hand to an
+    output sink (see the `stream` parameter of run_pipeline).
+    :param output_name: For a tar archive with `to_sink`, the sink's output_name, giving the name each of its files
+                        is reported under.
+    :return: List (or for a tar archive with `to_sink`, generator) of (output path, contents) tuples.
+    """
+    if molecule is None and data is None and to_sink:
+        return _render_archive_to_coms(out_file_path, output_paths, templates, geometry_check, planner, keep_xyz,
+                                       output_name)
+    if molecule is None and data is None:
+        out_file_to_coms(out_file_path, output_paths, templates, geometry_check, planner, keep_xyz)
+        return []
+    if molecule is None:
+        with stage("parse"):
+            molecule = parse_gaussian_output_bytes(decompress(out_file_path, data))
+    return _render_outputs(molecule, output_paths, templates, geometry_check, planner, keep_xyz)
+
+
+def _render_outputs(molecule, output_paths, templates, geometry_check, planner, keep_xyz):
+    if not keep_xyz:
+        return render_molecule_to_coms(molecule, output_paths, templates, geometry_check, planner)
+    bonds = _check_geometry(molecule, templates, geometry_check)
+    with stage("format"):
+        xyz = (output_paths[0], format_xyz_file(molecule, output_paths[0]))
+    return [xyz] + render_molecule_to_coms(molecule, output_paths[1:], templates, None, planner, bonds)
+
+
+def render_fchk_to_coms(fchk_file_path, output_paths, data, templates, geometry_check=None, planner=None,
+                        keep_xyz=False, molecule=None):
+    """
+    fchk_file_to_coms on the raw contents of the .fchk file, for pipelined runs.
+    :return: List of (output path, contents) tuples.
+    """
+    if molecule is None:
+        with stage("parse"):
+            molecule = parse_fchk_geometry(fchk_file_path, data)
+    return _render_outputs(molecule, output_paths, templates, geometry_check, planner, keep_xyz)
+
+
+def render_molecule_to_coms(molecule, com_file_paths, templates, geometry_check=None, planner=None, bonds=None):
+    """
+    molecule_to_coms without writing the files.
+    :return: List of (output path, contents) tuples.
+    """
+    if bonds is None:
+        bonds = _check_geometry(molecule, templates, geometry_check)
+    with stage("parse"):
+        heavy_metals_in_molecule, non_heavy_metals_in_molecule = process_elements(molecule)
+    with stage("format"):
+        return [(com_file_path, template.render(os.path.basename(com_file_path), molecule, heavy_metals_in_molecule,
+                                                non_heavy_metals_in_molecule, bonds,
+                                                _plan(planner, molecule, template)))
+                for com_file_path, template in zip(com_file_paths, templates)]
+
+
+def _check_geometry(molecule, templates, geometry_check):
+    """
+    Runs the neighbor search once per molecule, for the geometry check and the connectivity sections.
+    :return: List of bonds, or None if no template needs them.
+    """
+    if geometry_check is None and not any(template.connectivity for template in templates):
+        return None
+    with stage("check"):
+        if geometry_check is None:
+            return analyze_geometry(molecule).bonds
+        return geometry_check.validate(molecule).bonds
+
 
-        print(f"Processed {xyz_file} -> {com_file_name}")
+def _plan(planner, molecule, template):
+    return planner.plan(molecule, template) if planner is not None else None
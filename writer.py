@@ -1,59 +1,183 @@
 import os
+import re
 
+from geometry import analyze_geometry, format_connectivity
+from metrics import stage
 
-def write_xyz_file(coordinates, output_path):
+
+def format_xyz_file(molecule, output_path):
+    """
+    :return: Contents of the .xyz file that write_xyz_file writes to `output_path`.
+    """
+    # Get the base name without extension
+    base_name = os.path.splitext(os.path.basename(output_path))[0]
+    return f"{len(molecule)}\n{base_name}_optimized\n{molecule.format_xyz_block()}"
+
+
+def format_xyz_frame(frame, base_name):
+    """
+    :return: One frame of a multi-frame .xyz file.
+    """
+    return f"{len(frame.molecule)}\n{base_name} {frame.label()}\n{frame.molecule.format_xyz_block()}"
+
+
+def write_xyz_file(molecule, output_path):
     """
     Creates an .xyz file and writes coordinates
-    :param coordinates: "List of tuples containing element symbol and its xyz coordinates."
+    :param molecule: "Molecule to write."
+    :param output_path: "Path to the output XYZ file."
+    """
+    with stage("format"):
+        content = format_xyz_file(molecule, output_path)
+    with stage("write"), open(output_path, 'w') as file:
+        file.write(content)
+
+
+def write_xyz_trajectory(frames, output_path):
+    """
+    Streams frames into a multi-frame .xyz file, one frame at a time.
+    :param frames: "Iterable of GaussianFrame objects, e.g. the generator returned by iter_gaussian_frames."
     :param output_path: "Path to the output XYZ file."
+    :return: Number of frames written.
     """
+    base_name = os.path.splitext(os.path.basename(output_path))[0]
+    count = 0
     with open(output_path, 'w') as file:
-        file.write(f"{len(coordinates)}\n")
-        # Get the base name without extension
-        base_name = os.path.splitext(os.path.basename(output_path))[0]
-        file.write(f"{base_name}_optimized\n")
-        for coord in coordinates:
-            file.write(f"{coord[0]} {coord[1]} {coord[2]} {coord[3]}\n")
+        for frame in frames:
+            with stage("format"):
+                content = format_xyz_frame(frame, base_name)
+            with stage("write"):
+                file.write(content)
+            count += 1
+    if count == 0:
+        raise ValueError("No geometries found in the file")
+    return count
 
 
-def write_com_file(file, theory, dispersion, solvent, basis_set, com_file_name, content, heavy_metals_in_molecule,
+def write_com_file(file, theory, dispersion, solvent, basis_set, com_file_name, molecule, heavy_metals_in_molecule,
                    non_heavy_metals_in_molecule, calculation_type, split_basis_set, mem_alloc, nproc,
                    basis_set_heavy_atoms, ecp_heavy_atoms):
-    if calculation_type == "reopt":
-        if "ts" in com_file_name:
-            job = " opt=(ts,calcfc,noeigentest) freq=noraman"
-        else:
-            job = " opt freq=noraman"
-    elif calculation_type == "spe":
-        job = "p"
-    else:
-        raise ValueError("Invalid calculation type.")
-
-    if split_basis_set and heavy_metals_in_molecule:
-        input_line_basis = "genecp"
-    else:
-        input_line_basis = basis_set
-
-    file.write((f"%mem={mem_alloc}GB" if nproc else "%mem=16GB")
-               + "\n"
-               + (f"%nprocshared={nproc}" if nproc else "%nprocshared=16")
-               + "\n"
-                 f"%chk={com_file_name.replace('.com', '')}.chk\n"
-                 f"#{job} {theory}/{input_line_basis}"
-               + (f" scrf=(smd,solvent={solvent})" if solvent else "")
-               + (f" em={dispersion}" if dispersion else "")
-               + " gfinput\n\n"
-                 f"{com_file_name.replace('.com', '')}\n\n"
-                 f"0 1\n")
-    file.writelines(content)
-    file.write("\n")
-
-    if split_basis_set and heavy_metals_in_molecule:
-        file.write(f"{' '.join(heavy_metals_in_molecule)} 0\n"
-                   f"{basis_set_heavy_atoms}\n"
-                   "****\n"
-                   f"{' '.join(non_heavy_metals_in_molecule)} 0\n"
-                   f"{basis_set}\n"
-                   "****\n\n"
-                   f"{' '.join(heavy_metals_in_molecule)} 0\n"
-                   + f"{ecp_heavy_atoms}\n\n\n\n\n")
+    template = ComTemplate(theory, dispersion, solvent, basis_set, calculation_type, split_basis_set, mem_alloc, nproc,
+                           basis_set_heavy_atoms, ecp_heavy_atoms)
+    template.write(file, com_file_name, molecule, heavy_metals_in_molecule, non_heavy_metals_in_molecule)
+
+
+class ComTemplate:
+    """
+    Gaussian input template for one level of theory and calculation type. The Link0 lines and route sections are
+    built once, and GenECP basis blocks once per unique element set, so writing many inputs only formats the
+    per-molecule parts.
+    """
+
+    def __init__(self, theory, dispersion, solvent, basis_set, calculation_type, split_basis_set, mem_alloc, nproc,
+                 basis_set_heavy_atoms=None, ecp_heavy_atoms=None, connectivity=False):
+        """
+        :param connectivity: Add geom=connectivity to the route and a connectivity section derived from covalent
+                             radii after the coordinates.
+        """
+        if calculation_type not in ("reopt", "spe"):
+            raise ValueError("Invalid calculation type.")
+
+        self.config = dict(theory=theory, dispersion=dispersion, solvent=solvent, basis_set=basis_set,
+                           calculation_type=calculation_type, split_basis_set=split_basis_set, mem_alloc=mem_alloc,
+                           nproc=nproc, basis_set_heavy_atoms=basis_set_heavy_atoms, ecp_heavy_atoms=ecp_heavy_atoms)
+        if connectivity:  # Only recorded when set, so build manifests written without it stay valid
+            self.config["connectivity"] = True
+        self.theory = theory
+        self.basis_set = basis_set
+        self.calculation_type = calculation_type
+        self.split_basis_set = split_basis_set
+        self.basis_set_heavy_atoms = basis_set_heavy_atoms
+        self.ecp_heavy_atoms = ecp_heavy_atoms
+        self.connectivity = connectivity
+
+        self._link0 = self.format_link0(mem_alloc, nproc)
+        route_options = ((f" scrf=(smd,solvent={solvent})" if solvent else "")
+                         + (f" em={dispersion}" if dispersion else "")
+                         + (" geom=connectivity" if connectivity else "")
+                         + " gfinput\n\n")
+        self._routes = {}
+        for is_ts in (False, True):
+            for genecp in (False, True):
+                input_line_basis = "genecp" if genecp else basis_set
+                self._routes[is_ts, genecp] = f"#{self._job(is_ts)} {theory}/{input_line_basis}{route_options}"
+        self._basis_blocks = {}
+
+    @classmethod
+    def from_config(cls, config, calculation_type, mem_alloc, nproc):
+        """
+        :param config: Entry of DefaultConfig.SPE_DEFAULTS or DefaultConfig.OPT_DEFAULTS, optionally with
+                       "connectivity": True
+        """
+        return cls(config["level_of_theory"], config["empirical_dispersion"], config["solvent"], config["basis_set"],
+                   calculation_type, config["split_basis_set"], mem_alloc, nproc,
+                   config.get("basis_set_heavy_atoms"), config.get("ecp_heavy_atoms"),
+                   config.get("connectivity", False))
+
+    @staticmethod
+    def format_link0(mem_alloc, nproc):
+        """
+        :return: %mem and %nprocshared lines; 16GB and 16 processors where a value is not given.
+        """
+        return f"%mem={mem_alloc or 16}GB\n%nprocshared={nproc or 16}\n"
+
+    def _job(self, is_ts):
+        if self.calculation_type == "reopt":
+            return " opt=(ts,calcfc,noeigentest) freq=noraman" if is_ts else " opt freq=noraman"
+        return "p"
+
+    def com_file_name(self, xyz_file):
+        """
+        Name of the .com file generated from `xyz_file` with this template.
+        """
+        clean_basis_set = re.sub(r"[(),]", "", self.basis_set)  # Removes ( ) and ,
+        clean_basis_set = clean_basis_set.replace("+", "plus")  # Converts + to plus and makes it lower case
+        return xyz_file.replace(".xyz", f"_{self.theory}_{clean_basis_set}_{self.calculation_type}.com").lower()
+
+    def _basis_block(self, heavy_metals_in_molecule, non_heavy_metals_in_molecule):
+        key = (tuple(heavy_metals_in_molecule), tuple(non_heavy_metals_in_molecule))
+        block = self._basis_blocks.get(key)
+        if block is None:
+            block = (f"{' '.join(heavy_metals_in_molecule)} 0\n"
+                     f"{self.basis_set_heavy_atoms}\n"
+                     "****\n"
+                     f"{' '.join(non_heavy_metals_in_molecule)} 0\n"
+                     f"{self.basis_set}\n"
+                     "****\n\n"
+                     f"{' '.join(heavy_metals_in_molecule)} 0\n"
+                     + f"{self.ecp_heavy_atoms}\n\n\n\n\n")
+            self._basis_blocks[key] = block
+        return block
+
+    def render(self, com_file_name, molecule, heavy_metals_in_molecule, non_heavy_metals_in_molecule, bonds=None,
+               resources=None):
+        """
+        :param bonds: Bonds for the connectivity section, as found by geometry.analyze_geometry (found here if None).
+        :param resources: Optional resources.Resources overriding the template's %mem and %nprocshared.
+        :return: The complete input file as a string.
+        """
+        genecp = bool(self.split_basis_set and heavy_metals_in_molecule)
+        name = com_file_name.replace('.com', '')
+        link0 = self._link0 if resources is None else self.format_link0(resources.mem_alloc, resources.nproc)
+        parts = [link0,
+                 f"%chk={name}.chk\n",
+                 self._routes["ts" in com_file_name, genecp],
+                 f"{name}\n\n"
+                 f"{molecule.charge} {molecule.multiplicity}\n",
+                 molecule.format_xyz_block(),
+                 "\n"]
+        if self.connectivity:
+            if bonds is None:
+                bonds = analyze_geometry(molecule).bonds
+            parts.append(format_connectivity(len(molecule), bonds) + "\n")
+        if genecp:
+            parts.append(self._basis_block(heavy_metals_in_molecule, non_heavy_metals_in_molecule))
+        return "".join(parts)
+
+    def write(self, file, com_file_name, molecule, heavy_metals_in_molecule, non_heavy_metals_in_molecule, bonds=None,
+              resources=None):
+        with stage("format"):
+            content = self.render(com_file_name, molecule, heavy_metals_in_molecule, non_heavy_metals_in_molecule,
+                                  bonds, resources)
+        with stage("write"):
+            file.write(content)
@@ -0,0 +1,146 @@
+import re
+from collections import deque
+from itertools import islice
+
+from log_io import open_text
+from metrics import stage
+from molecule import Molecule
+
+HARTREE_TO_KCAL = 627.509474
+
+# "E=-1234.5" (--trajectory), "energy: -12.3 gnorm: ..." (xtb), "E -123.4" (ORCA); CREST writes the bare energy as
+# the whole comment, so a number followed by other text ("123 conformers") is not an energy
+_COMMENT_ENERGY = re.compile(r"(?:^|\s)(?:E|energy)\s*[=:]?\s*(-?\d+\.\d*(?:[eE][+-]?\d+)?)", re.IGNORECASE)
+_BARE_ENERGY = re.compile(r"\s*(-?\d+\.\d*(?:[eE][+-]?\d+)?)\s*")
+
+
+def comment_energy(comment):
+    """
+    :return: Energy in Hartree read from the comment line of an .xyz frame, or None.
+    """
+    match = _COMMENT_ENERGY.search(comment) or _BARE_ENERGY.fullmatch(comment)
+    return float(match.group(1)) if match is not None else None
+
+
+class FrameSelection:
+    """
+    Frames of a multi-frame .xyz file to convert: a range of frame indices (stop exclusive) with a stride, and
+    optionally only frames whose comment-line energy lies within `energy_window` kcal/mol of the lowest energy of
+    the file.
+    """
+
+    def __init__(self, start=0, stop=None, stride=1, energy_window=None):
+        if start < 0 or (stop is not None and stop < start) or stride < 1:
+            raise ValueError("Frame selection needs 0 <= start <= stop and a stride of at least 1")
+        self.start = start
+        self.stop = stop
+        self.stride = stride
+        self.energy_window = energy_window
+        self.config = dict(start=start, stop=stop, stride=stride, energy_window=energy_window)
+
+    @classmethod
+    def parse(cls, frames=None, stride=1, energy_window=None):
+        """
+        :param frames: "START:STOP", "START:" or ":STOP" (frame indices from 0, STOP excluded), or None for all.
+        """
+        start, stop = 0, None
+        if frames:
+            first, separator, last = frames.partition(":")
+            if not separator:
+                raise ValueError(f"Frame range must be START:STOP, found: {frames}")
+            start = int(first) if first else 0
+            stop = int(last) if last else None
+        return cls(start, stop, stride, energy_window)
+
+    def selects(self, index):
+        return (index >= self.start and (self.stop is None or index < self.stop)
+                and (index - self.start) % self.stride == 0)
+
+
+def _frame_headers(file):
+    """
+    Yields (frame index, atom count, comment line) for every frame of an open .xyz file. The caller must consume
+    (or skip) the atom lines of a frame before asking for the next one.
+    """
+    index = 0
+    for count_line in file:
+        count = count_line.strip()
+        if not count:
+            continue  # Blank lines between or after frames
+        if not count.isdigit():
+            raise ValueError(f"Invalid atom count line in frame {index}: {count}")
+        comment = file.readline()
+        yield index, int(count), comment.strip()
+        index += 1
+
+
+def _skip(file, count):
+    deque(islice(file, count), maxlen=0)
+
+
+def _lowest_energy(source):
+    with open_text(source) as file:
+        lowest = None
+        for index, count, comment in _frame_headers(file):
+            energy = comment_energy(comment)
+            if energy is not None and (lowest is None or energy < lowest):
+                lowest = energy
+            _skip(file, count)
+    return lowest
+
+
+def iter_xyz_frames(source, selection=None):
+    """
+    Lazily yields the selected frames of a multi-frame .xyz file. Atom lines of frames that are not selected are
+    skipped without being parsed, and only one frame is held at a time, so ensembles of 100k conformers are read in
+    constant memory. With an energy window, the comment lines are read once beforehand to find the lowest energy.
+    :param source: Path to the .xyz file (optionally compressed) or an open text stream that can be rewound
+    :param selection: Optional FrameSelection (default: every frame)
+    :return: Generator of (frame index, Molecule) tuples; the comment line is the molecule's title.
+    """
+    selection = selection or FrameSelection()
+    lowest = None
+    if selection.energy_window is not None:
+        with stage("read"):
+            lowest = _lowest_energy(source)
+        if not isinstance(source, str):
+            source.seek(0)
+
+    with open_text(source) as file:
+        for index, count, comment in _frame_headers(file):
+            if selection.stop is not None and index >= selection.stop:
+                return
+            selected = selection.selects(index)
+            if selected and lowest is not None:
+                energy = comment_energy(comment)
+                if energy is None:
+                    raise ValueError(f"No energy in the comment line of frame {index}")
+                selected = (energy - lowest) * HARTREE_TO_KCAL <= selection.energy_window
+            if not selected:
+                _skip(file, count)
+                continue
+            lines = list(islice(file, count))
+            if len(lines) < count:
+                raise ValueError(f"Frame {index} ends after {len(lines)} of {count} atoms")
+            yield index, Molecule.from_xyz_lines(lines, title=comment or None)
+
+
+def is_xyz_ensemble(source):
+    """
+    Checks whether an .xyz file holds more than one frame. Only the first frame is read (the rest of the file up to
+    the next non-blank line).
+    :param source: Path to the .xyz file or an open text stream, which is rewound afterwards
+    """
+    try:
+        with open_text(source) as file:
+            count = file.readline().strip()
+            if not count.isdigit():
+                result = False  # Not a frame; left to the single-molecule reader to report
+            else:
+                _skip(file, int(count) + 1)
+                result = any(line.strip() for line in file)
+    except OSError:
+        return False  # Reported by the conversion
+    if not isinstance(source, str):
+        source.seek(0)
+    return result